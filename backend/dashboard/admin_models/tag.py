@@ -24,9 +24,9 @@ class TagAdmin(admin.ModelAdmin):
                 obj (Tag): Object of class Tag
 
             Returns:
-                integer (num_journals): count of the number of journals
-                    of class Journal assiated to the tag
+                integer (num_journals): stored count of the number of
+                    journals of class Journal assiated to the tag
 
         '''
-        num_journals: int = len(obj.journals.all())
+        num_journals: int = obj.tagged_journals
         return num_journals
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
 
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self) -> None:
+        # Keep Tag.journal_count, writing stats and collection versions
+        # up to date as journals and tags are saved, (un)tagged and
+        # deleted
+        from journal.models import Journal
+        from .models.tag import Tag
+        from .signals import (journal_tags_changed, journal_saved,
+                              journal_deleted, tag_saved, tag_deleted)
+        m2m_changed.connect(journal_tags_changed,
+                            sender=Journal.tags.through)
+        post_save.connect(journal_saved, sender=Journal)
+        pre_delete.connect(journal_deleted, sender=Journal)
+        post_save.connect(tag_saved, sender=Tag)
+        post_delete.connect(tag_deleted, sender=Tag)
@@ -0,0 +1,168 @@
+from datetime import (date, timedelta)
+from django.db import (connections, IntegrityError, transaction)
+from django.db.models import (Count, F, Model, QuerySet, Sum)
+from django.db.models.functions import (Greatest, TruncDate)
+from django.utils import timezone
+from rest_framework import status
+from ..models.stats import (UserStats, DailyStats)
+from journal.models import Journal
+
+
+# Users recomputed per transaction by recompute_user_stats
+STATS_CHUNK_SIZE = 100
+
+
+def journal_day(journal: Journal) -> date:
+    # Day a journal counts towards, in the current time zone
+    return timezone.localtime(journal.date_created).date()
+
+
+def add_stats(model: Model, lookup: dict, deltas: dict) -> None:
+    ''' add_stats: function to add deltas (negative to subtract) to
+            the counters of the stats row matching lookup with a single
+            UPDATE, creating the row when it does not exist yet
+
+        Args:
+            model (Model): UserStats or DailyStats
+            lookup (dict): field values identifying the row
+            deltas (dict): amount to add per counter field
+    '''
+    changes: dict = {field: Greatest(F(field) + delta, 0)
+                     for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes) > 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **{
+                field: max(delta, 0) for field, delta in deltas.items()})
+    except IntegrityError:
+        # Row created concurrently: apply deltas to that row instead
+        model.objects.filter(**lookup).update(**changes)
+
+
+def count_journal(journal: Journal, journals: int, words: int,
+                  chars: int) -> None:
+    ''' count_journal: function to apply the change caused by one
+            Journal instance to its User's totals and daily stats
+
+        Args:
+            journal (Journal): created, updated or deleted journal
+            journals (int): change in number of journals (1, 0 or -1)
+            words (int): change in number of words
+            chars (int): change in number of characters
+    '''
+    add_stats(UserStats, {'user_id': journal.user_id},
+              {'journal_count': journals, 'word_count': words,
+               'char_count': chars})
+    if journals != 0 or words != 0:
+        add_stats(DailyStats, {'user_id': journal.user_id,
+                               'day': journal_day(journal)},
+                  {'journal_count': journals, 'word_count': words})
+
+
+def recompute_user_stats(user_ids: list) -> int:
+    ''' recompute_user_stats: function to rebuild totals and daily
+            stats of User instance(s) from their journals' stored word
+            and character counts, in one transaction that locks the
+            stats rows before reading the journals (so deltas of
+            concurrent journal saves apply on top of the new totals)
+
+        Args:
+            user_ids (list): ids of User instances to recompute
+
+        Returns:
+            int: number of users recomputed
+    '''
+    journals: QuerySet[Journal] = Journal.objects.filter(
+        user__in=user_ids).order_by()
+    with transaction.atomic():
+        # Row locks where supported; on SQLite the DELETEs take the
+        # database write lock before the aggregates are read
+        if connections[UserStats.objects.db].features.has_select_for_update:
+            list(UserStats.objects.select_for_update().filter(
+                user__in=user_ids).values_list('pk', flat=True))
+        UserStats.objects.filter(user__in=user_ids).delete()
+        DailyStats.objects.filter(user__in=user_ids).delete()
+        totals: dict = {row['user']: row for row in journals.values(
+            'user').annotate(journals=Count('id'), words=Sum('word_count'),
+                             chars=Sum('char_count'))}
+        days: list = list(journals.annotate(
+            day=TruncDate('date_created')).values('user', 'day').annotate(
+            journals=Count('id'), words=Sum('word_count')))
+        UserStats.objects.bulk_create([
+            UserStats(user_id=user_id,
+                      journal_count=totals.get(user_id, {}).get(
+                          'journals', 0),
+                      word_count=totals.get(user_id, {}).get('words', 0),
+                      char_count=totals.get(user_id, {}).get('chars', 0))
+            for user_id in user_ids])
+        DailyStats.objects.bulk_create([
+            DailyStats(user_id=row['user'], day=row['day'],
+                       journal_count=row['journals'],
+                       word_count=row['words'])
+            for row in days])
+    return len(user_ids)
+
+
+def streaks(days: list, today: date) -> tuple:
+    ''' streaks: function to find the longest run of consecutive
+            writing days and the run ending today (or yesterday, as
+            today may not be written yet)
+
+        Args:
+            days (list): sorted dates with at least one journal
+            today (date): current date
+
+        Returns:
+            tuple: (longest streak, current streak) in days
+    '''
+    longest: int = 0
+    run: int = 0
+    previous: date = None
+    for day in days:
+        run = run + 1 if previous == day - timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current: int = run if previous and previous >= today - timedelta(
+        days=1) else 0
+    return (longest, current)
+
+
+def find_user_stats(userId: str) -> list:
+    ''' find_user_stats: function to return writing statistics of a
+            User instance from its stored totals and daily stats
+
+        Args:
+            userId (str): id for requested User instance
+
+        Returns:
+            list: list containing a dictionary of totals,
+                'entries_per_month' and streaks and a 'status' integer
+                with standard Http status code
+    '''
+    stats: UserStats = UserStats.objects.filter(user=userId).first()
+    days: list = list(DailyStats.objects.filter(
+        user=userId, journal_count__gt=0).order_by('day').values_list(
+        'day', 'journal_count', 'word_count'))
+
+    months: dict = {}
+    for day, journals, words in days:
+        month: dict = months.setdefault(day.strftime('%Y-%m'), {
+            'month': day.strftime('%Y-%m'), 'journal_count': 0,
+            'word_count': 0})
+        month['journal_count'] += journals
+        month['word_count'] += words
+    longest, current = streaks([row[0] for row in days],
+                               timezone.localdate())
+
+    journal_count: int = stats.journal_count if stats else 0
+    word_count: int = stats.word_count if stats else 0
+    return [{'journal_count': journal_count, 'word_count': word_count,
+             'char_count': stats.char_count if stats else 0,
+             'average_words': (round(word_count / journal_count)
+                               if journal_count else 0),
+             'entries_per_month': list(months.values()),
+             'longest_streak': longest, 'current_streak': current,
+             'first_day': days[0][0] if days else None,
+             'last_day': days[-1][0] if days else None},
+            status.HTTP_200_OK]
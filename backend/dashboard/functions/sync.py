@@ -0,0 +1,100 @@
+from datetime import (datetime, timedelta, timezone as dt_timezone)
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from ..models.sync import Tombstone
+from ..models.tag import Tag
+from ..serializers.tag import TagSerializer
+from journal.models import Journal
+from journal.serializers import JournalSerializer
+
+
+# Tombstones are kept this long; older watermarks get a full sync
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+# Rows changed this long before a watermark are sent again, so writes
+# still being committed when it was taken are never missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def parse_watermark(value) -> datetime:
+    ''' parse_watermark: function to parse the watermark returned by a
+            previous sync
+
+        Args:
+            value (str): ISO 8601 date time string, or None / '' for a
+                first sync
+
+        Returns:
+            datetime: aware date time, or None for a first sync
+
+        Raises:
+            ValueError: value is not a valid date time
+    '''
+    if value in (None, ''):
+        return None
+    watermark: datetime = parse_datetime(str(value))
+    if watermark is None:
+        raise ValueError('Invalid watermark.')
+    if timezone.is_naive(watermark):
+        watermark = timezone.make_aware(watermark, dt_timezone.utc)
+    return watermark
+
+
+def find_changes(userId: str, watermark: datetime = None) -> list:
+    ''' find_changes: function to get the Journal and Tag instance(s)
+            of a specific User instance created or updated since a
+            watermark, and ids of those deleted since, read through the
+            (user, updated_at) indexes instead of loading every row
+
+        Args:
+            userId (str): id for requested User instance
+            watermark (datetime): watermark of the client's previous
+                sync (optional, everything is returned if None or older
+                than TOMBSTONE_RETENTION)
+
+        Returns:
+            list: list containing a dictionary with 'journals', 'tags',
+                'deleted' ids per kind, the new 'watermark' and 'full'
+                (True if the client must replace its copy) and a
+                'status' integer with standard Http status code
+    '''
+    now: datetime = timezone.now()
+    full: bool = watermark is None or watermark < now - TOMBSTONE_RETENTION
+    journals: QuerySet[Journal] = Journal.objects.filter(user=userId)
+    tags: QuerySet[Tag] = Tag.objects.filter(user=userId)
+    deleted: dict = {'journals': [], 'tags': []}
+    if not full:
+        since: datetime = watermark - SYNC_OVERLAP
+        journals = journals.filter(updated_at__gte=since)
+        tags = tags.filter(updated_at__gte=since)
+        for kind, object_id in Tombstone.objects.filter(
+                user=userId, deleted_at__gte=since).values_list(
+                'kind', 'object_id'):
+            deleted[f'{kind}s'].append(str(object_id))
+
+    journals = JournalSerializer.optimize_queryset(
+        journals, None).order_by('updated_at', 'id')
+    tags = TagSerializer.optimize_queryset(tags, None).order_by(
+        'updated_at', 'id')
+    return [{'journals': JournalSerializer(journals, many=True).data,
+             'tags': TagSerializer(tags, many=True).data,
+             'deleted': deleted, 'watermark': now.isoformat(),
+             'full': full}, status.HTTP_200_OK]
+
+
+def prune_tombstones(before: datetime = None) -> int:
+    ''' prune_tombstones: function to delete Tombstone instances older
+            than TOMBSTONE_RETENTION, which no delta sync reads anymore
+
+        Args:
+            before (datetime): delete tombstones older than this
+                (optional, now minus TOMBSTONE_RETENTION if None)
+
+        Returns:
+            int: number of deleted tombstones
+    '''
+    if before is None:
+        before = timezone.now() - TOMBSTONE_RETENTION
+    return Tombstone.objects.filter(deleted_at__lt=before).delete()[0]
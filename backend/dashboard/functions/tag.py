@@ -1,34 +1,82 @@
+from django.core.exceptions import ValidationError
+from django.db import (connections, transaction)
 from django.db.models import QuerySet
 from rest_framework import status
 from ..models.tag import Tag
-from ..utils.responses import no_tag_found
+from ..serializers.tag import TagSerializer
+from ..utils.responses import (no_tag_found, tag_update_failed)
+from journal.functions import select_journals
+from journal.models import Journal
+from login.functions.pagination import (parse_page_size,
+                                       paginate_queryset)
+from login.models.user import User
+from login.utils.responses import invalid_request_body
 
 
-def find_tags_by_user(userId: str) -> list:
+# Keyset sort keys for paginated tag lists
+TAG_SORT_KEYS = ('name', 'id')
+
+
+def find_tags_by_user(userId: str, fields: list = None) -> list:
     ''' find_tags_by_user: function to get all Tag instance(s)
             associated with specific User instance
 
         Args:
             userId (str): id for requested User instance
+            fields (list): sparse fieldset to load (optional, all
+                fields if None)
 
         Returns:
             list: list containing a queryset of Tag instance(s) or
                     a human-readable response message and a 'status'
                     integer with standard Http status code
     '''
-    queryset: QuerySet[Tag] = Tag.objects.filter(
-        user=userId).order_by('name')
+    queryset: QuerySet[Tag] = TagSerializer.optimize_queryset(
+        Tag.objects.filter(user=userId), fields, ('name',)).order_by('name')
     if len(queryset) == 0:
         return [no_tag_found, status.HTTP_404_NOT_FOUND]
     return [queryset, status.HTTP_200_OK]
 
 
-def find_tag_by_id(tagId: str) -> list:
+def find_tag_page(userId: str, page_size, cursor: str = None,
+                  fields: list = None) -> list:
+    ''' find_tag_page: function to get one keyset page of Tag
+            instance(s) associated with specific User instance
+
+        Args:
+            userId (str): id for requested User instance
+            page_size (int | str): requested page size (capped)
+            cursor (str): next cursor token from previous page (optional)
+            fields (list): sparse fieldset to load (optional, all
+                fields if None)
+
+        Returns:
+            list: list containing a list with the page of Tag instance(s)
+                    and next cursor token or a human-readable response
+                    message and a 'status' integer with standard Http
+                    status code
+    '''
+    try:
+        page_size = parse_page_size(page_size)
+        queryset: QuerySet[Tag] = TagSerializer.optimize_queryset(
+            Tag.objects.filter(user=userId), fields, TAG_SORT_KEYS)
+        page: list = paginate_queryset(queryset, TAG_SORT_KEYS,
+                                       page_size, cursor)
+    except ValueError:
+        return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    if len(page[0]) == 0 and not cursor:
+        return [no_tag_found, status.HTTP_404_NOT_FOUND]
+    return [page, status.HTTP_200_OK]
+
+
+def find_tag_by_id(tagId: str, userId: str = None) -> list:
     ''' find_tag_by_id: function to return Tag instance
             based on query by id field
 
         Args:
             tagId (str): id for requested Tag instance
+            userId (str): id of User instance that must own the tag
+                (optional)
 
         Returns:
             list: list containing either an instance of Tag class or
@@ -36,7 +84,12 @@ def find_tag_by_id(tagId: str) -> list:
                     integer with standard Http status code
     '''
     queryset: QuerySet[Tag] = Tag.objects.filter(id=tagId)
-    if len(queryset) == 0:
+    if userId is not None:
+        queryset = queryset.filter(user=userId)
+    try:
+        if len(queryset) == 0:
+            return [no_tag_found, status.HTTP_404_NOT_FOUND]
+    except ValidationError:
         return [no_tag_found, status.HTTP_404_NOT_FOUND]
     tag: Tag = queryset[0]
     return [tag, status.HTTP_200_OK]
@@ -61,3 +114,145 @@ def find_tag_by_name(tag_name: str, userId: str) -> list:
         return [no_tag_found, status.HTTP_404_NOT_FOUND]
     tag: Tag = queryset[0]
     return [tag, status.HTTP_200_OK]
+
+
+def tag_journals(tag: Tag, journals: QuerySet) -> int:
+    ''' tag_journals: function to add a Tag instance to every selected
+            Journal instance of its User that does not have it yet, with
+            a single INSERT ... SELECT on the Journal.tags through table
+            (then updates its stored journal_count, the tagged journals'
+            updated_at and the User's collection version)
+
+        Args:
+            tag (Tag): Tag instance to apply
+            journals (QuerySet[Journal]): selected journals
+
+        Returns:
+            int: number of newly tagged journals
+    '''
+    through = Journal.tags.through
+    connection = connections[through.objects.db]
+    quote = connection.ops.quote_name
+    selected: QuerySet[Journal] = journals.filter(
+        user=tag.user_id).exclude(tags=tag).values('id').distinct()
+    Journal.objects.filter(id__in=selected).touch()
+    sql, params = selected.query.sql_with_params()
+    tag_id = through._meta.get_field('tag').get_db_prep_value(
+        tag.id, connection)
+    journal_column: str = through._meta.get_field('journal').column
+    tag_column: str = through._meta.get_field('tag').column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''INSERT INTO {quote(through._meta.db_table)}
+                ({quote(journal_column)}, {quote(tag_column)})
+                SELECT {quote('id')}, %s FROM ({sql}) AS selected''',
+            [tag_id, *params])
+        count: int = cursor.rowcount
+    Tag.objects.filter(pk=tag.pk).adjust_journal_counts(count)
+    User.objects.filter(id=tag.user_id).touch_collection()
+    return count
+
+
+def untag_journals(tag: Tag, journals: QuerySet) -> int:
+    ''' untag_journals: function to remove a Tag instance from every
+            selected Journal instance with a single DELETE on the
+            Journal.tags through table (then updates its stored
+            journal_count, the untagged journals' updated_at and the
+            User's collection version)
+
+        Args:
+            tag (Tag): Tag instance to remove
+            journals (QuerySet[Journal]): selected journals
+
+        Returns:
+            int: number of untagged journals
+    '''
+    through = Journal.tags.through
+    Journal.objects.filter(id__in=journals.filter(tags=tag).values('id')
+                           ).touch()
+    count: int = through.objects.filter(
+        tag=tag, journal__in=journals.values('id')).delete()[0]
+    Tag.objects.filter(pk=tag.pk).adjust_journal_counts(-count)
+    User.objects.filter(id=tag.user_id).touch_collection()
+    return count
+
+
+def merge_tags(source: Tag, target: Tag) -> int:
+    ''' merge_tags: function to move every journal of source Tag
+            instance to target Tag instance and delete source
+
+        Args:
+            source (Tag): Tag instance merged and deleted
+            target (Tag): Tag instance kept
+
+        Returns:
+            int: number of journals newly tagged with target
+    '''
+    count: int = tag_journals(target, Journal.objects.filter(tags=source))
+    source.delete()
+    return count
+
+
+def run_tag_operation(tag: Tag, operation: str, data: dict) -> list:
+    ''' run_tag_operation: function to run one bulk tag operation in
+            a single transaction
+
+            'apply' / 'remove' tag on journals chosen by the selectors
+            of select_journals ('journal_ids', 'date_range', or
+            'search_type' and 'search_text'), 'merge' tag into
+            'target_id' tag, or 'rename' tag to 'name' (merging into
+            the User's tag of that name if one exists)
+
+        Args:
+            tag (Tag): Tag instance operated on
+            operation (str): 'apply', 'remove', 'merge' or 'rename'
+            data (dict): request data with operation arguments
+
+        Returns:
+            list: list containing either a dictionary with 'operation',
+                resulting 'tag_id' and number of changed 'journals' or
+                response message and a 'status' integer with standard
+                Http status code
+    '''
+    userId: str = str(tag.user_id)
+    target: Tag = tag
+    try:
+        with transaction.atomic():
+            if operation in ('apply', 'remove'):
+                selector: dict = {key: value for key, value in data.items()
+                                  if key != 'tag_id'}
+                journals: QuerySet[Journal] = select_journals(userId,
+                                                              selector)
+                count: int = (tag_journals(tag, journals)
+                              if operation == 'apply'
+                              else untag_journals(tag, journals))
+            elif operation == 'merge':
+                response = find_tag_by_id(data['target_id'], userId=userId)
+                if response[1] == status.HTTP_404_NOT_FOUND:
+                    return response
+                target = response[0]
+                if target.id == tag.id:
+                    return [invalid_request_body,
+                            status.HTTP_400_BAD_REQUEST]
+                count = merge_tags(tag, target)
+            elif operation == 'rename':
+                name: str = str(data['name']).title()
+                response = find_tag_by_name(name, userId)
+                if response[1] == status.HTTP_200_OK:
+                    target = response[0]
+                    count = (0 if target.id == tag.id
+                             else merge_tags(tag, target))
+                else:
+                    serializer = TagSerializer(tag, data={'name': name},
+                                               partial=True)
+                    if not serializer.is_valid():
+                        return [tag_update_failed,
+                                status.HTTP_400_BAD_REQUEST]
+                    serializer.save()
+                    count = 0
+            else:
+                return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    except (KeyError, ValueError, ValidationError):
+        return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    return [{'operation': operation, 'tag_id': str(target.id),
+             'journals': count}, status.HTTP_200_OK]
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ...functions.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    ''' Command: management command to delete tombstones of deleted
+            journals and tags older than the delta sync retention
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = 'Delete tombstones older than the delta sync retention.'
+
+    def handle(self, *args, **options) -> None:
+        count: int = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {count} tombstone(s).'))
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import QuerySet
+from ...functions.stats import (recompute_user_stats, STATS_CHUNK_SIZE)
+from login.models.user import User
+
+
+def recompute_in_thread(user_ids: list) -> int:
+    # Worker thread: recompute one chunk on its own connection
+    try:
+        return recompute_user_stats(user_ids)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    ''' Command: management command to rebuild writing stats of every
+            User instance (or one) from their journals, in chunks of
+            users optionally recomputed in parallel worker threads
+            (not on SQLite, which allows a single writer only)
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = 'Recompute per-user writing stats from journals.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--user', type=str, default=None,
+                            help='Only recompute stats for this user id.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=STATS_CHUNK_SIZE,
+                            help='Number of users recomputed per batch.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of batches run in parallel '
+                                 '(1 runs them inline, as always on '
+                                 'SQLite).')
+
+    def handle(self, *args, **options) -> None:
+        chunk_size: int = options['chunk_size']
+        queryset: QuerySet[User] = User.objects.order_by('id')
+        if options['user']:
+            queryset = queryset.filter(id=options['user'])
+        user_ids: list = list(queryset.values_list('id', flat=True))
+        chunks: list = [user_ids[start:start + chunk_size]
+                        for start in range(0, len(user_ids), chunk_size)]
+
+        if options['workers'] <= 1 or connection.vendor == 'sqlite':
+            count: int = sum(recompute_user_stats(chunk) for chunk in chunks)
+        else:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                count = sum(pool.map(recompute_in_thread, chunks))
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed stats for {count} user(s).'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import (F, QuerySet)
+from ...models.tag import Tag
+
+
+class Command(BaseCommand):
+    ''' Command: management command to find Tag instances whose stored
+            journal_count drifted from the number of tagged journals
+            (e.g. after raw SQL changes) and recount them
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = 'Recount stored tag journal counts that drifted.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--user', type=str, default=None,
+                            help='Only reconcile tags of this user id.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted tags without fixing them.')
+
+    def handle(self, *args, **options) -> None:
+        queryset: QuerySet[Tag] = Tag.objects.all()
+        if options['user']:
+            queryset = queryset.filter(user=options['user'])
+        drifted: list = list(queryset.with_journal_counts().exclude(
+            journal_count=F('num_journals')).values_list('id', flat=True))
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted)} tag(s) drifted.')
+            return
+        count: int = Tag.objects.filter(
+            id__in=drifted).refresh_journal_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {count} tag(s).'))
@@ -0,0 +1,55 @@
+from django.db import models
+from login.models.user import User
+
+
+class UserStats(models.Model):
+    ''' UserStats: writing totals of a User instance, kept up to date
+            incrementally as journals are created, updated and deleted
+            so the dashboard never scans journals to show them
+
+        Args:
+            Model (class): Django generic model class
+    '''
+    user = models.OneToOneField(User, primary_key=True,
+                                on_delete=models.CASCADE,
+                                related_name='stats')
+    journal_count = models.PositiveIntegerField(blank=False, null=False,
+                                                default=0)
+    word_count = models.PositiveIntegerField(blank=False, null=False,
+                                             default=0)
+    char_count = models.PositiveIntegerField(blank=False, null=False,
+                                             default=0)
+
+    def __str__(self) -> str:
+        return f'{self.user_id} ({self.journal_count} journals)'
+
+    class Meta:
+        verbose_name_plural = 'user stats'
+        db_table = 'dashboard_user_stats'
+
+
+class DailyStats(models.Model):
+    ''' DailyStats: number of journals and words a User instance
+            wrote on one day (in settings.TIME_ZONE), used for monthly
+            totals and writing streaks
+
+        Args:
+            Model (class): Django generic model class
+    '''
+    user = models.ForeignKey(User, blank=False, null=False,
+                             on_delete=models.CASCADE,
+                             related_name='daily_stats')
+    day = models.DateField(blank=False, null=False)
+    journal_count = models.PositiveIntegerField(blank=False, null=False,
+                                                default=0)
+    word_count = models.PositiveIntegerField(blank=False, null=False,
+                                             default=0)
+
+    def __str__(self) -> str:
+        return f'{self.user_id} {self.day} ({self.journal_count} journals)'
+
+    class Meta:
+        verbose_name_plural = 'daily stats'
+        db_table = 'dashboard_daily_stats'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'day'], name='daily_stats_user_day_unique')]
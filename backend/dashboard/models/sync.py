@@ -0,0 +1,35 @@
+from django.db import models
+from django.utils import timezone
+from login.models.custom import CustomDateTimeField
+from login.models.user import User
+
+
+class Tombstone(models.Model):
+    ''' Tombstone: record of a deleted Journal or Tag instance, kept so
+            the sync route can tell clients what to drop since their
+            last sync
+
+        Args:
+            Model (class): Django generic model class
+    '''
+    JOURNAL = 'journal'
+    TAG = 'tag'
+    KIND_CHOICES = [(JOURNAL, 'Journal'), (TAG, 'Tag')]
+
+    user = models.ForeignKey(User, blank=False, null=False,
+                             on_delete=models.CASCADE,
+                             related_name='tombstones')
+    kind = models.CharField(max_length=10, blank=False, null=False,
+                            choices=KIND_CHOICES)
+    object_id = models.UUIDField(blank=False, null=False)
+    deleted_at = CustomDateTimeField(blank=False, null=False,
+                                     default=timezone.now)
+
+    def __str__(self) -> str:
+        return f'{self.kind} {self.object_id}'
+
+    class Meta:
+        verbose_name_plural = 'tombstones'
+        db_table = 'dashboard_tombstones'
+        indexes = [models.Index(fields=['user', 'deleted_at'],
+                                name='tombstone_user_deleted_idx')]
@@ -1,10 +1,44 @@
 import uuid
 from django.db import models
+from django.db.models import (Count, F, OuterRef, Subquery)
+from django.db.models.functions import (Coalesce, Greatest)
 from django.core.validators import (MinLengthValidator, MaxLengthValidator)
+from django.utils import timezone
 from login.models.custom import CustomDateTimeField
 from login.models.user import User
 
 
+class TagQuerySet(models.QuerySet):
+    ''' TagQuerySet: custom Tag queryset with helpers for
+            counting related journals and maintaining the stored
+            journal_count of each tag
+
+        Args:
+            QuerySet (class): Django generic queryset class
+    '''
+
+    def journal_counts(self) -> Coalesce:
+        # Correlated COUNT of tagged journals for each tag row
+        through = self.model.journals.through
+        counts = through.objects.filter(tag=OuterRef('pk')).order_by(
+        ).values('tag').annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(counts), 0)
+
+    def with_journal_counts(self) -> 'TagQuerySet':
+        # Annotate number of tagged journals counted from the through table
+        return self.annotate(num_journals=self.journal_counts())
+
+    def adjust_journal_counts(self, amount: int) -> int:
+        # Add amount (negative to subtract) to stored counts in one UPDATE
+        return self.update(journal_count=Greatest(
+            F('journal_count') + amount, 0), updated_at=timezone.now())
+
+    def refresh_journal_counts(self) -> int:
+        # Recount stored counts from the through table in one UPDATE
+        return self.update(journal_count=self.journal_counts(),
+                           updated_at=timezone.now())
+
+
 class Tag(models.Model):
     ''' Tag: custom Tag model associated to
             User model by foreign key
@@ -27,11 +61,18 @@ class Tag(models.Model):
                                                 'characters.'))],
         error_messages={'unique': 'Tag name must be unique.'})
     date_created = CustomDateTimeField(blank=False, null=False)
+    updated_at = CustomDateTimeField(auto_now=True)
+    journal_count = models.PositiveIntegerField(blank=False, null=False,
+                                                default=0)
+    version = models.PositiveIntegerField(blank=False, null=False,
+                                          default=0)
+
+    objects = TagQuerySet.as_manager()
 
     @property
-    def tagged_journals(self):
-        num_journals: int = len(self.journals.all())
-        return num_journals
+    def tagged_journals(self) -> int:
+        # Stored count kept up to date by dashboard.signals
+        return self.journal_count
 
     def __str__(self) -> str:
         return self.name
@@ -39,3 +80,7 @@ class Tag(models.Model):
     class Meta:
         verbose_name_plural = 'Tags'
         db_table = 'dashboard_tags'
+        indexes = [models.Index(fields=['user', 'name'],
+                                name='tag_user_name_idx'),
+                   models.Index(fields=['user', 'updated_at'],
+                                name='tag_user_updated_idx')]
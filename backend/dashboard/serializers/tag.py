@@ -1,21 +1,34 @@
 from datetime import datetime
+from django.db.models import QuerySet
+from django.utils import timezone
 from rest_framework import serializers
 from ..models.tag import Tag
+from login.serializers.custom import DynamicFieldsModelSerializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(DynamicFieldsModelSerializer):
     ''' TagSerializer: custom Tag serializer for validating
             data and creating / updating instances of class Tag
 
         Args:
-            ModelSerializer (class): Django generic serializer
-                model class
+            DynamicFieldsModelSerializer (class):  custom serializer
+                class that takes an additional `fields` argument to
+                controls which fields should be returned by serializer
     '''
     tagged_journals = serializers.ReadOnlyField()
 
     class Meta:
         model = Tag
-        fields = '__all__'
+        exclude = ['journal_count']
+        read_only_fields = ['version']
+
+    @classmethod
+    def optimize_queryset(cls, queryset: QuerySet, fields: list,
+                          required: tuple = ()) -> QuerySet:
+        # Load stored journal count when tagged_journals is returned
+        if fields is not None and 'tagged_journals' in fields:
+            required = (*required, 'journal_count')
+        return super().optimize_queryset(queryset, fields, required)
 
     def validate_name(self, value: str) -> str:
         # Validate name to return first letter capitalized each word
@@ -32,7 +45,9 @@ class TagSerializer(serializers.ModelSerializer):
         return Tag.objects.create(**validated_data)
 
     def update(self, instance, validated_data) -> Tag:
-        # Update existing instance of Tag model once data validated
-        instance.name = validated_data.get('name', instance.name)
-        instance.save()
+        # Update existing instance of Tag model once data validated, with
+        # one UPDATE guarded by context['base_version'] if given
+        self.save_versioned(instance, {
+            'name': validated_data.get('name', instance.name),
+            'updated_at': timezone.now()})
         return instance
@@ -0,0 +1,106 @@
+from django.utils import timezone
+from .models.sync import Tombstone
+from .models.tag import Tag
+from .functions.stats import count_journal
+from journal.models import Journal
+from login.models.user import User
+
+
+def touch_owner(instance) -> None:
+    # Bump the collection version of the User owning a Journal or Tag
+    User.objects.filter(id=instance.user_id).touch_collection()
+
+
+def bury(instance, kind: str, origin) -> None:
+    # Record a Tombstone for a deleted Journal or Tag, unless it goes
+    # with its User (whose tombstones are deleted too)
+    if not isinstance(origin, User):
+        Tombstone.objects.create(user_id=instance.user_id, kind=kind,
+                                 object_id=instance.pk)
+
+
+def journal_tags_changed(sender, instance, action: str, reverse: bool,
+                         pk_set: set, **kwargs) -> None:
+    ''' journal_tags_changed: m2m_changed receiver for Journal.tags
+            keeping Tag.journal_count in step with added, removed and
+            cleared tags, with one UPDATE per change, and bumping the
+            changed journals' updated_at and owner's collection version
+
+        Args:
+            sender (class): Journal.tags through model
+            instance (Journal | Tag): instance whose relation changed
+            action (str): m2m_changed action name
+            reverse (bool): True if changed from the Tag side
+            pk_set (set): Tag ids (or Journal ids if reverse) involved
+    '''
+    changed: bool = action == 'post_clear' or (
+        action in ('post_add', 'post_remove') and bool(pk_set))
+    if changed:
+        touch_owner(instance)
+    if not reverse:
+        if changed:
+            Journal.objects.filter(pk=instance.pk).touch()
+        if action == 'post_add' and pk_set:
+            # pk_set only holds tags that were not already linked
+            Tag.objects.filter(pk__in=pk_set).adjust_journal_counts(1)
+        elif action == 'pre_remove' and pk_set:
+            Tag.objects.filter(pk__in=pk_set,
+                               journals=instance).adjust_journal_counts(-1)
+        elif action == 'pre_clear':
+            Tag.objects.filter(journals=instance).adjust_journal_counts(-1)
+        return
+
+    if action in ('post_add', 'post_remove') and pk_set:
+        Journal.objects.filter(pk__in=pk_set).touch()
+    elif action == 'pre_clear':
+        Journal.objects.filter(tags=instance).touch()
+    tags = Tag.objects.filter(pk=instance.pk)
+    if action == 'post_add' and pk_set:
+        tags.adjust_journal_counts(len(pk_set))
+    elif action == 'post_remove':
+        tags.refresh_journal_counts()
+    elif action == 'post_clear':
+        tags.update(journal_count=0, updated_at=timezone.now())
+
+
+def journal_saved(sender, instance, created: bool, **kwargs) -> None:
+    ''' journal_saved: post_save receiver for Journal adding a new
+            journal, or the change in words of an updated one, to its
+            User's writing stats and bumping its collection version
+
+        Args:
+            sender (class): Journal model
+            instance (Journal): saved Journal instance
+            created (bool): True if instance was inserted
+    '''
+    counts: tuple = (instance.word_count, instance.char_count)
+    if created:
+        count_journal(instance, 1, *counts)
+    else:
+        # Counts as loaded from the database (see Journal.from_db)
+        previous: tuple = getattr(instance, 'saved_counts', (None, None))
+        if None not in previous and previous != counts:
+            count_journal(instance, 0, counts[0] - previous[0],
+                          counts[1] - previous[1])
+    instance.saved_counts = counts
+    touch_owner(instance)
+
+
+def journal_deleted(sender, instance, **kwargs) -> None:
+    # pre_delete receiver for Journal: its tag links are deleted with it
+    Tag.objects.filter(journals=instance).adjust_journal_counts(-1)
+    count_journal(instance, -1, -instance.word_count, -instance.char_count)
+    bury(instance, Tombstone.JOURNAL, kwargs.get('origin'))
+    touch_owner(instance)
+
+
+def tag_saved(sender, instance, **kwargs) -> None:
+    # post_save receiver for Tag: bump the owner's collection version
+    touch_owner(instance)
+
+
+def tag_deleted(sender, instance, **kwargs) -> None:
+    # post_delete receiver for Tag: its journal links go with it, which
+    # clients apply when they receive its Tombstone
+    bury(instance, Tombstone.TAG, kwargs.get('origin'))
+    touch_owner(instance)
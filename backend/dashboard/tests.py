@@ -1,3 +1,395 @@
-# from django.test import TestCase
+import io
+from datetime import (date, timedelta)
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from .functions.stats import (find_user_stats, streaks)
+from .functions.sync import TOMBSTONE_RETENTION
+from .models.sync import Tombstone
+from .models.tag import Tag
+from .serializers.tag import TagSerializer
+from journal.models import Journal
+from journal.utils.text import content_fields
+from login.tests import (ApiClientMixin, RouteBudgetMixin, create_user,
+                         seed_user_data, SAMPLE_CONTENT)
 
-# Create your tests here.
+
+URL = '/dashboard/tags'
+
+
+class TagRouteBudgetTests(RouteBudgetMixin, TestCase):
+    ''' TagRouteBudgetTests: query and time budgets for
+            'dashboard/tags' routes, each run against a user with few
+            tags and journals and a user with many
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.small_user = create_user('smalluser')
+        cls.large_user = create_user('largeuser')
+        cls.small = seed_user_data(cls.small_user, 2, 2)
+        cls.large = seed_user_data(cls.large_user, 25, 12)
+
+    def each_tag(self, method: str, action: str, data: dict,
+                 index: int = 0) -> list:
+        # Build the same request for a tag of the small and large user
+        return [(method, f'{URL}/{action}', {
+                    'user': str(seeded['tags'][index].user_id),
+                    'tag_id': str(seeded['tags'][index].id), **data})
+                for seeded in (self.small, self.large)]
+
+    def tag_ids(self, count: int = None) -> list:
+        # Ids of (the first count by name of) the small and large user's
+        # tags
+        return [[tag.id for tag in sorted(seeded['tags'],
+                                          key=lambda tag: tag.name)[:count]]
+                for seeded in (self.small, self.large)]
+
+    def test_add_tag(self) -> None:
+        self.assertRouteBudget('tags.add_tag', 4, *[
+            ('post', f'{URL}/add_tag', {'user': str(user.id),
+                                        'name': f'{user.username} new'})
+            for user in (self.small_user, self.large_user)])
+
+    def test_list(self) -> None:
+        self.assertRouteBudget('tags.list', 1, ('get', URL, None))
+
+    def test_user_tags(self) -> None:
+        for data in ({}, {'page_size': 5}, {'fields': 'id,name'}):
+            self.assertRouteBudget('tags.user_tags', 2, *[
+                ('post', f'{URL}/user_tags', {'user': str(user.id), **data})
+                for user in (self.small_user, self.large_user)],
+                contains=self.tag_ids(data.get('page_size')))
+
+    def test_get_tag(self) -> None:
+        self.assertRouteBudget('tags.get_tag', 1,
+                               *self.each_tag('post', 'get_tag', {}),
+                               contains=[[seeded['tags'][0].id] for seeded
+                                         in (self.small, self.large)])
+
+    def test_check_name(self) -> None:
+        self.assertRouteBudget('tags.check_name', 1, *[
+            ('post', f'{URL}/check_name', {
+                'user': str(seeded['tags'][0].user_id),
+                'tag_name': seeded['tags'][0].name})
+            for seeded in (self.small, self.large)])
+
+    def test_update_tag(self) -> None:
+        self.assertRouteBudget('tags.update_tag', 6, *[
+            ('patch', f'{URL}/update_tag', {
+                'user': str(seeded['tags'][0].user_id),
+                'tag_id': str(seeded['tags'][0].id),
+                'name': f'{seeded["tags"][0].name} changed'})
+            for seeded in (self.small, self.large)],
+            contains=[[seeded['tags'][0].id]
+                      for seeded in (self.small, self.large)])
+
+    def test_update_tag_conflict(self) -> None:
+        tag: Tag = self.small['tags'][1]
+        data: dict = {'user': str(tag.user_id), 'tag_id': str(tag.id)}
+        response = self.send('patch', f'{URL}/update_tag', {
+            **data, 'name': 'First device', 'base_version': 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+
+        # A second device still editing version 0 must not overwrite it
+        response = self.send('patch', f'{URL}/update_tag', {
+            **data, 'name': 'Second device', 'base_version': 0})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], 1)
+        tag.refresh_from_db()
+        self.assertEqual((tag.name, tag.version), ('First Device', 1))
+        response = self.send('patch', f'{URL}/update_tag', {
+            **data, 'name': 'Second device', 'base_version': 1})
+        self.assertEqual(response.data['version'], 2)
+
+    def test_update_tag_version_read_back(self) -> None:
+        tag: Tag = Tag.objects.get(id=self.small['tags'][0].id)
+        # Written by another process after the instance was loaded
+        Tag.objects.filter(id=tag.id).update(version=7)
+        serializer = TagSerializer(tag, data={'name': 'Unguarded'},
+                                   partial=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.assertEqual(serializer.data['version'], 8)
+
+    def test_remove_tag(self) -> None:
+        self.assertRouteBudget('tags.remove_tag', 5,
+                               *self.each_tag('delete', 'remove_tag', {}, 1))
+        self.assertFalse(Tag.objects.filter(id__in=[
+            seeded['tags'][1].id for seeded in (self.small, self.large)
+        ]).exists())
+
+    def test_bulk_apply(self) -> None:
+        self.assertRouteBudget('tags.bulk_operation.apply', 7,
+                               *self.each_tag('post', 'bulk_operation', {
+                                   'operation': 'apply',
+                                   'search_type': 'title',
+                                   'search_text': 'entry'}))
+        for seeded in (self.small, self.large):
+            self.assertEqual(seeded['tags'][0].journals.count(),
+                             len(seeded['journals']))
+
+    def test_bulk_remove(self) -> None:
+        self.assertRouteBudget('tags.bulk_operation.remove', 7, *[
+            ('post', f'{URL}/bulk_operation', {
+                'user': str(seeded['tags'][0].user_id),
+                'tag_id': str(seeded['tags'][0].id), 'operation': 'remove',
+                'journal_ids': [str(journal.id)
+                                for journal in seeded['journals']]})
+            for seeded in (self.small, self.large)])
+        for seeded in (self.small, self.large):
+            self.assertEqual(seeded['tags'][0].journals.count(), 0)
+            self.assertGreater(seeded['tags'][1].journals.count(), 0)
+
+    def test_bulk_merge(self) -> None:
+        expected: list = [
+            {journal.id for tag in seeded['tags'][:2]
+             for journal in tag.journals.all()}
+            for seeded in (self.small, self.large)]
+        self.assertRouteBudget('tags.bulk_operation.merge', 12, *[
+            ('post', f'{URL}/bulk_operation', {
+                'user': str(seeded['tags'][0].user_id),
+                'tag_id': str(seeded['tags'][0].id), 'operation': 'merge',
+                'target_id': str(seeded['tags'][1].id)})
+            for seeded in (self.small, self.large)])
+        for seeded, journal_ids in zip((self.small, self.large), expected):
+            self.assertFalse(Tag.objects.filter(
+                id=seeded['tags'][0].id).exists())
+            self.assertEqual(set(seeded['tags'][1].journals.values_list(
+                'id', flat=True)), journal_ids)
+
+    def test_bulk_rename(self) -> None:
+        self.assertRouteBudget('tags.bulk_operation.rename', 8, *[
+            ('post', f'{URL}/bulk_operation', {
+                'user': str(seeded['tags'][0].user_id),
+                'tag_id': str(seeded['tags'][0].id), 'operation': 'rename',
+                'name': f'{seeded["tags"][0].name} renamed'})
+            for seeded in (self.small, self.large)])
+        tags: list = self.large['tags']
+        response = self.send('post', f'{URL}/bulk_operation', {
+            'user': str(self.large_user.id), 'tag_id': str(tags[2].id),
+            'operation': 'rename', 'name': tags[3].name.lower()})
+        self.assertEqual(response.data['detail']['tag_id'], str(tags[3].id))
+        self.assertFalse(Tag.objects.filter(id=tags[2].id).exists())
+
+    def test_bulk_invalid(self) -> None:
+        tag: Tag = self.large['tags'][0]
+        response = self.send('post', f'{URL}/bulk_operation', {
+            'user': str(self.small_user.id), 'tag_id': str(tag.id),
+            'operation': 'apply', 'journal_ids': []})
+        self.assertEqual(response.status_code, 207)
+        for data in ({'operation': 'apply'}, {'operation': 'unknown'},
+                     {'operation': 'merge', 'target_id': str(tag.id)}):
+            response = self.send('post', f'{URL}/bulk_operation', {
+                'user': str(self.large_user.id), 'tag_id': str(tag.id),
+                **data})
+            self.assertEqual(response.status_code, 400)
+
+
+class TagCountTests(ApiClientMixin, TestCase):
+    ''' TagCountTests: stored Tag.journal_count follows every way of
+            tagging, untagging and deleting journals
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = create_user('countuser')
+        cls.seeded = seed_user_data(cls.user, 6, 4)
+
+    def assertCountsStored(self) -> None:
+        # Stored counts must match counts from the through table
+        for tag in Tag.objects.with_journal_counts():
+            self.assertEqual(tag.journal_count, tag.num_journals, tag.name)
+
+    def test_journal_routes(self) -> None:
+        tags: list = self.seeded['tags']
+        journal = self.seeded['journals'][0]
+        self.assertEqual(tags[0].journals.count(), 3)
+        self.assertEqual(Tag.objects.get(id=tags[0].id).journal_count, 3)
+        self.send('patch', '/journal/journals/update_journal', {
+            'user': str(self.user.id), 'journal_id': str(journal.id),
+            'tag_list': [str(tags[2].id), str(tags[3].id)]})
+        self.assertCountsStored()
+        self.send('delete', '/journal/journals/remove_journal', {
+            'user': str(self.user.id),
+            'journal_id': str(self.seeded['journals'][1].id)})
+        self.assertCountsStored()
+        tags[0].journals.add(*self.seeded['journals'][2:])
+        self.assertCountsStored()
+        tags[0].journals.remove(self.seeded['journals'][2])
+        self.assertCountsStored()
+        tags[1].journals.clear()
+        journal.tags.clear()
+        self.assertCountsStored()
+
+    def test_bulk_paths(self) -> None:
+        tags: list = self.seeded['tags']
+        for data in ({'tag_id': str(tags[0].id), 'operation': 'apply',
+                      'date_range': str(tags[0].date_created.year)},
+                     {'tag_id': str(tags[1].id), 'operation': 'remove',
+                      'search_type': 'title', 'search_text': 'entry'},
+                     {'tag_id': str(tags[2].id), 'operation': 'merge',
+                      'target_id': str(tags[3].id)}):
+            self.send('post', f'{URL}/bulk_operation',
+                      {'user': str(self.user.id), **data})
+            self.assertCountsStored()
+        self.send('post', '/journal/journals/import_journals', {
+            'user': str(self.user.id), 'journals': [
+                {'title': 'Imported', 'content': 'Imported content',
+                 'tags': [str(tags[0].id), 'Imported tag']}]})
+        self.assertCountsStored()
+
+    def test_reconcile_command(self) -> None:
+        Tag.objects.filter(user=self.user).update(journal_count=99)
+        output = io.StringIO()
+        call_command('reconcile_tag_counts', stdout=output)
+        self.assertIn('Reconciled 4 tag(s).', output.getvalue())
+        self.assertCountsStored()
+
+
+class StatsTests(RouteBudgetMixin, TestCase):
+    ''' StatsTests: writing stats kept incrementally must match a full
+            recompute, and the stats route must not scan journals
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.small_user = create_user('smalluser')
+        cls.large_user = create_user('largeuser')
+        cls.small = seed_user_data(cls.small_user, 2, 2)
+        cls.large = seed_user_data(cls.large_user, 25, 6)
+
+    def test_user_stats(self) -> None:
+        self.assertRouteBudget('stats.user_stats', 3, *[
+            ('post', '/dashboard/stats/user_stats', {'user': str(user.id)})
+            for user in (self.small_user, self.large_user)],
+            contains=[['"journal_count":2'], ['"journal_count":25']])
+        stats: dict = self.send('post', '/dashboard/stats/user_stats', {
+            'user': str(self.large_user.id)}).data['detail']
+        self.assertEqual(stats['journal_count'], 25)
+        self.assertEqual(stats['word_count'],
+                         25 * self.large['journals'][0].word_count)
+        self.assertEqual(stats['entries_per_month'][0]['journal_count'], 25)
+        self.assertEqual(stats['longest_streak'], 1)
+        self.assertEqual(stats['current_streak'], 1)
+
+    def test_incremental_matches_recompute(self) -> None:
+        user = self.large_user
+        journals: list = self.large['journals']
+        self.send('patch', '/journal/journals/update_journal', {
+            'user': str(user.id), 'journal_id': str(journals[0].id),
+            'content': SAMPLE_CONTENT + '<p>a few more words</p>'})
+        self.send('delete', '/journal/journals/remove_journal', {
+            'user': str(user.id), 'journal_id': str(journals[1].id)})
+        Journal.objects.create(
+            user=user, title='Older entry', content=SAMPLE_CONTENT,
+            date_created=journals[2].date_created - timedelta(days=1),
+            **content_fields(SAMPLE_CONTENT))
+        incremental: dict = find_user_stats(user.id)[0]
+        self.assertEqual(incremental['journal_count'], 25)
+        self.assertEqual(incremental['longest_streak'], 2)
+
+        output = io.StringIO()
+        # Run inline on SQLite whatever the number of workers
+        call_command('recompute_user_stats', workers=4, stdout=output)
+        self.assertIn('Recomputed stats for 2 user(s).', output.getvalue())
+        self.assertEqual(find_user_stats(user.id)[0], incremental)
+
+    def test_streaks(self) -> None:
+        today: date = date(2026, 3, 10)
+        days: list = [date(2026, 2, 27), date(2026, 2, 28),
+                      date(2026, 3, 1), date(2026, 3, 5), date(2026, 3, 9)]
+        self.assertEqual(streaks(days, today), (3, 1))
+        self.assertEqual(streaks(days[:-1], today), (3, 0))
+        self.assertEqual(streaks([], today), (0, 0))
+
+
+class SyncTests(RouteBudgetMixin, TestCase):
+    ''' SyncTests: the delta sync route must return only rows changed
+            since the client's watermark, with tombstones for deletions
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.small_user = create_user('smalluser')
+        cls.large_user = create_user('largeuser')
+        cls.small = seed_user_data(cls.small_user, 2, 2)
+        cls.large = seed_user_data(cls.large_user, 25, 6)
+        # Seeded rows predate any watermark taken by the tests
+        earlier = timezone.now() - timedelta(hours=1)
+        Journal.objects.update(updated_at=earlier)
+        Tag.objects.update(updated_at=earlier)
+
+    def sync(self, user, watermark: str = None) -> dict:
+        # Send a sync request and return its detail
+        data: dict = {'user': str(user.id)}
+        if watermark is not None:
+            data['watermark'] = watermark
+        return self.send('post', '/dashboard/sync/changes', data).data[
+            'detail']
+
+    def test_changes(self) -> None:
+        self.assertRouteBudget('sync.changes.full', 4, *[
+            ('post', '/dashboard/sync/changes', {'user': str(user.id)})
+            for user in (self.small_user, self.large_user)],
+            contains=[[row.id for row in seeded['journals'] + seeded['tags']]
+                      for seeded in (self.small, self.large)])
+        watermark: str = timezone.now().isoformat()
+        self.assertRouteBudget('sync.changes', 5, *[
+            ('post', '/dashboard/sync/changes', {'user': str(user.id),
+                                                  'watermark': watermark})
+            for user in (self.small_user, self.large_user)])
+
+    def test_delta(self) -> None:
+        user = self.large_user
+        journals: list = self.large['journals']
+        tags: list = self.large['tags']
+        first: dict = self.sync(user)
+        self.assertTrue(first['full'])
+        self.assertEqual(len(first['journals']), 25)
+        self.assertEqual(len(first['tags']), 6)
+        self.assertEqual(self.sync(user, first['watermark'])['journals'], [])
+        # Tags whose journal_count changes when journals[1] is deleted
+        recounted: set = {str(tag.id) for tag in journals[1].tags.all()}
+
+        self.send('patch', '/journal/journals/update_journal', {
+            'user': str(user.id), 'journal_id': str(journals[0].id),
+            'title': 'Changed entry'})
+        self.send('delete', '/journal/journals/remove_journal', {
+            'user': str(user.id), 'journal_id': str(journals[1].id)})
+        self.send('delete', f'{URL}/remove_tag', {
+            'user': str(user.id), 'tag_id': str(tags[0].id)})
+        self.send('post', f'{URL}/bulk_operation', {
+            'user': str(user.id), 'tag_id': str(tags[1].id),
+            'operation': 'apply', 'journal_ids': [str(journals[2].id)]})
+
+        delta: dict = self.sync(user, first['watermark'])
+        self.assertFalse(delta['full'])
+        self.assertEqual({journal['id'] for journal in delta['journals']},
+                         {str(journals[0].id), str(journals[2].id)})
+        self.assertEqual({tag['id'] for tag in delta['tags']},
+                         (recounted | {str(tags[1].id)}) - {str(tags[0].id)})
+        self.assertEqual(delta['deleted'], {'journals': [str(journals[1].id)],
+                                            'tags': [str(tags[0].id)]})
+        self.assertEqual(self.sync(self.small_user, first['watermark'])[
+            'journals'], [])
+
+    def test_old_or_invalid_watermark(self) -> None:
+        expired: str = (timezone.now() - TOMBSTONE_RETENTION -
+                        timedelta(days=1)).isoformat()
+        self.assertTrue(self.sync(self.small_user, expired)['full'])
+        response = self.send('post', '/dashboard/sync/changes', {
+            'user': str(self.small_user.id), 'watermark': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_prune_tombstones(self) -> None:
+        self.send('delete', '/journal/journals/remove_journal', {
+            'user': str(self.small_user.id),
+            'journal_id': str(self.small['journals'][0].id)})
+        Tombstone.objects.update(
+            deleted_at=timezone.now() - TOMBSTONE_RETENTION)
+        output = io.StringIO()
+        call_command('prune_tombstones', stdout=output)
+        self.assertIn('Pruned 1 tombstone(s).', output.getvalue())
+        self.assertFalse(Tombstone.objects.exists())
@@ -1,12 +1,18 @@
 from django.urls import (path, include)
 from login.models.custom import OptionalSlashRouter
 from .views.tag import TagViewSet
+from .views.stats import StatsViewSet
+from .views.sync import SyncViewSet
 
 
 # Register viewset routes
 router = OptionalSlashRouter()
 router.register(prefix=r'tags', viewset=TagViewSet,
                 basename='tags')
+router.register(prefix=r'stats', viewset=StatsViewSet,
+                basename='stats')
+router.register(prefix=r'sync', viewset=SyncViewSet,
+                basename='sync')
 
 app_name = 'dashboard'
 
@@ -8,3 +8,5 @@ create_tag_failed = 'Error creating tag in db.'
 tag_deleted = 'Tag successfully deleted.'
 
 tag_exists = 'Tag with this name already exists.'
+
+tag_conflict = 'Tag was changed by another update.'
@@ -0,0 +1,51 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import ensure_csrf_cookie
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework import status
+from ..functions.stats import find_user_stats
+from login.functions.user import find_user_by_id
+from login.utils.responses import invalid_request_body
+
+
+class StatsViewSet(viewsets.ViewSet):
+    ''' StatsViewSet: custom writing stats viewsets for handling
+            API requests to 'dashboard/stats' routes
+
+        Args:
+            ViewSet (class): Django generic viewset model class
+    '''
+
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def user_stats(self, request) -> Response:
+        ''' user_stats: 'POST' route for 'dashboard/stats/user_stats' to
+                get writing statistics of a specific User instance,
+                read from stored totals instead of scanning journals
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'user' id string in
+                request.data
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' dictionary with
+                'journal_count', 'word_count', 'char_count',
+                'average_words', 'entries_per_month', 'longest_streak',
+                'current_streak', 'first_day' and 'last_day' or error
+                string response message and 'status' integer with
+                standard Http status code
+        '''
+        try:
+            response = find_user_by_id(request.data['user'])
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = find_user_stats(response[0].id)
+        return Response({'detail': response[0]}, status=response[1])
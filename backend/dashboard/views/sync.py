@@ -0,0 +1,54 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import ensure_csrf_cookie
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework import status
+from ..functions.sync import (parse_watermark, find_changes)
+from login.functions.user import find_user_by_id
+from login.utils.responses import invalid_request_body
+
+
+class SyncViewSet(viewsets.ViewSet):
+    ''' SyncViewSet: custom delta sync viewsets for handling
+            API requests to 'dashboard/sync' routes
+
+        Args:
+            ViewSet (class): Django generic viewset model class
+    '''
+
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def changes(self, request) -> Response:
+        ''' changes: 'POST' route for 'dashboard/sync/changes' to get
+                the journals and tags of a specific User instance that
+                were created, updated or deleted since the client's
+                last sync
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'user' id string and
+                optionally the 'watermark' string returned by the
+                previous sync in request.data
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' dictionary with
+                changed 'journals' and 'tags', 'deleted' journal and
+                tag ids, the next 'watermark' and 'full' (True if the
+                client must replace its copy) or error string response
+                message and 'status' integer with standard Http status
+                code
+        '''
+        try:
+            watermark = parse_watermark(request.data.get('watermark'))
+            response = find_user_by_id(request.data['user'])
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+        except (KeyError, ValueError):
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = find_changes(response[0].id, watermark)
+        return Response({'detail': response[0]}, status=response[1])
@@ -9,11 +9,15 @@ from rest_framework import status
 from ..models.tag import Tag
 from ..serializers.tag import TagSerializer
 from ..functions.tag import (find_tag_by_id, find_tags_by_user,
-                             find_tag_by_name)
+                             find_tag_by_name, find_tag_page,
+                             run_tag_operation)
+from login.functions.conditional import (collection_headers, not_modified)
+from login.serializers.custom import (parse_fields, parse_base_version,
+                                     VersionConflict)
 from login.utils.responses import invalid_request_body
 from ..utils.responses import (no_tag_found, tag_deleted,
                                tag_update_failed, create_tag_failed,
-                               tag_exists)
+                               tag_exists, tag_conflict)
 
 
 class TagViewSet(viewsets.ViewSet):
@@ -73,7 +77,7 @@ class TagViewSet(viewsets.ViewSet):
                 database or error if no data found and 'status' integer with
                 standard Http status code
         '''
-        queryset: QuerySet[Tag] = Tag.objects.all().order_by('name')
+        queryset: QuerySet[Tag] = Tag.objects.order_by('name')
         if len(queryset) == 0:
             return Response({'detail': no_tag_found},
                             status=status.HTTP_404_NOT_FOUND)
@@ -92,30 +96,66 @@ class TagViewSet(viewsets.ViewSet):
         Args:
             request (obj): object from client request, specifically
                 must contain a dictionary with 'user' id string
-                in request.data
+                in request.data, and optionally 'page_size' and 'cursor'
+                for keyset pagination and 'fields' for a sparse fieldset,
+                and an 'If-None-Match' header with a previous ETag
 
 
         Returns:
             Response (HttpResponse): object containing API response
                 information, specifically a 'detail' object of
                 TagSerializer data containing queryset of Tag
-                database or error if no data found and 'status'
-                integer with standard Http status code
+                database or error if no data found, a 'next_cursor'
+                token if paginated, 'ETag' and 'Last-Modified' headers
+                and 'status' integer with standard Http status code
+                (304 without body if the ETag still matches)
         '''
+        headers: dict = collection_headers(request.data.get('user'),
+                                           'user_tags', request.data)
+        if not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        if 'page_size' in request.data or 'cursor' in request.data:
+            return self.user_tags_page(request, headers)
+
         try:
             userId: str = request.data['user']
-            response = find_tags_by_user(userId)
+            fields: list = parse_fields(request.data.get('fields'))
+            response = find_tags_by_user(userId, fields)
             if response[1] == status.HTTP_404_NOT_FOUND:
                 return Response({'detail': response[0]},
                                 status=status.HTTP_207_MULTI_STATUS)
-        except KeyError:
+        except (KeyError, ValueError):
             return Response({'detail': invalid_request_body},
                             status=status.HTTP_400_BAD_REQUEST)
 
         queryset: QuerySet[Tag] = response[0]
-        serializer = TagSerializer(queryset, many=True)
+        serializer = TagSerializer(queryset, many=True, fields=fields)
         return Response({'detail': serializer.data},
-                        status=status.HTTP_200_OK)
+                        status=status.HTTP_200_OK, headers=headers)
+
+    def user_tags_page(self, request, headers: dict = None) -> Response:
+        # Return one keyset page of user tags with next cursor token
+        try:
+            userId: str = request.data['user']
+            fields: list = parse_fields(request.data.get('fields'))
+        except (KeyError, ValueError):
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = find_tag_page(userId, request.data.get('page_size'),
+                                 request.data.get('cursor'), fields)
+        if response[1] == status.HTTP_400_BAD_REQUEST:
+            return Response({'detail': response[0]}, status=response[1])
+        if response[1] == status.HTTP_404_NOT_FOUND:
+            return Response({'detail': response[0]},
+                            status=status.HTTP_207_MULTI_STATUS)
+
+        page, next_cursor = response[0]
+        serializer = TagSerializer(page, many=True, fields=fields)
+        return Response({'detail': serializer.data,
+                         'next_cursor': next_cursor},
+                        status=status.HTTP_200_OK, headers=headers)
 
     @method_decorator(ensure_csrf_cookie)
     @action(methods=['post'], detail=False)
@@ -187,12 +227,15 @@ class TagViewSet(viewsets.ViewSet):
         Args:
             request (obj): object from client request, specifically
                 must contain a dictionary with a 'tag_id' string,
-                'user' id string, and field(s) to be updated in request.data
+                'user' id string, and field(s) to be updated in request.data,
+                and optionally the 'base_version' of the tag they were
+                made against
 
         Returns:
             Response (HttpResponse): object containing API response
                 information, specifically a 'detail' string
-                response message and 'status' integer with
+                response message, the tag's new (or, with status 409,
+                current) 'version' and 'status' integer with
                 standard Http status code
         '''
         try:
@@ -213,16 +256,67 @@ class TagViewSet(viewsets.ViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
 
         tag: Tag = response[0]
-        serializer = TagSerializer(tag, data=request.data,
-                                   partial=True)
+        try:
+            base_version: int = parse_base_version(request.data)
+        except ValueError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = TagSerializer(tag, data=request.data, partial=True,
+                                   context={'base_version': base_version})
         if not serializer.is_valid():
             return Response({'detail': tag_update_failed},
                             status=status.HTTP_400_BAD_REQUEST)
-        serializer.save()
+        try:
+            serializer.save()
+        except VersionConflict as conflict:
+            return Response({'detail': tag_conflict,
+                             'version': conflict.version},
+                            status=status.HTTP_409_CONFLICT)
         tag: dict = serializer.data
-        return Response({'detail': tag['id']},
+        return Response({'detail': tag['id'], 'version': tag['version']},
                         status=status.HTTP_200_OK)
 
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def bulk_operation(self, request) -> Response:
+        ''' bulk_operation: 'POST' route for
+                'dashboard/tags/bulk_operation' to apply or remove a
+                specific Tag instance on many journals, merge it into
+                another tag or rename it, as one transaction
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'tag_id' and 'user' id
+                strings and an 'operation' string in request.data, plus
+                'journal_ids' list, 'date_range' or 'search_type' and
+                'search_text' (apply / remove), 'target_id' (merge) or
+                'name' (rename)
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' dictionary with
+                'operation', resulting 'tag_id' and number of changed
+                'journals' or string response message and 'status'
+                integer with standard Http status code
+        '''
+        try:
+            operation: str = request.data['operation']
+            response = find_tag_by_id(request.data['tag_id'],
+                                      userId=request.data['user'])
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        tag: Tag = response[0]
+        response = run_tag_operation(tag, operation, request.data)
+        if response[1] == status.HTTP_404_NOT_FOUND:
+            return Response({'detail': response[0]},
+                            status=status.HTTP_207_MULTI_STATUS)
+        return Response({'detail': response[0]}, status=response[1])
+
     @method_decorator(ensure_csrf_cookie)
     @action(methods=['delete'], detail=False)
     def remove_tag(self, request) -> Response:
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_backend(sender, using, **kwargs) -> None:
+    # Create FTS5 table and sync triggers once tables exist
+    from .fts import install_fts
+    install_fts(using)
 
 
 class JournalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'journal'
+
+    def ready(self) -> None:
+        post_migrate.connect(install_search_backend, sender=self)
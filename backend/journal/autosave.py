@@ -0,0 +1,304 @@
+import atexit
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from .models import Journal
+from .serializers import JournalSerializer
+from .utils.text import content_hash
+from login.serializers.custom import VersionConflict
+
+
+logger = logging.getLogger(__name__)
+
+# Journal fields an autosave may change (other updates are not buffered)
+AUTOSAVE_FIELDS = ('title', 'content')
+
+# Write times kept before entries older than the interval are dropped
+AUTOSAVE_TRACKED = 1024
+
+
+def stored_hash(journal: Journal) -> str:
+    # Hash of a Journal instance's stored content
+    return journal.content_hash or content_hash(journal.content)
+
+
+class AutosaveBuffer:
+    ''' AutosaveBuffer: latest unsaved title / content of each journal
+            being edited in this API process, written at most once per
+            settings.AUTOSAVE_FLUSH_INTERVAL seconds per journal so the
+            number of write transactions does not grow with the number
+            of autosave requests
+
+            Each pending state remembers the journal version (and the
+            title and content hash) it was based on and is written with
+            that version as guard. If another process saved the journal
+            in between without changing title or content (e.g. its tags)
+            the state is rebased and written, otherwise it is kept as a
+            conflict and reported (with the unsaved fields) by the next
+            autosave or update of that journal instead of being lost
+    '''
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # journal id -> {'fields': dict, 'origin': int,
+        # 'base_version': int, 'base_title': str, 'base_hash': str,
+        # 'conflict': int | None}
+        self.pending: dict = {}
+        # journal id -> monotonic time of last write
+        self.written: dict = {}
+        # journal id -> (origin, version) of last buffered write
+        self.flushed: dict = {}
+        self.timers: dict = {}
+
+    def resolve(self, journal: Journal, base_version: int) -> int:
+        ''' resolve: function to move a client's base version past the
+                buffered writes of its own autosaves, which the client
+                only learns about from its next response
+
+            Args:
+                journal (Journal): Journal instance as loaded by the
+                    request
+                base_version (int): version the client based its
+                    request on
+
+            Returns:
+                int: version to check the request against
+        '''
+        with self.lock:
+            flushed: tuple = self.flushed.get(journal.id)
+        if flushed is not None and flushed[0] == base_version:
+            return flushed[1]
+        return base_version
+
+    def rebase(self, entry: dict, journal: Journal) -> bool:
+        # Move an entry onto the stored version of its journal if that
+        # version only changed fields the autosave does not touch
+        if journal.version == entry['base_version']:
+            return True
+        if (journal.title != entry['base_title'] or
+                stored_hash(journal) != entry['base_hash']):
+            return False
+        entry['base_version'] = journal.version
+        return True
+
+    def conflict(self, journalId, entry: dict, version: int,
+                 fields: dict = None) -> VersionConflict:
+        # Build the conflict reported to the client, which now holds the
+        # unsaved fields, and stop buffering the journal
+        self.pending.pop(journalId, None)
+        timer = self.timers.pop(journalId, None)
+        if timer is not None:
+            timer.cancel()
+        return VersionConflict(version, {**entry['fields'], **(fields or {})})
+
+    def add(self, journal: Journal, fields: dict,
+            base_version: int = None) -> bool:
+        ''' add: function to buffer validated autosave fields of a
+                Journal instance, writing them right away if the journal
+                was not written during the last interval
+
+            Args:
+                journal (Journal): Journal instance as loaded by the
+                    request
+                fields (dict): validated 'title' and / or 'content'
+                base_version (int): version the client based the
+                    autosave on (optional, checked right away)
+
+            Returns:
+                bool: True if fields are still pending
+
+            Raises:
+                VersionConflict: base_version is stale, or buffered
+                    fields could not be written because the journal's
+                    title or content was changed by another update
+                    (carries the unsaved fields)
+        '''
+        interval: float = settings.AUTOSAVE_FLUSH_INTERVAL
+        stale: bool = (base_version is not None and
+                       self.resolve(journal, base_version) != journal.version)
+        with self.lock:
+            entry: dict = self.pending.get(journal.id)
+            if stale:
+                raise self.conflict(journal.id, entry or {'fields': {}},
+                                    journal.version, fields)
+            if entry is not None and (entry['conflict'] is not None or
+                                      not self.rebase(entry, journal)):
+                raise self.conflict(journal.id, entry, journal.version,
+                                    fields)
+            if entry is None:
+                entry = self.pending[journal.id] = {
+                    'fields': {}, 'origin': journal.version,
+                    'base_version': journal.version,
+                    'base_title': journal.title,
+                    'base_hash': stored_hash(journal), 'conflict': None}
+            entry['fields'].update(fields)
+            wait: float = (self.written.get(journal.id, float('-inf')) +
+                           interval - time.monotonic())
+            if wait > 0 and journal.id not in self.timers:
+                timer = threading.Timer(wait, self.flush_in_thread,
+                                        [journal.id])
+                timer.daemon = True
+                self.timers[journal.id] = timer
+                timer.start()
+        if wait > 0:
+            return True
+        self.flush(journal.id, journal)
+        return False
+
+    def take(self, journal: Journal) -> dict:
+        ''' take: function to remove and return the pending state of a
+                journal, so an explicit update can write its fields with
+                its own changes (or restore it if that update fails)
+
+            Args:
+                journal (Journal): Journal instance as loaded by the
+                    request
+
+            Returns:
+                dict: pending state with 'fields' (None if none)
+
+            Raises:
+                VersionConflict: buffered fields could not be written
+                    because the journal's title or content was changed
+                    by another update (carries the unsaved fields)
+        '''
+        with self.lock:
+            entry: dict = self.pending.get(journal.id)
+            if entry is None:
+                return None
+            if entry['conflict'] is not None or not self.rebase(entry,
+                                                                journal):
+                raise self.conflict(journal.id, entry, journal.version)
+            self.pending.pop(journal.id)
+            timer = self.timers.pop(journal.id, None)
+            if timer is not None:
+                timer.cancel()
+            self.written[journal.id] = time.monotonic()
+        return entry
+
+    def flush(self, journalId, journal: Journal = None) -> bool:
+        ''' flush: function to write pending fields of a journal now,
+                skipping the write when they match what is stored
+
+            Args:
+                journalId (UUID): id of Journal instance
+                journal (Journal): instance just loaded by the caller
+                    (optional, loaded here if None)
+
+            Returns:
+                bool: True if the journal was written
+        '''
+        now: float = time.monotonic()
+        with self.lock:
+            timer = self.timers.pop(journalId, None)
+            if timer is not None:
+                timer.cancel()
+            entry: dict = self.pending.get(journalId)
+            if entry is None or entry['conflict'] is not None:
+                return False
+            self.pending.pop(journalId)
+            if len(self.written) >= AUTOSAVE_TRACKED:
+                oldest: float = now - settings.AUTOSAVE_FLUSH_INTERVAL
+                self.written = {key: value for key, value
+                                in self.written.items() if value > oldest}
+                self.flushed = {key: value for key, value
+                                in self.flushed.items()
+                                if key in self.written}
+            self.written[journalId] = now
+
+        if journal is None:
+            journal = Journal.objects.filter(id=journalId).first()
+        if journal is None:
+            return False
+        if not self.rebase(entry, journal):
+            self.restore(journalId, entry, journal.version)
+            return False
+        if is_unchanged(journal, entry['fields']):
+            return False
+        serializer = JournalSerializer(
+            journal, data=entry['fields'], partial=True,
+            context={'base_version': entry['base_version']})
+        if not serializer.is_valid():
+            logger.warning('Dropped invalid autosave of journal %s: %s',
+                           journalId, serializer.errors)
+            return False
+        try:
+            serializer.save()
+        except VersionConflict:
+            # Saved elsewhere since loaded: retry once if that save left
+            # title and content alone, else keep the state as a conflict
+            journal = Journal.objects.filter(id=journalId).first()
+            if journal is None:
+                return False
+            if not self.rebase(entry, journal):
+                self.restore(journalId, entry, journal.version)
+                return False
+            serializer = JournalSerializer(
+                journal, data=entry['fields'], partial=True,
+                context={'base_version': entry['base_version']})
+            serializer.is_valid()
+            try:
+                serializer.save()
+            except VersionConflict as conflict:
+                self.restore(journalId, entry, conflict.version)
+                return False
+        with self.lock:
+            self.flushed[journalId] = (entry['origin'],
+                                       serializer.instance.version)
+        return True
+
+    def restore(self, journalId, entry: dict, conflict: int = None) -> None:
+        ''' restore: function to put back a pending state that was not
+                written, to be written or (with conflict) reported by
+                the next autosave or update of the journal
+
+            Args:
+                journalId (UUID): id of Journal instance
+                entry (dict): pending state as returned by take
+                conflict (int): current version of the journal if the
+                    state conflicts with it (optional)
+        '''
+        if conflict is not None:
+            logger.warning('Autosave of journal %s conflicts with '
+                           'version %s.', journalId, conflict)
+        with self.lock:
+            newer: dict = self.pending.get(journalId)
+            if newer is not None:
+                # Autosaves received meanwhile go on top
+                entry['fields'].update(newer['fields'])
+                conflict = (conflict if conflict is not None
+                            else newer['conflict'])
+            entry['conflict'] = conflict
+            self.pending[journalId] = entry
+
+    def flush_in_thread(self, journalId) -> None:
+        # Timer callback: flush, then release this thread's connection
+        try:
+            self.flush(journalId)
+        finally:
+            connection.close()
+
+    def flush_all(self) -> int:
+        # Write every pending journal (explicit flush or shutdown)
+        with self.lock:
+            journal_ids: list = list(self.pending)
+        return sum(self.flush(journal_id) for journal_id in journal_ids)
+
+
+def is_unchanged(journal: Journal, fields: dict) -> bool:
+    # True if writing fields would not change a Journal instance
+    if 'title' in fields and fields['title'] != journal.title:
+        return False
+    return ('content' not in fields or
+            content_hash(fields['content']) == stored_hash(journal))
+
+
+autosave_buffer = AutosaveBuffer()
+
+
+@atexit.register
+def flush_autosaves() -> None:
+    # Write pending autosaves before the API process exits
+    autosave_buffer.flush_all()
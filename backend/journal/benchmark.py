@@ -0,0 +1,342 @@
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import (datetime, timedelta, timezone)
+import django
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .models import (Journal, ExportJob)
+from .exports import (submit_export, expire_export)
+from .serializers import JournalSerializer
+from dashboard.models.tag import Tag
+from dashboard.serializers.tag import TagSerializer
+from login.models.user import User
+
+
+JOURNALS = '/journal/journals'
+TAGS = '/dashboard/tags'
+STATS = '/dashboard/stats'
+SYNC = '/dashboard/sync'
+USERS = '/login/users'
+
+# Records sent per 'journals.import_journals' request
+IMPORT_RECORDS = 1000
+
+
+def now() -> datetime:
+    # Current time without microseconds, as stored by the frontend
+    return datetime.now(tz=timezone.utc).replace(microsecond=0)
+
+
+def new_journal(ctx: dict, run: int) -> Journal:
+    # Untimed setup: create a journal to be deleted by the route
+    serializer = JournalSerializer(data={
+        'user': ctx['user'].id, 'date_created': now(),
+        'title': f'Disposable {run}', 'content': ctx['journal'].content,
+        'tag_list': [str(ctx['tag'].id)]})
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def new_tag(ctx: dict, run: int) -> Tag:
+    # Untimed setup: create a tag to be deleted by the route
+    serializer = TagSerializer(data={
+        'user': ctx['user'].id, 'date_created': now(),
+        'name': f'Disposable {ctx["key"]} {run}'})
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def finished_export(ctx: dict) -> ExportJob:
+    # Untimed setup: submit one export and wait until it has finished
+    if 'export_job' not in ctx:
+        job: ExportJob = submit_export(ctx['user'], ctx['journal'].content)
+        while expire_export(job).status == ExportJob.PENDING:
+            time.sleep(0.05)
+            job.refresh_from_db()
+        ctx['export_job'] = job
+    return ctx['export_job']
+
+
+def user_data(ctx: dict, **data) -> dict:
+    # Request body for routes scoped to the benchmarked user
+    return {'user': str(ctx['user'].id), **data}
+
+
+# Benchmarked routes: name -> function(ctx, run) returning
+# (method, url, data); any setup inside the function is not timed
+ROUTES: dict = {
+    'journals.add_journal': lambda ctx, run: (
+        'post', f'{JOURNALS}/add_journal', user_data(
+            ctx, title=f'Benchmark {run}', content=ctx['journal'].content,
+            tag_list=[str(ctx['tag'].id)])),
+    'journals.list': lambda ctx, run: ('get', JOURNALS, None),
+    'journals.user_journals': lambda ctx, run: (
+        'post', f'{JOURNALS}/user_journals', user_data(ctx)),
+    'journals.user_journals.page': lambda ctx, run: (
+        'post', f'{JOURNALS}/user_journals',
+        user_data(ctx, page_size=50, sort='date', order='desc')),
+    'journals.user_journals.fields': lambda ctx, run: (
+        'post', f'{JOURNALS}/user_journals',
+        user_data(ctx, fields='id,title,date_created')),
+    'journals.search_journals.title': lambda ctx, run: (
+        'post', f'{JOURNALS}/search_journals',
+        user_data(ctx, search_type='title', search_text='morning')),
+    'journals.search_journals.content': lambda ctx, run: (
+        'post', f'{JOURNALS}/search_journals',
+        user_data(ctx, search_type='content', search_text='harbour')),
+    'journals.search_journals.tags': lambda ctx, run: (
+        'post', f'{JOURNALS}/search_journals',
+        user_data(ctx, search_type='tags', search_text=ctx['tag'].name)),
+    'journals.search_journals.date': lambda ctx, run: (
+        'post', f'{JOURNALS}/search_journals', user_data(
+            ctx, search_type='date',
+            search_text=str(ctx['journal'].date_created.year))),
+    'journals.get_journal': lambda ctx, run: (
+        'post', f'{JOURNALS}/get_journal',
+        user_data(ctx, journal_id=str(ctx['journal'].id))),
+    'journals.export_journal': lambda ctx, run: (
+        'post', f'{JOURNALS}/export_journal',
+        user_data(ctx, html_content=ctx['journal'].content)),
+    'journals.export_journal.journal_id': lambda ctx, run: (
+        'post', f'{JOURNALS}/export_journal',
+        user_data(ctx, journal_id=str(ctx['journal'].id))),
+    'journals.export_journal.download': lambda ctx, run: (
+        'post', f'{JOURNALS}/export_journal',
+        user_data(ctx, html_content=ctx['journal'].content, download=True)),
+    'journals.batch_export.pdf': lambda ctx, run: (
+        'post', f'{JOURNALS}/batch_export',
+        user_data(ctx, tag_id=str(ctx['tag'].id))),
+    'journals.batch_export.zip': lambda ctx, run: (
+        'post', f'{JOURNALS}/batch_export',
+        user_data(ctx, tag_id=str(ctx['tag'].id), format='zip')),
+    'journals.export_cache': lambda ctx, run: (
+        'get', f'{JOURNALS}/export_cache', None),
+    'journals.export_account': lambda ctx, run: (
+        'post', f'{JOURNALS}/export_account', user_data(ctx)),
+    'journals.import_journals': lambda ctx, run: (
+        'post', f'{JOURNALS}/import_journals', user_data(ctx, journals=[
+            {'title': f'Imported {run} {number}',
+             'content': ctx['journal'].content,
+             'tags': [str(ctx['tags'][number % len(ctx['tags'])].id)]}
+            for number in range(IMPORT_RECORDS)])),
+    'journals.submit_export': lambda ctx, run: (
+        'post', f'{JOURNALS}/submit_export',
+        user_data(ctx, html_content=ctx['journal'].content)),
+    'journals.export_status': lambda ctx, run: (
+        'post', f'{JOURNALS}/export_status',
+        user_data(ctx, job_id=str(finished_export(ctx).id))),
+    'journals.download_export': lambda ctx, run: (
+        'post', f'{JOURNALS}/download_export',
+        user_data(ctx, job_id=str(finished_export(ctx).id))),
+    'journals.update_journal': lambda ctx, run: (
+        'patch', f'{JOURNALS}/update_journal', user_data(
+            ctx, journal_id=str(ctx['journal'].id),
+            title=f'Updated {run}',
+            content=ctx['journal'].content + '<p>' + str(run) + '</p>',
+            tag_list=[str(ctx['tags'][run % len(ctx['tags'])].id)])),
+    'journals.remove_journal': lambda ctx, run: (
+        'delete', f'{JOURNALS}/remove_journal',
+        user_data(ctx, journal_id=str(new_journal(ctx, run).id))),
+    'tags.add_tag': lambda ctx, run: (
+        'post', f'{TAGS}/add_tag',
+        user_data(ctx, name=f'Benchmark {ctx["key"]} {run}')),
+    'tags.list': lambda ctx, run: ('get', TAGS, None),
+    'tags.user_tags': lambda ctx, run: (
+        'post', f'{TAGS}/user_tags', user_data(ctx)),
+    'tags.user_tags.page': lambda ctx, run: (
+        'post', f'{TAGS}/user_tags', user_data(ctx, page_size=50)),
+    'tags.get_tag': lambda ctx, run: (
+        'post', f'{TAGS}/get_tag', user_data(ctx, tag_id=str(ctx['tag'].id))),
+    'tags.check_name': lambda ctx, run: (
+        'post', f'{TAGS}/check_name', user_data(ctx,
+                                                tag_name=ctx['tag'].name)),
+    'tags.update_tag': lambda ctx, run: (
+        'patch', f'{TAGS}/update_tag', user_data(
+            ctx, tag_id=str(ctx['tag'].id),
+            name=f'Renamed {ctx["key"]} {run}')),
+    'tags.bulk_operation': lambda ctx, run: (
+        'post', f'{TAGS}/bulk_operation', user_data(
+            ctx, tag_id=str(ctx['tag'].id),
+            operation='remove' if run % 2 else 'apply', search_type='date',
+            search_text=str(ctx['journal'].date_created.year))),
+    'tags.remove_tag': lambda ctx, run: (
+        'delete', f'{TAGS}/remove_tag',
+        user_data(ctx, tag_id=str(new_tag(ctx, run).id))),
+    'stats.user_stats': lambda ctx, run: (
+        'post', f'{STATS}/user_stats', user_data(ctx)),
+    'sync.changes': lambda ctx, run: (
+        'post', f'{SYNC}/changes',
+        user_data(ctx, watermark=(now() - timedelta(minutes=1)).isoformat())),
+    'users.create': lambda ctx, run: ('post', USERS, {
+        'email': f'new{ctx["key"]}{run}@example.com',
+        'username': f'n{ctx["key"]}{run}', 'first_name': 'New',
+        'last_name': 'User', 'email_verified': False,
+        'password': 'Benchmark-Password-1'}),
+    'users.list': lambda ctx, run: ('get', USERS, None),
+    'users.retrieve': lambda ctx, run: (
+        'get', f'{USERS}/{ctx["user"].id}', None),
+    'users.partial_update': lambda ctx, run: (
+        'patch', f'{USERS}/{ctx["user"].id}',
+        {'first_name': f'Changed{run % 10}'}),
+}
+
+
+def percentile(values: list, percent: float) -> float:
+    ''' percentile: function to get the nearest-rank percentile of
+            a list of numbers
+
+        Args:
+            values (list): measured values
+            percent (float): percentile between 0 and 100
+
+        Returns:
+            float: percentile value (0 for an empty list)
+    '''
+    if not values:
+        return 0.0
+    ordered: list = sorted(values)
+    rank: int = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def git_revision() -> str:
+    # Current commit hash, so results can be compared between commits
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def benchmark_context(user: User = None) -> dict:
+    ''' benchmark_context: function to pick the User instance (by
+            default the one with the most journals) and sample journal
+            and tag used as route arguments
+
+        Args:
+            user (User): optional User instance to benchmark
+
+        Returns:
+            dict: 'user', 'journal', 'tag', 'tags' and unique 'key'
+    '''
+    if user is None:
+        user = User.objects.annotate(
+            num_journals=Count('journals')).order_by('-num_journals')[0]
+    tags: list = list(Tag.objects.filter(user=user).order_by('name')[:10])
+    journal: Journal = Journal.objects.filter(
+        user=user, tags__isnull=False).order_by('date_created').first()
+    if journal is None or not tags:
+        raise ValueError('Benchmarked user needs tagged journals.')
+    return {'user': user, 'journal': journal, 'tag': tags[0], 'tags': tags,
+            'key': format(time.time_ns() % 16 ** 8, 'x')}
+
+
+def send(client: APIClient, method: str, url: str, data: dict) -> int:
+    # Send one request, reading streamed bodies in full, and return status
+    response = getattr(client, method)(url, data, format='json')
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+    return response.status_code
+
+
+def measure_route(client: APIClient, build, ctx: dict, iterations: int,
+                  warmup: int) -> dict:
+    ''' measure_route: function to send a route repeatedly and measure
+            latency and queries per request, then peak Python memory
+            allocated by one extra traced request
+
+        Args:
+            client (APIClient): DRF test client
+            build (function): ROUTES entry building the request
+            ctx (dict): benchmark context from benchmark_context
+            iterations (int): number of timed requests
+            warmup (int): number of untimed requests sent first
+
+        Returns:
+            dict: latency percentiles in milliseconds, queries per
+                request, peak memory in KiB and response statuses
+    '''
+    for run in range(warmup):
+        send(client, *build(ctx, run))
+
+    latencies: list = []
+    queries: list = []
+    statuses: set = set()
+    for run in range(warmup, warmup + iterations):
+        request: tuple = build(ctx, run)
+        with CaptureQueriesContext(connection) as context:
+            start: float = time.perf_counter()
+            statuses.add(send(client, *request))
+            latencies.append(time.perf_counter() - start)
+        queries.append(len(context.captured_queries))
+
+    # Memory is traced separately since tracemalloc slows requests down
+    request: tuple = build(ctx, warmup + iterations)
+    tracemalloc.start()
+    try:
+        send(client, *request)
+        peak: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'queries': max(queries),
+        'queries_min': min(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'statuses': sorted(statuses),
+    }
+
+
+def run_benchmark(iterations: int = 50, warmup: int = 3,
+                  routes: list = None, label: str = '',
+                  params: dict = None) -> dict:
+    ''' run_benchmark: function to drive every API route through the
+            test client against the current database
+
+        Args:
+            iterations (int): number of timed requests per route
+            warmup (int): number of untimed requests per route
+            routes (list): optional subset of ROUTES names
+            label (str): free text stored with the results
+            params (dict): dataset parameters stored with the results
+
+        Returns:
+            dict: 'meta' information and per-route 'routes' results
+    '''
+    ctx: dict = benchmark_context()
+    client = APIClient()
+    results: dict = {}
+    for name in routes or ROUTES:
+        results[name] = measure_route(client, ROUTES[name], ctx,
+                                      iterations, warmup)
+    return {
+        'meta': {
+            'label': label,
+            'git_revision': git_revision(),
+            'created': now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'warmup': warmup,
+            'params': params or {},
+            'user_journals': Journal.objects.filter(
+                user=ctx['user']).count(),
+            'user_tags': Tag.objects.filter(user=ctx['user']).count(),
+            'total_journals': Journal.objects.count(),
+            'total_users': User.objects.count(),
+        },
+        'routes': results,
+    }
@@ -0,0 +1,191 @@
+import random
+import uuid
+from datetime import (datetime, timedelta, timezone)
+from django.db import transaction
+from .models import Journal
+from .indexing import rebuild_search_index
+from .utils.slate import serialize_document
+from .utils.text import content_fields
+from dashboard.functions.stats import recompute_user_stats
+from dashboard.models.tag import Tag
+from login.models.user import User
+
+
+# Vocabulary used to build synthetic journal text
+WORDS = ('morning walk harbour coffee notes meeting project garden rain '
+         'friend dinner book chapter idea plan weekend travel train city '
+         'river mountain quiet busy tired happy grateful focus write read '
+         'learn music family phone email budget health run swim cook '
+         'market sunset evening night dream memory letter gift').split()
+
+# Supported distributions for number of journals per user
+DISTRIBUTIONS = ('fixed', 'uniform', 'pareto')
+
+
+def random_sentence(rng: random.Random) -> str:
+    # Build a capitalized sentence of random vocabulary words
+    words: list = rng.choices(WORDS, k=rng.randint(6, 18))
+    return ' '.join(words).capitalize() + '.'
+
+
+def random_leaves(rng: random.Random) -> list:
+    # Build text leaves of a block, some with bold / italic marks
+    leaves: list = []
+    for _ in range(rng.randint(1, 3)):
+        leaf: dict = {'text': random_sentence(rng) + ' '}
+        mark: float = rng.random()
+        if mark < 0.15:
+            leaf['bold'] = True
+        elif mark < 0.25:
+            leaf['italic'] = True
+        leaves.append(leaf)
+    return leaves
+
+
+def random_block(rng: random.Random) -> dict:
+    ''' random_block: function to build one top level Slate element
+            with the element types supported by the frontend editor
+
+        Args:
+            rng (Random): seeded random generator
+
+        Returns:
+            dict: Slate element node
+    '''
+    kind: float = rng.random()
+    if kind < 0.1:
+        return {'type': 'heading', 'level': rng.randint(1, 3),
+                'align': 'left', 'children': [
+                    {'text': ' '.join(rng.choices(WORDS, k=3)).title()}]}
+    if kind < 0.2:
+        return {'type': 'list', 'children': [
+            {'type': 'list-item', 'children': [
+                {'text': ' '.join(rng.choices(WORDS, k=4))}]}
+            for _ in range(rng.randint(2, 5))]}
+    if kind < 0.25:
+        return {'type': 'code', 'children': [
+            {'text': 'print("' + rng.choice(WORDS) + '")'}]}
+    if kind < 0.3:
+        return {'type': 'paragraph', 'align': 'left', 'children': [
+            *random_leaves(rng),
+            {'type': 'link', 'url': 'https://example.com/' +
+             rng.choice(WORDS), 'children': [{'text': rng.choice(WORDS)}]},
+            {'text': ''}]}
+    if kind < 0.33:
+        return {'type': 'paragraph', 'align': 'left',
+                'children': [{'text': ''}]}
+    return {'type': 'paragraph', 'align': rng.choice(['left', 'justify']),
+            'children': random_leaves(rng)}
+
+
+def random_document(rng: random.Random, paragraphs: int) -> list:
+    ''' random_document: function to build a Slate editor value with
+            around the requested number of blocks
+
+        Args:
+            rng (Random): seeded random generator
+            paragraphs (int): mean number of top level blocks
+
+        Returns:
+            list: Slate node array
+    '''
+    count: int = max(1, int(rng.expovariate(1 / paragraphs)))
+    return [random_block(rng) for _ in range(count)]
+
+
+def journal_count_for(rng: random.Random, distribution: str,
+                      mean: int) -> int:
+    ''' journal_count_for: function to draw number of journals for
+            one user from the configured distribution
+
+        Args:
+            rng (Random): seeded random generator
+            distribution (str): 'fixed', 'uniform' or 'pareto'
+            mean (int): mean number of journals per user
+
+        Returns:
+            int: number of journals
+    '''
+    if distribution == 'fixed':
+        return mean
+    if distribution == 'uniform':
+        return rng.randint(0, 2 * mean)
+    # Heavy tail: most users write a little, a few write a lot
+    alpha: float = 1.5
+    return int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha)
+
+
+def generate_dataset(users: int, journals: int, tags: int,
+                     distribution: str = 'pareto', paragraphs: int = 8,
+                     seed: int = 0, batch_size: int = 500) -> dict:
+    ''' generate_dataset: function to create synthetic users with tags
+            and journals containing realistic editor content, using bulk
+            inserts and rebuilding derived search data afterwards
+
+        Args:
+            users (int): number of User instances to create
+            journals (int): mean number of journals per user
+            tags (int): number of tags per user
+            distribution (str): distribution of journals per user
+            paragraphs (int): mean number of blocks per journal
+            seed (int): random seed for reproducible datasets
+            batch_size (int): rows written per bulk insert
+
+        Returns:
+            dict: counts of created 'users', 'tags' and 'journals' and
+                list of created 'user_ids'
+    '''
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f'Unknown distribution: {distribution}')
+
+    rng = random.Random(seed)
+    now: datetime = datetime.now(tz=timezone.utc).replace(microsecond=0)
+    # Unique per run so datasets can be generated repeatedly
+    prefix: str = uuid.uuid4().hex[:6]
+    totals: dict = {'users': 0, 'tags': 0, 'journals': 0, 'user_ids': []}
+    through = Journal.tags.through
+
+    for user_index in range(users):
+        with transaction.atomic():
+            user: User = User.objects.create(
+                email=f'bench{prefix}u{user_index}@example.com',
+                username=f'b{prefix}{user_index}', first_name='Bench',
+                last_name='User', email_verified=True,
+                password='Benchmark-Password-1', date_created=now,
+                last_login=now)
+            user_tags: list = Tag.objects.bulk_create([
+                Tag(user=user, date_created=now,
+                    name=f'Tag {prefix} {user_index} {index}')
+                for index in range(tags)], batch_size=batch_size)
+
+            new_journals: list = []
+            tag_rows: list = []
+            for _ in range(journal_count_for(rng, distribution, journals)):
+                content: str = serialize_document(
+                    random_document(rng, paragraphs))
+                journal = Journal(
+                    user=user, content=content,
+                    title=' '.join(rng.choices(WORDS, k=3)).title(),
+                    date_created=now - timedelta(
+                        days=rng.randint(0, 3 * 365),
+                        seconds=rng.randint(0, 86399)),
+                    **content_fields(content))
+                new_journals.append(journal)
+                for tag in rng.sample(user_tags,
+                                      k=min(len(user_tags),
+                                            rng.randint(0, 3))):
+                    tag_rows.append(through(journal_id=journal.id,
+                                            tag_id=tag.id))
+            Journal.objects.bulk_create(new_journals, batch_size=batch_size)
+            through.objects.bulk_create(tag_rows, batch_size=batch_size)
+            Tag.objects.filter(user=user).refresh_journal_counts()
+            recompute_user_stats([user.id])
+            User.objects.filter(id=user.id).touch_collection()
+            rebuild_search_index(Journal.objects.filter(user=user),
+                                 batch_size)
+
+        totals['users'] += 1
+        totals['tags'] += len(user_tags)
+        totals['journals'] += len(new_journals)
+        totals['user_ids'].append(user.id)
+    return totals
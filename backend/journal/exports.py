@@ -0,0 +1,608 @@
+import atexit
+import base64
+import multiprocessing
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from typing import Iterator
+from concurrent.futures import (Future, ProcessPoolExecutor, wait,
+                                FIRST_COMPLETED)
+from concurrent.futures.process import BrokenProcessPool
+from datetime import (datetime, timedelta, timezone)
+from pathlib import Path
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+from django.http import (FileResponse, HttpResponse)
+from rest_framework import status
+from rest_framework.response import Response
+from pypdf import PdfReader
+from pypdf.errors import PdfReadError
+from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject,
+                           NameObject, NumberObject, TextStringObject)
+from .models import (Journal, ExportJob)
+from .pdf_cache import (cache_key, cache_lookup, cache_path, cache_added)
+from .utils.pdf import render_pdf_file
+from .render import export_filename
+from .utils.slate import content_html
+from login.models.user import User
+
+
+# Extra seconds allowed after a job's timeout before it is considered
+# lost (e.g. worker process killed or API process restarted)
+EXPORT_GRACE_SECONDS = 30
+
+# Bytes copied per write when streaming pdfs into a zip archive
+ZIP_CHUNK = 65536
+
+_executor: ProcessPoolExecutor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    ''' get_executor: function to return the process pool shared by
+            all export requests of this API process, created on first
+            use with settings.EXPORT_MAX_WORKERS processes
+
+        Returns:
+            ProcessPoolExecutor: pool instance, or None when
+                EXPORT_MAX_WORKERS is 0 (render in request thread)
+    '''
+    global _executor
+    if settings.EXPORT_MAX_WORKERS == 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers do not inherit threads or db connections
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.EXPORT_MAX_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+@atexit.register
+def shutdown_executor() -> None:
+    # Stop worker processes with the API process, dropping queued jobs
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def discard_executor(executor: ProcessPoolExecutor) -> None:
+    # Drop a broken pool so the next export starts a new one
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_in_pool(function, *args) -> Future:
+    ''' run_in_pool: function to run a render function in the process
+            pool, or inline when the pool is disabled
+
+        Args:
+            function (function): picklable module level function
+            args (tuple): arguments passed to function
+
+        Returns:
+            Future: future resolving to the function result
+    '''
+    executor: ProcessPoolExecutor = get_executor()
+    if executor is not None:
+        try:
+            future: Future = executor.submit(function, *args)
+        except BrokenProcessPool:
+            # A worker died: replace the pool and retry once
+            discard_executor(executor)
+            executor = get_executor()
+            future = executor.submit(function, *args)
+
+        def discard_if_broken(done: Future) -> None:
+            # A worker died during the render: the pool runs no more jobs
+            if not done.cancelled() and isinstance(done.exception(),
+                                                   BrokenProcessPool):
+                discard_executor(executor)
+
+        future.add_done_callback(discard_if_broken)
+        return future
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as error:
+        future.set_exception(error)
+    return future
+
+
+def render_cached_pdf(html_content: str) -> Path:
+    ''' render_cached_pdf: function to return the cached pdf of an
+            html string, rendering it in a worker process on a cache
+            miss and waiting for the result, so the CPU bound render
+            does not hold the API process GIL
+
+        Args:
+            html_content (str): html string of journal content
+
+        Returns:
+            Path: path of pdf document in the cache
+
+        Raises:
+            ValueError: xhtml2pdf reported errors in the document
+            TimeoutError: render took longer than EXPORT_JOB_TIMEOUT
+            RuntimeError: render failed otherwise, e.g. its worker
+                process died (the pool is replaced for later renders)
+    '''
+    key: str = cache_key(html_content)
+    path: Path = cache_lookup(key)
+    if path is not None:
+        return path
+    timeout: float = settings.EXPORT_JOB_TIMEOUT
+    path = cache_path(key)
+    future: Future = run_in_pool(render_pdf_file, html_content, str(path),
+                                 timeout)
+    try:
+        size: int = future.result(timeout + EXPORT_GRACE_SECONDS)
+    except (ValueError, TimeoutError, RuntimeError):
+        raise
+    except Exception as error:
+        raise RuntimeError('Pdf render failed.') from error
+    cache_added(size)
+    return path
+
+
+def prerender_journals(queryset: QuerySet, chunk_size: int = 100) -> dict:
+    ''' prerender_journals: function to render pdfs of journals into
+            the pdf cache ahead of export requests, keeping at most two
+            renders per worker process in flight
+
+        Args:
+            queryset (QuerySet): Journal instances to render
+            chunk_size (int): journals loaded per database round trip
+
+        Returns:
+            dict: number of journals 'rendered', 'cached' (already in
+                the cache) and 'failed'
+    '''
+    totals: dict = {'rendered': 0, 'cached': 0, 'failed': 0}
+    limit: int = max(1, settings.EXPORT_MAX_WORKERS) * 2
+    timeout: float = settings.EXPORT_JOB_TIMEOUT
+    pending: set = set()
+
+    def collect(done: set) -> None:
+        # Record finished renders in the cache and the totals
+        for future in done:
+            try:
+                cache_added(future.result())
+                totals['rendered'] += 1
+            except Exception:
+                totals['failed'] += 1
+
+    journals: QuerySet = queryset.only('id', 'content').order_by('id')
+    for journal in journals.iterator(chunk_size=chunk_size):
+        html_content: str = content_html(journal.content)
+        path: Path = cache_path(cache_key(html_content))
+        if path.exists():
+            totals['cached'] += 1
+            continue
+        pending.add(run_in_pool(render_pdf_file, html_content, str(path),
+                                timeout))
+        if len(pending) >= limit:
+            done, pending = wait(pending, timeout + EXPORT_GRACE_SECONDS,
+                                 return_when=FIRST_COMPLETED)
+            collect(done)
+    done, pending = wait(pending, timeout + EXPORT_GRACE_SECONDS)
+    collect(done)
+    totals['failed'] += len(pending)
+    return totals
+
+
+def render_in_order(journals) -> Iterator[tuple]:
+    ''' render_in_order: function to render pdfs of journals in the
+            process pool, keeping up to two renders per worker in flight
+            ahead of the consumer, and yield them in input order
+
+        Args:
+            journals (iterable): Journal instances with content loaded
+
+        Yields:
+            tuple: (Journal instance, Path of cached pdf or None if its
+                render failed)
+    '''
+    limit: int = max(1, settings.EXPORT_MAX_WORKERS) * 2
+    timeout: float = settings.EXPORT_JOB_TIMEOUT
+    window: deque = deque()
+
+    def finish(journal: Journal, path: Path, future: Future) -> tuple:
+        # Wait for one render (if not a cache hit) and record it
+        if future is None:
+            return (journal, path)
+        try:
+            cache_added(future.result(timeout + EXPORT_GRACE_SECONDS))
+        except Exception:
+            return (journal, None)
+        return (journal, path)
+
+    try:
+        for journal in journals:
+            html_content: str = content_html(journal.content)
+            journal.content = None
+            key: str = cache_key(html_content)
+            path: Path = cache_lookup(key)
+            future: Future = None
+            if path is None:
+                path = cache_path(key)
+                future = run_in_pool(render_pdf_file, html_content,
+                                     str(path), timeout)
+            window.append((journal, path, future))
+            if len(window) >= limit:
+                yield finish(*window.popleft())
+        while window:
+            yield finish(*window.popleft())
+    finally:
+        # Client went away: drop renders that have not started
+        for _, _, future in window:
+            if future is not None:
+                future.cancel()
+
+
+def batch_entry_name(index: int, journal: Journal) -> str:
+    # Unique, date ordered file name of a journal inside a batch export
+    return (f'{index + 1:04d}_{journal.date_created:%Y-%m-%d}_'
+            f'{export_filename(journal)}')
+
+
+class _ZipStream:
+    ''' _ZipStream: write-only, non seekable file object collecting
+            bytes written by zipfile so they can be yielded as soon as
+            they are produced
+    '''
+
+    def __init__(self) -> None:
+        self.chunks: list = []
+        self.offset: int = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data: bytes = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _PdfSpool:
+    ''' _PdfSpool: pdf document built page by page in a file, each
+            object being written as soon as it is copied from its source
+            pdf, so only offsets and page numbers stay in memory
+    '''
+
+    def __init__(self, file) -> None:
+        self.file = file
+        self.offsets: list = []
+        self.pages: list = []
+        self.outline: list = []
+        file.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+        self.pages_number: int = self.reserve()
+
+    def reserve(self) -> int:
+        # Allocate the next object number
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def write(self, number: int, obj) -> None:
+        # Write an object with its number, recording its offset
+        self.offsets[number - 1] = self.file.tell()
+        self.file.write(f'{number} 0 obj\n'.encode())
+        obj.write_to_stream(self.file)
+        self.file.write(b'\nendobj\n')
+
+    def append(self, path: Path, title: str) -> None:
+        ''' append: function to copy all pages of a pdf file (and the
+                objects they use) to the end of the document, with an
+                outline item pointing at its first page
+
+            Args:
+                path (Path): path of pdf document to append
+                title (str): outline item title
+
+            Raises:
+                PdfReadError: path is not a readable pdf
+        '''
+        reader = PdfReader(str(path))
+        pages_ref = IndirectObject(self.pages_number, 0, None)
+        # (source id, generation) -> new number; the source page tree
+        # root maps to this document's
+        root = reader.trailer['/Root'].get_object().raw_get('/Pages')
+        numbers: dict = {(root.idnum, root.generation): self.pages_number}
+        sources: dict = {}
+        queue: deque = deque()
+
+        def renumber(reference: IndirectObject, obj=None) -> IndirectObject:
+            key: tuple = (reference.idnum, reference.generation)
+            if key not in numbers:
+                numbers[key] = self.reserve()
+                sources[key] = obj
+                queue.append(reference)
+            return IndirectObject(numbers[key], 0, None)
+
+        def remap(obj):
+            # Point references of obj (modified in place) at new numbers
+            if isinstance(obj, IndirectObject):
+                return renumber(obj)
+            if isinstance(obj, DictionaryObject):
+                for key, value in list(obj.items()):
+                    obj[key] = remap(value)
+            elif isinstance(obj, ArrayObject):
+                for index, value in enumerate(obj):
+                    obj[index] = remap(value)
+            return obj
+
+        # Pages as flattened by the reader (with inherited attributes)
+        page_refs: list = [renumber(page.indirect_reference, page)
+                           for page in reader.pages]
+        while queue:
+            reference: IndirectObject = queue.popleft()
+            key: tuple = (reference.idnum, reference.generation)
+            obj = sources.pop(key) or reference.get_object()
+            if (isinstance(obj, DictionaryObject) and
+                    obj.get('/Type') == '/Page'):
+                obj.pop('/Parent', None)
+                remap(obj)
+                obj[NameObject('/Parent')] = pages_ref
+            else:
+                remap(obj)
+            self.write(numbers[key], obj)
+        if page_refs:
+            self.outline.append((title, page_refs[0]))
+            self.pages.extend(page_refs)
+
+    def close(self) -> None:
+        # Write page tree, outline, catalog and cross-reference table
+        pages = DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(self.pages),
+            NameObject('/Count'): NumberObject(len(self.pages))})
+        self.write(self.pages_number, pages)
+        outline_number: int = self.reserve()
+        items: list = [self.reserve() for _ in self.outline]
+        outline_ref = IndirectObject(outline_number, 0, None)
+        for index, (title, page_ref) in enumerate(self.outline):
+            item = DictionaryObject({
+                NameObject('/Title'): TextStringObject(title),
+                NameObject('/Parent'): outline_ref,
+                NameObject('/Dest'): ArrayObject([page_ref,
+                                                  NameObject('/Fit')])})
+            if index > 0:
+                item[NameObject('/Prev')] = IndirectObject(
+                    items[index - 1], 0, None)
+            if index + 1 < len(items):
+                item[NameObject('/Next')] = IndirectObject(
+                    items[index + 1], 0, None)
+            self.write(items[index], item)
+        outline = DictionaryObject({
+            NameObject('/Type'): NameObject('/Outlines'),
+            NameObject('/Count'): NumberObject(len(items))})
+        if items:
+            outline[NameObject('/First')] = IndirectObject(items[0], 0, None)
+            outline[NameObject('/Last')] = IndirectObject(items[-1], 0, None)
+        self.write(outline_number, outline)
+        catalog_number: int = self.reserve()
+        self.write(catalog_number, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self.pages_number, 0, None),
+            NameObject('/Outlines'): outline_ref}))
+
+        xref: int = self.file.tell()
+        self.file.write(f'xref\n0 {len(self.offsets) + 1}\n'
+                        '0000000000 65535 f \n'.encode())
+        for offset in self.offsets:
+            # Objects of a pdf that failed half way are left unused
+            self.file.write(b'0000000000 65535 f \n' if offset is None
+                            else f'{offset:010d} 00000 n \n'.encode())
+        self.file.write(f'trailer\n<< /Size {len(self.offsets) + 1} '
+                        f'/Root {catalog_number} 0 R >>\n'
+                        f'startxref\n{xref}\n%%EOF\n'.encode())
+
+
+def stream_zip(journals) -> Iterator[bytes]:
+    ''' stream_zip: function to build a zip archive of journal pdfs
+            incrementally, yielding each piece as it is written so the
+            archive is never held in memory (pdfs are stored without
+            recompression, failed renders are listed in 'errors.txt')
+
+        Args:
+            journals (iterable): Journal instances with content loaded
+
+        Yields:
+            bytes: next part of the zip archive
+    '''
+    stream = _ZipStream()
+    failed: list = []
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        for index, (journal, path) in enumerate(render_in_order(journals)):
+            name: str = batch_entry_name(index, journal)
+            if path is None:
+                failed.append(name)
+                continue
+            entry = zipfile.ZipInfo(
+                name, journal.date_created.timetuple()[:6])
+            try:
+                with open(path, 'rb') as source, \
+                        archive.open(entry, 'w') as target:
+                    for block in iter(lambda: source.read(ZIP_CHUNK), b''):
+                        target.write(block)
+                        yield stream.pop()
+            except FileNotFoundError:
+                failed.append(name)
+            yield stream.pop()
+        if failed:
+            archive.writestr('errors.txt', 'Unable to create pdf for:\n' +
+                             '\n'.join(failed) + '\n')
+    yield stream.pop()
+
+
+def merge_pdfs(journals) -> tuple:
+    ''' merge_pdfs: function to render journals in parallel and merge
+            their pdfs, in order, into one document written to a
+            temporary file one journal at a time rather than held in
+            memory
+
+        Args:
+            journals (iterable): Journal instances with content loaded
+
+        Returns:
+            tuple: (open temporary file positioned at its start, number
+                of journals whose render failed)
+    '''
+    merged = tempfile.TemporaryFile()
+    spool = _PdfSpool(merged)
+    failed: int = 0
+    for journal, path in render_in_order(journals):
+        if path is None:
+            failed += 1
+            continue
+        try:
+            spool.append(path, journal.title)
+        except (FileNotFoundError, PdfReadError):
+            failed += 1
+    spool.close()
+    merged.seek(0)
+    return (merged, failed)
+
+
+def export_path(job: ExportJob) -> Path:
+    # File path of the (cached) pdf rendered for an ExportJob instance
+    return cache_path(job.key)
+
+
+def submit_export(user: User, html_content: str) -> ExportJob:
+    ''' submit_export: function to create an ExportJob instance and
+            queue its render in the process pool without waiting,
+            unless the same html is already in the pdf cache
+
+        Args:
+            user (User): owner of the export
+            html_content (str): html string to render
+
+        Returns:
+            ExportJob: new pending (or, without a pool, finished)
+                ExportJob instance
+    '''
+    key: str = cache_key(html_content)
+    date_created: datetime = datetime.now(
+        tz=timezone.utc).replace(microsecond=0)
+    path: Path = cache_lookup(key)
+    if path is not None:
+        # Already rendered: the job is finished as soon as it exists
+        return ExportJob.objects.create(
+            user=user, key=key, status=ExportJob.DONE,
+            size=path.stat().st_size, date_created=date_created,
+            date_completed=date_created)
+
+    job: ExportJob = ExportJob.objects.create(
+        user=user, key=key, date_created=date_created)
+    future: Future = run_in_pool(render_pdf_file, html_content,
+                                 str(cache_path(key)),
+                                 settings.EXPORT_JOB_TIMEOUT)
+    inline: bool = future.done()
+    future.add_done_callback(
+        lambda done: finish_export(job.id, done, close=not inline))
+    if inline:
+        job.refresh_from_db()
+    return job
+
+
+def finish_export(job_id, future: Future, close: bool = True) -> None:
+    ''' finish_export: function called when a render finishes to
+            record its result on the ExportJob instance (runs in the
+            pool's result thread, which owns its own db connection)
+
+        Args:
+            job_id (UUID): id of finished ExportJob instance
+            future (Future): finished render future
+            close (bool): close this thread's db connection afterwards
+    '''
+    fields: dict = {'date_completed': datetime.now(
+        tz=timezone.utc).replace(microsecond=0)}
+    try:
+        fields['size'] = future.result()
+        fields['status'] = ExportJob.DONE
+        cache_added(fields['size'])
+    except TimeoutError:
+        fields.update(status=ExportJob.FAILED, error='Render timed out.')
+    except Exception as error:
+        fields.update(status=ExportJob.FAILED,
+                      error=(str(error) or type(error).__name__)[:200])
+    try:
+        ExportJob.objects.filter(id=job_id, status=ExportJob.PENDING) \
+            .update(**fields)
+    finally:
+        if close:
+            connection.close()
+
+
+def expire_export(job: ExportJob) -> ExportJob:
+    ''' expire_export: function to mark a pending ExportJob instance as
+            failed once it is past its timeout plus grace period, e.g.
+            after its worker or the submitting process died
+
+        Args:
+            job (ExportJob): ExportJob instance to check
+
+        Returns:
+            ExportJob: same instance, updated if expired
+    '''
+    deadline: datetime = job.date_created + timedelta(
+        seconds=settings.EXPORT_JOB_TIMEOUT + EXPORT_GRACE_SECONDS)
+    if (job.status == ExportJob.PENDING and
+            datetime.now(tz=timezone.utc) > deadline):
+        job.status = ExportJob.FAILED
+        job.error = 'Render timed out.'
+        job.date_completed = deadline
+        ExportJob.objects.filter(id=job.id, status=ExportJob.PENDING) \
+            .update(status=job.status, error=job.error,
+                    date_completed=job.date_completed)
+    return job
+
+
+def wants_download(value) -> bool:
+    # Read the 'download' flag sent as a json boolean or a string
+    return value is True or str(value).lower() in ('true', '1')
+
+
+def pdf_response(path: Path, download: bool = False,
+                 filename: str = 'journal.pdf') -> HttpResponse:
+    ''' pdf_response: function to return a rendered pdf either as raw
+            application/pdf bytes streamed from disk with its
+            Content-Length, or base64 encoded in the json 'detail' field
+            as expected by older clients
+
+        Args:
+            path (Path): path of rendered pdf
+            download (bool): stream binary file instead of json
+            filename (str): attachment file name for downloads
+
+        Returns:
+            HttpResponse: FileResponse or json Response
+
+        Raises:
+            FileNotFoundError: pdf is no longer on disk
+    '''
+    if download:
+        return FileResponse(open(path, 'rb'), as_attachment=True,
+                            filename=filename,
+                            content_type='application/pdf')
+    with open(path, 'rb') as file:
+        pdf_b64: bytes = base64.b64encode(file.read())
+    return Response({'detail': pdf_b64}, status=status.HTTP_200_OK)
@@ -0,0 +1,135 @@
+import uuid
+from django.conf import settings
+from django.db import (connections, DEFAULT_DB_ALIAS, OperationalError)
+
+
+# Name of SQLite FTS5 virtual table mirroring journal_journals
+FTS_TABLE = 'journal_journals_fts'
+
+# Column weights passed to bm25() (journal_id, user_id, title, content)
+BM25_WEIGHTS = '0.0, 0.0, 1.0, 1.0'
+
+FTS_SCHEMA = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        journal_id, user_id, title, content)''',
+    'DROP TRIGGER IF EXISTS journal_fts_insert',
+    'DROP TRIGGER IF EXISTS journal_fts_delete',
+    'DROP TRIGGER IF EXISTS journal_fts_update',
+    f'''CREATE TRIGGER journal_fts_insert AFTER INSERT ON journal_journals
+        BEGIN
+            INSERT INTO {FTS_TABLE} (journal_id, user_id, title, content)
+            VALUES (new.id, new.user_id, new.title, new.content_text);
+        END''',
+    f'''CREATE TRIGGER journal_fts_delete AFTER DELETE ON journal_journals
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid IN (
+                SELECT rowid FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH 'journal_id : "' || old.id || '"');
+        END''',
+    f'''CREATE TRIGGER journal_fts_update
+        AFTER UPDATE OF user_id, title, content_text ON journal_journals
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid IN (
+                SELECT rowid FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH 'journal_id : "' || old.id || '"');
+            INSERT INTO {FTS_TABLE} (journal_id, user_id, title, content)
+            VALUES (new.id, new.user_id, new.title, new.content_text);
+        END''',
+]
+
+
+def fts_enabled(using: str = DEFAULT_DB_ALIAS) -> bool:
+    ''' fts_enabled: function to determine whether journal searches
+            should use the SQLite FTS5 backend
+
+        Args:
+            using (str): database alias
+
+        Returns:
+            bool: True if 'fts5' search backend is configured and the
+                database is SQLite
+    '''
+    backend: str = getattr(settings, 'JOURNAL_SEARCH_BACKEND', 'index')
+    return backend == 'fts5' and connections[using].vendor == 'sqlite'
+
+
+def install_fts(using: str = DEFAULT_DB_ALIAS) -> bool:
+    ''' install_fts: function to create FTS5 virtual table and the
+            triggers keeping it in sync with journal_journals
+
+        Args:
+            using (str): database alias
+
+        Returns:
+            bool: True if table and triggers were installed, False if
+                FTS5 is disabled or not compiled into SQLite
+    '''
+    if not fts_enabled(using):
+        return False
+    try:
+        with connections[using].cursor() as cursor:
+            for statement in FTS_SCHEMA:
+                cursor.execute(statement)
+    except OperationalError:
+        return False
+    return True
+
+
+def rebuild_fts(using: str = DEFAULT_DB_ALIAS) -> None:
+    ''' rebuild_fts: function to repopulate FTS5 virtual table
+            from all rows in journal_journals
+
+        Args:
+            using (str): database alias
+    '''
+    if not install_fts(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'''INSERT INTO {FTS_TABLE} (journal_id, user_id, title, content)
+                SELECT id, user_id, title, content_text
+                FROM journal_journals''')
+
+
+def build_match_query(userId: str, search_type: str,
+                      search_list: list) -> str:
+    ''' build_match_query: function to compile search keywords into a
+            single FTS5 MATCH expression scoped to a User instance
+
+        Args:
+            userId (str): id for requested User instance
+            search_type (str): column to search (title or content)
+            search_list (list): keywords to search
+
+        Returns:
+            str: FTS5 query string
+    '''
+    user_hex: str = uuid.UUID(str(userId)).hex
+    terms: str = ' OR '.join(
+        '"' + term.replace('"', '""') + '"' for term in search_list)
+    return f'user_id : "{user_hex}" AND {search_type} : ({terms})'
+
+
+def search_fts(userId: str, search_type: str, search_list: list,
+               using: str = DEFAULT_DB_ALIAS) -> list:
+    ''' search_fts: function to run a single ranked FTS5 query for
+            a User instance's journals
+
+        Args:
+            userId (str): id for requested User instance
+            search_type (str): column to search (title or content)
+            search_list (list): keywords to search
+
+        Returns:
+            list: Journal ids (UUID) ordered by BM25 relevance,
+                best match first
+    '''
+    query: str = build_match_query(userId, search_type, search_list)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'''SELECT journal_id FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s
+                ORDER BY bm25({FTS_TABLE}, {BM25_WEIGHTS})''', [query])
+        rows: list = cursor.fetchall()
+    return [uuid.UUID(row[0]) for row in rows]
@@ -1,40 +1,95 @@
 import re
-from datetime import datetime
-from django.db.models import QuerySet
+from datetime import (datetime, timedelta)
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import (Q, QuerySet)
+from django.utils import timezone
 from rest_framework import status
-from .models import Journal
+from .models import (Journal, JournalToken, ExportJob)
 from .serializers import JournalSerializer
+from .fts import (fts_enabled, search_fts)
+from .render import (render_journal_html, export_filename)
 from dashboard.models.tag import Tag
+from login.functions.pagination import (parse_page_size,
+                                       paginate_queryset)
 from login.utils.responses import invalid_request_body
-from .utils.responses import no_journal_found
+from .utils.operations import apply_operations
+from .utils.responses import (no_journal_found, no_export_found,
+                              batch_too_large, journal_conflict,
+                              invalid_operations)
 from .utils.stop_words import STOP_WORDS
 
 
-def find_journals_by_user(userId: str) -> list:
+def find_journals_by_user(userId: str, fields: list = None) -> list:
     ''' find_journals_by_user: function to get all Journal instance(s)
             associated with specific User instance
 
         Args:
             userId (str): id for requested User instance
+            fields (list): sparse fieldset to load and return
+                (optional, all fields if None)
 
         Returns:
             list: list containing a queryset of Journal instance(s) or
                 response message and a 'status' integer with standard
                 Http status code
     '''
-    queryset: QuerySet[Journal] = Journal.objects.filter(
-        user=userId).order_by('title')
+    queryset: QuerySet[Journal] = JournalSerializer.optimize_queryset(
+        Journal.objects.filter(user=userId), fields, ('title',))
+    queryset = queryset.order_by('title')
     if len(queryset) == 0:
         return [no_journal_found, status.HTTP_404_NOT_FOUND]
     return [queryset, status.HTTP_200_OK]
 
 
-def find_journal_by_id(journalId: str) -> list:
+# Keyset sort keys for paginated journal lists ('title' or 'date' sort)
+JOURNAL_SORT_KEYS = {'title': ('title', 'id'),
+                     'date': ('date_created', 'id')}
+
+
+def find_journal_page(userId: str, page_size, cursor: str = None,
+                      sort: str = 'title', order: str = 'asc',
+                      fields: list = None) -> list:
+    ''' find_journal_page: function to get one keyset page of Journal
+            instance(s) associated with specific User instance
+
+        Args:
+            userId (str): id for requested User instance
+            page_size (int | str): requested page size (capped)
+            cursor (str): next cursor token from previous page (optional)
+            sort (str): sort key ('title' or 'date')
+            order (str): sort order ('asc' or 'desc')
+            fields (list): sparse fieldset to load and return
+                (optional, all fields if None)
+
+        Returns:
+            list: list containing a list with the page of Journal
+                instance(s) and next cursor token or response message
+                and a 'status' integer with standard Http status code
+    '''
+    if sort not in JOURNAL_SORT_KEYS or order not in ('asc', 'desc'):
+        return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    try:
+        page_size = parse_page_size(page_size)
+        queryset: QuerySet[Journal] = JournalSerializer.optimize_queryset(
+            Journal.objects.filter(user=userId), fields,
+            JOURNAL_SORT_KEYS[sort])
+        page: list = paginate_queryset(queryset, JOURNAL_SORT_KEYS[sort],
+                                       page_size, cursor, order == 'desc')
+    except ValueError:
+        return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    if len(page[0]) == 0 and not cursor:
+        return [no_journal_found, status.HTTP_404_NOT_FOUND]
+    return [page, status.HTTP_200_OK]
+
+
+def find_journal_by_id(journalId: str, with_tags: bool = False) -> list:
     ''' find_journal_by_id: function to return Journal instance
             based on query by id field
 
         Args:
             journalId (str): id for requested Journal instance
+            with_tags (bool): prefetch tags for serializing (optional)
 
         Returns:
             list: list containing either an instance of Journal class or
@@ -42,21 +97,182 @@ def find_journal_by_id(journalId: str) -> list:
                 Http status code
     '''
     queryset: QuerySet[Journal] = Journal.objects.filter(id=journalId)
+    if with_tags:
+        queryset = queryset.with_tags()
     if len(queryset) == 0:
         return [no_journal_found, status.HTTP_404_NOT_FOUND]
     journal: Journal = queryset[0]
     return [journal, status.HTTP_200_OK]
 
 
+def patch_journal_content(journal: Journal, operations: list,
+                          base_version: int) -> list:
+    ''' patch_journal_content: function to apply Slate operations sent
+            by the editor to the stored content of a Journal instance,
+            so autosave uploads what changed instead of the whole entry
+
+        Args:
+            journal (Journal): Journal instance with content loaded
+            operations (list): Slate operations, applied in order
+            base_version (int): version of journal the operations were
+                made against
+
+        Returns:
+            list: list containing the new content string or response
+                message and a 'status' integer with standard Http status
+                code (409 if journal changed since base_version)
+    '''
+    if base_version is None:
+        return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    if base_version != journal.version:
+        return [journal_conflict, status.HTTP_409_CONFLICT]
+    try:
+        content: str = apply_operations(journal.content, operations)
+    except ValueError:
+        return [invalid_operations, status.HTTP_400_BAD_REQUEST]
+    return [content, status.HTTP_200_OK]
+
+
+def find_journal_html(userId: str, journalId: str) -> list:
+    ''' find_journal_html: function to return the rendered html and
+            export file name of a Journal instance of a User instance
+
+        Args:
+            userId (str): id of User instance owning the journal
+            journalId (str): id for requested Journal instance
+
+        Returns:
+            list: list containing either a tuple of html string and file
+                name or response message and a 'status' integer with
+                standard Http status code
+    '''
+    try:
+        journal: Journal = Journal.objects.only(
+            'id', 'title', 'content', 'content_hash').get(id=journalId,
+                                                          user=userId)
+    except (Journal.DoesNotExist, ValidationError):
+        return [no_journal_found, status.HTTP_404_NOT_FOUND]
+    return [(render_journal_html(journal), export_filename(journal)),
+            status.HTTP_200_OK]
+
+
+def select_journals(userId: str, data: dict) -> QuerySet:
+    ''' select_journals: function to build an unevaluated queryset of
+            Journal instance(s) of a User instance chosen by a
+            'journal_ids' list, 'tag_id' string, 'date_range' search
+            text or 'search_type' and 'search_text' (as for
+            search_journals)
+
+        Args:
+            userId (str): id of User instance owning the journals
+            data (dict): request data containing one selector
+
+        Returns:
+            QuerySet: selected Journal instance(s)
+
+        Raises:
+            ValueError: no selector or invalid selector value given
+    '''
+    queryset: QuerySet[Journal] = Journal.objects.filter(user=userId)
+    if isinstance(data.get('journal_ids'), list):
+        return queryset.filter(id__in=data['journal_ids'])
+    if data.get('tag_id'):
+        return queryset.filter(tags=data['tag_id'])
+    if data.get('date_range'):
+        start, end = parse_date_range(str(data['date_range']))
+        return filter_date_range(queryset, start, end)
+
+    search_type: str = data.get('search_type')
+    search_text: str = str(data.get('search_text', ''))
+    if search_type == 'date':
+        return filter_date_range(queryset, *parse_date_range(search_text))
+    search_list: list = clean_search_text(search_text)
+    if search_type == 'tags':
+        name_filter = Q(pk__in=[])
+        for string in search_list:
+            name_filter |= Q(name__icontains=string)
+        return queryset.filter(tags__in=Tag.objects.filter(
+            name_filter, user=userId).values('id')).distinct()
+    if search_type == 'content' or search_type == 'title':
+        if fts_enabled():
+            return queryset.filter(id__in=search_fts(
+                userId, search_type, search_list) if search_list else [])
+        return queryset.filter(id__in=JournalToken.objects.filter(
+            user=userId, field=search_type,
+            token__in=search_list).values('journal_id'))
+    raise ValueError('No journal selector given.')
+
+
+def filter_date_range(queryset: QuerySet, start: datetime,
+                      end: datetime) -> QuerySet:
+    # Restrict journals to a half-open range, either end may be None
+    if start is not None:
+        queryset = queryset.filter(date_created__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date_created__lt=end)
+    return queryset
+
+
+def find_batch_journals(userId: str, data: dict) -> list:
+    ''' find_batch_journals: function to select Journal instance(s)
+            of a User instance for a batch export with select_journals,
+            ordered by creation date
+
+        Args:
+            userId (str): id of User instance owning the journals
+            data (dict): request data containing one selector
+
+        Returns:
+            list: list containing either a QuerySet of Journal instances
+                with content loaded or response message and a 'status'
+                integer with standard Http status code
+    '''
+    try:
+        queryset: QuerySet[Journal] = select_journals(userId, data)
+        count: int = queryset.count()
+    except (ValueError, ValidationError):
+        return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    if count == 0:
+        return [no_journal_found, status.HTTP_404_NOT_FOUND]
+    if count > settings.EXPORT_BATCH_MAX_JOURNALS:
+        return [batch_too_large, status.HTTP_400_BAD_REQUEST]
+    return [queryset.only('id', 'title', 'content', 'date_created')
+            .order_by('date_created', 'id'), status.HTTP_200_OK]
+
+
+def find_export_job(userId: str, jobId: str) -> list:
+    ''' find_export_job: function to return ExportJob instance of a
+            User instance based on query by id field
+
+        Args:
+            userId (str): id of User instance owning the job
+            jobId (str): id for requested ExportJob instance
+
+        Returns:
+            list: list containing either an instance of ExportJob class
+                or response message and a 'status' integer with standard
+                Http status code
+    '''
+    try:
+        job: ExportJob = ExportJob.objects.get(id=jobId, user=userId)
+    except (ExportJob.DoesNotExist, ValidationError):
+        return [no_export_found, status.HTTP_404_NOT_FOUND]
+    return [job, status.HTTP_200_OK]
+
+
 def find_journals_by_search(userId: str, search_type: str,
-                            search_text: str) -> list:
+                            search_text: str, fields: list = None) -> list:
     ''' find_journals_by_search: function to handle searching by type
 
         Args:
             userId (str): id for requested User instance
             search_type (str): field to search on
                 (title, tags, date, or content)
-            search_text (str): keywords to search
+            search_text (str): keywords to search, or for date searches
+                a day, month ('YYYY-MM'), year ('YYYY') or 'from/to'
+                range where either end may be omitted
+            fields (list): sparse fieldset to load and return
+                (optional, all fields if None)
 
         Returns:
             list: list containing a queryset of Journal instance(s) or
@@ -65,24 +281,25 @@ def find_journals_by_search(userId: str, search_type: str,
     '''
     if search_type == 'date':
         try:
-            date: datetime = datetime.fromisoformat(search_text)
-            response = find_journals_by_date(userId, date)
-            return [response[0], response[1]]
+            date_range: tuple = parse_date_range(str(search_text))
         except ValueError:
             return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+        response = find_journals_by_date(userId, *date_range, fields)
+        return [response[0], response[1]]
 
     clean_search: list = clean_search_text(search_text)
     if search_type == 'tags':
-        response = find_journals_by_tags(userId, clean_search)
+        response = find_journals_by_tags(userId, clean_search, fields)
     elif search_type == 'content' or search_type == 'title':
-        response = find_journals_by_keyword(userId, search_type, clean_search)
+        response = find_journals_by_keyword(userId, search_type,
+                                            clean_search, fields)
     else:
         return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
     return [response[0], response[1]]
 
 
 def clean_search_text(search_text: str) -> list:
-    search_text.lower()
+    search_text = search_text.lower()
     text_list: list = re.findall(r"\w+", search_text)
     search_list: list = []
     for string in text_list:
@@ -91,75 +308,176 @@ def clean_search_text(search_text: str) -> list:
     return search_list
 
 
-def find_journals_by_date(userId: str, date: datetime) -> list:
-    ''' date: function to get all Journal instance(s)
-            associated with specific User instance and matching date
+def parse_date_bound(text: str) -> tuple:
+    ''' parse_date_bound: function to convert a year ('YYYY'), month
+            ('YYYY-MM') or ISO date / datetime string into the half-open
+            datetime range it covers
+
+        Args:
+            text (str): date string to parse
+
+        Returns:
+            tuple: (start, end) timezone aware datetimes where
+                start <= date_created < end
+    '''
+    text = text.strip()
+    tz = timezone.get_current_timezone()
+    if re.fullmatch(r'\d{4}', text):
+        year: int = int(text)
+        return (datetime(year, 1, 1, tzinfo=tz),
+                datetime(year + 1, 1, 1, tzinfo=tz))
+    if re.fullmatch(r'\d{4}-\d{2}', text):
+        year, month = (int(part) for part in text.split('-'))
+        start: datetime = datetime(year, month, 1, tzinfo=tz)
+        if month == 12:
+            return (start, datetime(year + 1, 1, 1, tzinfo=tz))
+        return (start, datetime(year, month + 1, 1, tzinfo=tz))
+
+    date: datetime = datetime.fromisoformat(text)
+    start = datetime(date.year, date.month, date.day, tzinfo=tz)
+    return (start, start + timedelta(days=1))
+
+
+def parse_date_range(search_text: str) -> tuple:
+    ''' parse_date_range: function to convert date search text into
+            a half-open datetime range, either for a single day, month
+            or year or for a 'from/to' range of those
+
+        Args:
+            search_text (str): date search text
+
+        Returns:
+            tuple: (start, end) timezone aware datetimes, either one
+                None for an open-ended range
+
+        Raises:
+            ValueError: if search_text is not a valid date or range
+    '''
+    if '/' not in search_text:
+        return parse_date_bound(search_text)
+
+    from_text, to_text = search_text.split('/', 1)
+    if from_text.strip() == '' and to_text.strip() == '':
+        raise ValueError('Empty date range.')
+    start = parse_date_bound(from_text)[0] if from_text.strip() else None
+    end = parse_date_bound(to_text)[1] if to_text.strip() else None
+    if start is not None and end is not None and start >= end:
+        raise ValueError('Date range end before start.')
+    return (start, end)
+
+
+def find_journals_by_date(userId: str, start: datetime,
+                          end: datetime, fields: list = None) -> list:
+    ''' find_journals_by_date: function to get all Journal instance(s)
+            associated with specific User instance and created within
+            a half-open date range, using (user, date_created) index
 
         Args:
             userId (str): id for requested User instance
-            date (datetime): date to search
+            start (datetime): inclusive range start (None if open)
+            end (datetime): exclusive range end (None if open)
+            fields (list): sparse fieldset to load and return
+                (optional, all fields if None)
 
         Returns:
             list: list containing a queryset of Journal instance(s) or
                 response message and a 'status' integer with standard
                 Http status code
     '''
-    month: str = str(date.month)
-    day: str = str(date.day)
-    year: str = str(date.year)
-    queryset: QuerySet[Journal] = Journal.objects.filter(
-        user=userId, date_created__year=year, date_created__month=month,
-        date_created__day=day).order_by('title')
+    queryset: QuerySet[Journal] = filter_date_range(
+        Journal.objects.filter(user=userId), start, end)
+    queryset = JournalSerializer.optimize_queryset(
+        queryset, fields).order_by('title')
     if len(queryset) == 0:
         return [no_journal_found, status.HTTP_404_NOT_FOUND]
 
-    serializer = JournalSerializer(queryset, many=True)
+    serializer = JournalSerializer(queryset, many=True, fields=fields)
     return [serializer.data, status.HTTP_200_OK]
 
 
 def find_journals_by_keyword(userId: str, search_type: str,
-                             search_list: list) -> list:
+                             search_list: list, fields: list = None) -> list:
     ''' find_journals_by_keyword: function to get all Journal instance(s)
             associated with specific User instance and matching user
-            content or title keywords
+            content or title keywords, looked up through the
+            JournalToken search index (or FTS5 table if enabled)
+
+            Keywords match whole words only (case-insensitive, stop
+            words ignored): 'harb' no longer finds 'harbour' as the
+            former icontains substring search did
 
         Args:
             userId (str): id for requested User instance
             search_type (str): field to search (title or content)
             search_list (list): keywords to search in content
+            fields (list): sparse fieldset to load and return
+                (optional, all fields if None)
 
         Returns:
             list: list containing a queryset of Journal instance(s) or
                 response message and a 'status' integer with standard
                 Http status code
     '''
-    user_queryset: QuerySet[Journal] = Journal.objects.filter(user=userId)
-    if len(user_queryset) == 0:
+    if len(search_list) == 0:
         return [no_journal_found, status.HTTP_404_NOT_FOUND]
 
-    journal_list: list = []
-    for string in search_list:
-        if search_type == 'title':
-            queryset = user_queryset.filter(title__icontains=string)
-        else:
-            queryset = user_queryset.filter(content__icontains=string)
-        if len(queryset) > 0:
-            for journal in queryset:
-                journal_list.append(journal.id)
-
-    if len(journal_list) == 0:
-        return [no_journal_found, status.HTTP_404_NOT_FOUND]
+    if fts_enabled():
+        return find_journals_by_fts(userId, search_type, search_list,
+                                    fields)
 
-    journal_list = list(set(journal_list))
-    search_queryset = user_queryset.filter(id__in=journal_list)
+    search_queryset: QuerySet[Journal] = Journal.objects.filter(
+        user=userId, search_tokens__user=userId,
+        search_tokens__field=search_type,
+        search_tokens__token__in=search_list).distinct()
+    search_queryset = JournalSerializer.optimize_queryset(
+        search_queryset, fields, ('title',)).order_by('title')
     if len(search_queryset) == 0:
         return [no_journal_found, status.HTTP_404_NOT_FOUND]
 
-    serializer = JournalSerializer(search_queryset, many=True)
+    serializer = JournalSerializer(search_queryset, many=True,
+                                   fields=fields)
     return [serializer.data, status.HTTP_200_OK]
 
 
-def find_journals_by_tags(userId: str, search_list: list) -> list:
+def find_journals_by_fts(userId: str, search_type: str,
+                         search_list: list, fields: list = None) -> list:
+    ''' find_journals_by_fts: function to get all Journal instance(s)
+            associated with specific User instance and matching user
+            content or title keywords with a single FTS5 query, ordered
+            by BM25 relevance
+
+        Args:
+            userId (str): id for requested User instance
+            search_type (str): field to search (title or content)
+            search_list (list): keywords to search
+            fields (list): sparse fieldset to load and return
+                (optional, all fields if None)
+
+        Returns:
+            list: list containing a queryset of Journal instance(s) or
+                response message and a 'status' integer with standard
+                Http status code
+    '''
+    try:
+        journal_ids: list = search_fts(userId, search_type, search_list)
+    except ValueError:
+        return [invalid_request_body, status.HTTP_400_BAD_REQUEST]
+    if len(journal_ids) == 0:
+        return [no_journal_found, status.HTTP_404_NOT_FOUND]
+
+    rank: dict = {id: index for index, id in enumerate(journal_ids)}
+    search_queryset: QuerySet[Journal] = JournalSerializer.optimize_queryset(
+        Journal.objects.filter(user=userId, id__in=journal_ids), fields)
+    journals: list = sorted(search_queryset, key=lambda j: rank[j.id])
+    if len(journals) == 0:
+        return [no_journal_found, status.HTTP_404_NOT_FOUND]
+
+    serializer = JournalSerializer(journals, many=True, fields=fields)
+    return [serializer.data, status.HTTP_200_OK]
+
+
+def find_journals_by_tags(userId: str, search_list: list,
+                          fields: list = None) -> list:
     ''' find_journals_by_tags: function to get all Journal instance(s)
             associated with specific User instance and matching user
             tags keywords
@@ -167,28 +485,29 @@ def find_journals_by_tags(userId: str, search_list: list) -> list:
         Args:
             userId (str): id for requested User instance
             search_list (list): keywords to search in tags
+            fields (list): sparse fieldset to load and return
+                (optional, all fields if None)
 
         Returns:
             list: list containing a queryset of Journal instance(s) or
                 response message and a 'status' integer with standard
                 Http status code
     '''
-    tag_list: list = []
-    for string in search_list:
-        tag_queryset: QuerySet[Tag] = Tag.objects.filter(
-            user=userId, name__icontains=string)
-        if len(tag_queryset) > 0:
-            for tag in tag_queryset:
-                tag_list.append(tag.id)
-
-    if len(tag_list) == 0:
+    if len(search_list) == 0:
         return [no_journal_found, status.HTTP_404_NOT_FOUND]
 
-    tag_list = list(set(tag_list))
-    search_queryset: QuerySet[Journal] = Journal.objects.filter(
-        user=userId, tags__id__in=tag_list)
+    name_filter = Q()
+    for string in search_list:
+        name_filter |= Q(name__icontains=string)
+    tag_queryset: QuerySet[Tag] = Tag.objects.filter(
+        name_filter, user=userId).values('id')
+
+    search_queryset: QuerySet[Journal] = JournalSerializer.optimize_queryset(
+        Journal.objects.filter(user=userId, tags__id__in=tag_queryset),
+        fields).distinct()
     if len(search_queryset) == 0:
         return [no_journal_found, status.HTTP_404_NOT_FOUND]
 
-    serializer = JournalSerializer(search_queryset, many=True)
+    serializer = JournalSerializer(search_queryset, many=True,
+                                   fields=fields)
     return [serializer.data, status.HTTP_200_OK]
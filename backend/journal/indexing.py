@@ -0,0 +1,142 @@
+import re
+from django.db import (connections, transaction)
+from django.db.models import QuerySet
+from .models import (Journal, JournalToken)
+from .utils.stop_words import STOP_WORDS
+
+
+# Lowercase lookup set of words excluded from the search index
+INDEX_STOP_WORDS = frozenset(word.lower() for word in STOP_WORDS)
+
+# Maximum stored token length (matches JournalToken.token max_length)
+MAX_TOKEN_LENGTH = 100
+
+# Fields of Journal model covered by the search index
+INDEXED_FIELDS = ('title', 'content')
+
+
+def tokenize(text: str) -> set:
+    ''' tokenize: function to split text into the set of lowercase
+            word tokens used by the search index
+
+        Args:
+            text (str): text to tokenize
+
+        Returns:
+            set: unique tokens with stop words removed
+    '''
+    tokens: set = set()
+    for word in re.findall(r"\w+", text.lower()):
+        if len(word) <= MAX_TOKEN_LENGTH and word not in INDEX_STOP_WORDS:
+            tokens.add(word)
+    return tokens
+
+
+def journal_tokens(journal: Journal) -> set:
+    ''' journal_tokens: function to get all (field, token) pairs for
+            a specific Journal instance
+
+        Args:
+            journal (Journal): Journal instance to tokenize
+
+        Returns:
+            set: set of (field, token) tuples
+    '''
+    pairs: set = set()
+    for token in tokenize(journal.title):
+        pairs.add(('title', token))
+    for token in tokenize(journal.content_text):
+        pairs.add(('content', token))
+    return pairs
+
+
+def index_journal(journal: Journal) -> None:
+    ''' index_journal: function to update the search index entries of
+            a specific Journal instance, only writing the tokens that
+            were added or removed since the last indexing
+
+        Args:
+            journal (Journal): Journal instance to index
+    '''
+    new_pairs: set = journal_tokens(journal)
+    current_pairs: set = set(JournalToken.objects.filter(
+        journal=journal).values_list('field', 'token'))
+
+    removed: set = current_pairs - new_pairs
+    added: set = new_pairs - current_pairs
+    with transaction.atomic():
+        for field in INDEXED_FIELDS:
+            removed_tokens: list = [token for (name, token) in removed
+                                    if name == field]
+            if len(removed_tokens) > 0:
+                JournalToken.objects.filter(
+                    journal=journal, field=field,
+                    token__in=removed_tokens).delete()
+        if len(added) > 0:
+            JournalToken.objects.bulk_create([
+                JournalToken(journal_id=journal.id, user_id=journal.user_id,
+                             field=field, token=token)
+                for (field, token) in added])
+
+
+def index_new_journals(journals: list, chunk_size: int = 500) -> None:
+    ''' index_new_journals: function to write search index entries
+            of newly created Journal instance(s) (e.g. after bulk_create)
+            without reading the existing index
+
+            Tokens outnumber journals by an order of magnitude, so rows
+            are written with executemany instead of building a model
+            instance per token
+
+        Args:
+            journals (list): new Journal instances with title and
+                content_text set
+            chunk_size (int): number of journals written per statement
+    '''
+    meta = JournalToken._meta
+    connection = connections[JournalToken.objects.db]
+    journal_field = meta.get_field('journal')
+    user_field = meta.get_field('user')
+    sql: str = (f'INSERT INTO {connection.ops.quote_name(meta.db_table)} '
+                '(journal_id, user_id, field, token) VALUES (%s, %s, %s, %s)')
+    with connection.cursor() as cursor:
+        for start in range(0, len(journals), chunk_size):
+            rows: list = []
+            for journal in journals[start:start + chunk_size]:
+                journal_id = journal_field.get_db_prep_value(
+                    journal.id, connection)
+                user_id = user_field.get_db_prep_value(
+                    journal.user_id, connection)
+                rows.extend((journal_id, user_id, field, token)
+                            for (field, token) in journal_tokens(journal))
+            if rows:
+                cursor.executemany(sql, rows)
+
+
+def rebuild_search_index(queryset: QuerySet[Journal],
+                         chunk_size: int = 500) -> int:
+    ''' rebuild_search_index: function to drop and recreate the search
+            index entries for all Journal instance(s) in queryset
+
+        Args:
+            queryset (QuerySet[Journal]): journals to reindex
+            chunk_size (int): number of journals loaded per batch
+
+        Returns:
+            int: number of journals indexed
+    '''
+    count: int = 0
+    batch: list = []
+    JournalToken.objects.filter(journal__in=queryset).delete()
+    queryset = queryset.only('id', 'user', 'title', 'content_text')
+    for journal in queryset.iterator(chunk_size=chunk_size):
+        batch.extend([
+            JournalToken(journal_id=journal.id, user_id=journal.user_id,
+                         field=field, token=token)
+            for (field, token) in journal_tokens(journal)])
+        count += 1
+        if count % chunk_size == 0:
+            JournalToken.objects.bulk_create(batch, batch_size=chunk_size)
+            batch = []
+    JournalToken.objects.bulk_create(batch, batch_size=chunk_size)
+    return count
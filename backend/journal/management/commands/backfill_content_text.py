@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import QuerySet
+from ...models import Journal
+from ...indexing import rebuild_search_index
+from ...utils.text import (content_fields, CONTENT_FIELDS)
+
+
+class Command(BaseCommand):
+    ''' Command: management command to compute the denormalized
+            content_text, word_count, char_count and content_hash fields
+            of existing Journal instances, then rebuild the search index
+            from them
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = ('Backfill plain text, word and character counts and content '
+            'hashes for journals.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of journals updated per batch.')
+
+    def handle(self, *args, **options) -> None:
+        chunk_size: int = options['chunk_size']
+        queryset: QuerySet[Journal] = Journal.objects.only(
+            'id', 'content').order_by('id')
+        count: int = 0
+        batch: list = []
+        for journal in queryset.iterator(chunk_size=chunk_size):
+            for field, value in content_fields(journal.content).items():
+                setattr(journal, field, value)
+            batch.append(journal)
+            if len(batch) == chunk_size:
+                count += self.save_batch(batch)
+                batch = []
+        count += self.save_batch(batch)
+        rebuild_search_index(Journal.objects.all(), chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {count} journal(s).'))
+
+    def save_batch(self, batch: list) -> int:
+        # Write one chunk of computed fields in a single transaction
+        with transaction.atomic():
+            Journal.objects.bulk_update(batch, CONTENT_FIELDS)
+        return len(batch)
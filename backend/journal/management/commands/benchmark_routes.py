@@ -0,0 +1,82 @@
+import json
+import tempfile
+from django.core.management.base import (BaseCommand, CommandError)
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment, override_settings)
+from ...benchmark import (run_benchmark, ROUTES)
+from ...dataset import (generate_dataset, DISTRIBUTIONS)
+
+
+class Command(BaseCommand):
+    ''' Command: management command to generate a synthetic dataset in
+            a throwaway test database, benchmark every API route against
+            it and save latency, query and memory results as json
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = 'Benchmark API routes against a synthetic dataset.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of users to create.')
+        parser.add_argument('--journals', type=int, default=100,
+                            help='Mean number of journals per user.')
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Number of tags per user.')
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS,
+                            default='pareto',
+                            help='Distribution of journals per user.')
+        parser.add_argument('--paragraphs', type=int, default=8,
+                            help='Mean number of blocks per journal.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed for reproducible content.')
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Number of timed requests per route.')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Number of untimed requests per route.')
+        parser.add_argument('--route', action='append', dest='routes',
+                            choices=list(ROUTES),
+                            help='Route to benchmark (repeatable).')
+        parser.add_argument('--label', default='',
+                            help='Label stored with the results.')
+        parser.add_argument('--output',
+                            help='Path of json file for the results.')
+
+    def handle(self, *args, **options) -> None:
+        if options['users'] < 1 or options['tags'] < 1:
+            raise CommandError('--users and --tags must be positive.')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive.')
+        params: dict = {key: options[key] for key in (
+            'users', 'journals', 'tags', 'distribution', 'paragraphs',
+            'seed')}
+
+        setup_test_environment()
+        old_name: str = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            # Rendered exports go to a throwaway media directory too
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root):
+                generate_dataset(**params)
+                results: dict = run_benchmark(
+                    options['iterations'], options['warmup'],
+                    options['routes'], options['label'], params)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, result in results['routes'].items():
+            self.stdout.write(
+                f'{name:36} p50 {result["p50_ms"]:9.2f}ms '
+                f'p95 {result["p95_ms"]:9.2f}ms '
+                f'p99 {result["p99_ms"]:9.2f}ms '
+                f'queries {result["queries"]:3} '
+                f'peak {result["peak_memory_kb"]:9.1f}KiB')
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Saved results to {options["output"]}.'))
@@ -0,0 +1,40 @@
+from django.core.management.base import (BaseCommand, CommandError)
+from ...dataset import (generate_dataset, DISTRIBUTIONS)
+
+
+class Command(BaseCommand):
+    ''' Command: management command to fill the database with
+            synthetic users, tags and journals for load testing
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = 'Generate synthetic users, tags and journals.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of users to create.')
+        parser.add_argument('--journals', type=int, default=100,
+                            help='Mean number of journals per user.')
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Number of tags per user.')
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS,
+                            default='pareto',
+                            help='Distribution of journals per user.')
+        parser.add_argument('--paragraphs', type=int, default=8,
+                            help='Mean number of blocks per journal.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed for reproducible content.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of rows written per insert.')
+
+    def handle(self, *args, **options) -> None:
+        if options['users'] < 1 or options['tags'] < 1:
+            raise CommandError('--users and --tags must be positive.')
+        totals: dict = generate_dataset(
+            options['users'], options['journals'], options['tags'],
+            options['distribution'], options['paragraphs'],
+            options['seed'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {totals["users"]} user(s), {totals["tags"]} tag(s) '
+            f'and {totals["journals"]} journal(s).'))
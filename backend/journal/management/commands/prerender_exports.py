@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import QuerySet
+from ...models import Journal
+from ...exports import prerender_journals
+
+
+class Command(BaseCommand):
+    ''' Command: management command to render pdfs of stored journals
+            into the pdf cache in the export worker pool, so later
+            exports are served without rendering
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = 'Render journal pdfs into the export cache ahead of requests.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--user', type=str, default=None,
+                            help='Only render journals of this user id.')
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help='Number of journals loaded per query.')
+
+    def handle(self, *args, **options) -> None:
+        queryset: QuerySet[Journal] = Journal.objects.all()
+        if options['user']:
+            queryset = queryset.filter(user=options['user'])
+        totals: dict = prerender_journals(queryset, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {totals["rendered"]} journal(s), '
+            f'{totals["cached"]} already cached, '
+            f'{totals["failed"]} failed.'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import QuerySet
+from ...models import Journal
+from ...indexing import rebuild_search_index
+from ...fts import (fts_enabled, rebuild_fts)
+
+
+class Command(BaseCommand):
+    ''' Command: management command to rebuild the journal search
+            index from scratch, for all users or a specific User instance
+
+        Args:
+            BaseCommand (class): Django generic management command class
+    '''
+    help = 'Rebuild the journal title/content search index.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--user', type=str, default=None,
+                            help='Only rebuild index for this user id.')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of journals loaded per batch.')
+
+    def handle(self, *args, **options) -> None:
+        queryset: QuerySet[Journal] = Journal.objects.all()
+        if options['user']:
+            queryset = queryset.filter(user=options['user'])
+        count: int = rebuild_search_index(queryset, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} journal(s).'))
+        if fts_enabled():
+            rebuild_fts()
+            self.stdout.write(self.style.SUCCESS('Rebuilt FTS5 table.'))
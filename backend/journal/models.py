@@ -1,11 +1,30 @@
 import uuid
 from django.core.validators import (MinLengthValidator, MaxLengthValidator)
 from django.db import models
+from django.utils import timezone
 from login.models.custom import CustomDateTimeField
 from login.models.user import User
 from dashboard.models.tag import Tag
 
 
+class JournalQuerySet(models.QuerySet):
+    ''' JournalQuerySet: custom Journal queryset with helpers for
+            loading related tags in a fixed number of queries and
+            marking journals as changed
+
+        Args:
+            QuerySet (class): Django generic queryset class
+    '''
+
+    def with_tags(self) -> 'JournalQuerySet':
+        # Prefetch tags (with their stored journal counts) in one query
+        return self.prefetch_related('tags')
+
+    def touch(self) -> int:
+        # Set updated_at of journals whose tags changed in one UPDATE
+        return self.update(updated_at=timezone.now())
+
+
 class Journal(models.Model):
     ''' Journal: custom Journal model associated to
             User model by foreign key and Many-To-Many
@@ -34,7 +53,27 @@ class Journal(models.Model):
         validators=[MinLengthValidator(limit_value=2,
                                        message=('Must be at least ' +
                                                 '2 characters.'))])
+    content_text = models.TextField(blank=True, null=False, default='')
+    word_count = models.PositiveIntegerField(blank=False, null=False,
+                                             default=0)
+    char_count = models.PositiveIntegerField(blank=False, null=False,
+                                             default=0)
+    content_hash = models.CharField(max_length=64, blank=True, null=False,
+                                    default='')
     date_created = CustomDateTimeField(blank=False, null=False)
+    updated_at = CustomDateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(blank=False, null=False,
+                                          default=0)
+
+    objects = JournalQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values) -> 'Journal':
+        # Remember loaded counts so saving can apply the change to stats
+        journal: Journal = super().from_db(db, field_names, values)
+        journal.saved_counts = (journal.__dict__.get('word_count'),
+                                journal.__dict__.get('char_count'))
+        return journal
 
     def __str__(self) -> str:
         return self.title
@@ -42,3 +81,79 @@ class Journal(models.Model):
     class Meta:
         verbose_name_plural = 'journals'
         db_table = 'journal_journals'
+        indexes = [models.Index(fields=['user', 'date_created'],
+                                name='journal_user_date_idx'),
+                   models.Index(fields=['user', 'title'],
+                                name='journal_user_title_idx'),
+                   models.Index(fields=['user', 'updated_at'],
+                                name='journal_user_updated_idx')]
+
+
+class JournalToken(models.Model):
+    ''' JournalToken: inverted index entry mapping a search token to
+            the Journal instance(s) containing it, kept per User instance
+            and per searchable field (title or content)
+
+        Args:
+            Model (class): Django generic model class
+    '''
+    FIELD_CHOICES = [('title', 'Title'), ('content', 'Content')]
+
+    journal = models.ForeignKey(Journal, blank=False, null=False,
+                                on_delete=models.CASCADE,
+                                related_name='search_tokens')
+    user = models.ForeignKey(User, blank=False, null=False,
+                             on_delete=models.CASCADE,
+                             related_name='+')
+    field = models.CharField(max_length=7, blank=False, null=False,
+                             choices=FIELD_CHOICES)
+    token = models.CharField(max_length=100, blank=False, null=False)
+
+    def __str__(self) -> str:
+        return self.token
+
+    class Meta:
+        verbose_name_plural = 'journal tokens'
+        db_table = 'journal_search_tokens'
+        indexes = [models.Index(fields=['user', 'field', 'token'],
+                                name='journal_token_lookup_idx')]
+        constraints = [models.UniqueConstraint(
+            fields=['journal', 'field', 'token'],
+            name='journal_token_unique')]
+
+
+class ExportJob(models.Model):
+    ''' ExportJob: asynchronous pdf export of html content for a
+            User instance, rendered by a worker process into the pdf
+            cache under 'key' and tracked here so any API worker can
+            report its status
+
+        Args:
+            Model (class): Django generic model class
+    '''
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (DONE, 'Done'),
+                      (FAILED, 'Failed')]
+
+    id = models.UUIDField(primary_key=True,
+                          default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, blank=False, null=False,
+                             on_delete=models.CASCADE,
+                             related_name='export_jobs')
+    key = models.CharField(max_length=64, blank=False, null=False)
+    status = models.CharField(max_length=7, blank=False, null=False,
+                              choices=STATUS_CHOICES, default=PENDING)
+    error = models.CharField(max_length=200, blank=True, null=False,
+                             default='')
+    size = models.PositiveIntegerField(blank=False, null=False, default=0)
+    date_created = CustomDateTimeField(blank=False, null=False)
+    date_completed = CustomDateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f'{self.id} ({self.status})'
+
+    class Meta:
+        verbose_name_plural = 'export jobs'
+        db_table = 'journal_export_jobs'
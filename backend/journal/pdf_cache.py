@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from django.conf import settings
+
+
+# In-process counters (per API process) used to size the cache
+_stats: dict = {'hits': 0, 'misses': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+
+# Approximate bytes on disk per cache directory, counted once then
+# kept up to date as entries are added
+_sizes: dict = {}
+
+
+def cache_key(html_content: str) -> str:
+    # Content address of a rendered pdf: sha256 of its source html
+    return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+
+def cache_dir() -> Path:
+    # Root directory of cached pdf files, created on demand
+    path: Path = Path(settings.MEDIA_ROOT) / 'pdf_cache'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_path(key: str) -> Path:
+    # File path of a cache entry, sharded by the first key byte
+    shard: Path = cache_dir() / key[:2]
+    shard.mkdir(exist_ok=True)
+    return shard / f'{key}.pdf'
+
+
+def count(name: str, amount: int = 1) -> None:
+    # Increment one of the in-process cache counters
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def cache_lookup(key: str) -> Path:
+    ''' cache_lookup: function to find a cached pdf and mark it as
+            recently used (modification time drives LRU eviction)
+
+        Args:
+            key (str): cache key from cache_key
+
+        Returns:
+            Path: path of cached pdf, or None on a miss
+    '''
+    path: Path = cache_path(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        count('misses')
+        return None
+    count('hits')
+    return path
+
+
+def cache_entries() -> list:
+    # All cache files as (modification time, size, path), oldest first
+    entries: list = []
+    for path in cache_dir().glob('*/*.pdf'):
+        try:
+            info = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((info.st_mtime, info.st_size, path))
+    return sorted(entries)
+
+
+def cache_added(size: int) -> None:
+    ''' cache_added: function to record a new cache entry of size bytes
+            and evict least recently used entries while the cache is
+            larger than settings.PDF_CACHE_MAX_BYTES
+
+        Args:
+            size (int): size of added file in bytes
+    '''
+    directory: str = str(cache_dir())
+    with _stats_lock:
+        if directory not in _sizes:
+            _sizes[directory] = sum(entry[1] for entry in cache_entries())
+        else:
+            _sizes[directory] += size
+        if _sizes[directory] <= settings.PDF_CACHE_MAX_BYTES:
+            return
+
+        # Re-scan: other processes may have added or evicted entries
+        entries: list = cache_entries()
+        total: int = sum(entry[1] for entry in entries)
+        # Never evict the newest entry, which was just added
+        for _, entry_size, path in entries[:-1]:
+            if total <= settings.PDF_CACHE_MAX_BYTES:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= entry_size
+            _stats['evictions'] += 1
+        _sizes[directory] = total
+
+
+def cache_stats() -> dict:
+    ''' cache_stats: function to return hit / miss / eviction counters
+            of this API process and current size of the shared cache
+
+        Returns:
+            dict: counters plus 'hit_rate', 'entries', 'bytes' and
+                'max_bytes'
+    '''
+    entries: list = cache_entries()
+    with _stats_lock:
+        stats: dict = dict(_stats)
+    lookups: int = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0
+    stats['entries'] = len(entries)
+    stats['bytes'] = sum(entry[1] for entry in entries)
+    stats['max_bytes'] = settings.PDF_CACHE_MAX_BYTES
+    return stats
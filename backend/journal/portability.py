@@ -0,0 +1,259 @@
+import json
+from datetime import (datetime, timezone)
+from typing import (Iterable, Iterator)
+from django.db import (transaction, DatabaseError)
+from django.db.models import (Prefetch, QuerySet)
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from .models import Journal
+from .serializers import (JournalSerializer, JournalImportSerializer)
+from .indexing import index_new_journals
+from .utils.text import content_fields
+from dashboard.functions.stats import recompute_user_stats
+from dashboard.models.tag import Tag
+from dashboard.serializers.tag import TagSerializer
+from login.models.user import User
+
+
+# Fields written for each record of an account export
+EXPORT_TAG_FIELDS = ['id', 'name', 'date_created']
+EXPORT_JOURNAL_FIELDS = ['id', 'title', 'content', 'date_created',
+                         'word_count', 'char_count', 'content_hash']
+
+# Rows loaded per database round trip while exporting
+EXPORT_CHUNK_SIZE = 500
+
+# Records validated and written per transaction while importing
+IMPORT_CHUNK_SIZE = 500
+
+# Maximum number of per-record errors returned by an import
+IMPORT_MAX_ERRORS = 1000
+
+
+def ndjson_line(record: dict) -> str:
+    # One NDJSON line, with uuids and datetimes encoded as DRF does
+    return json.dumps(record, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def stream_account(userId: str,
+                   chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    ''' stream_account: function to export every Tag and Journal
+            instance of a User instance as NDJSON, one record per line,
+            loading rows in chunks so memory use does not depend on the
+            number of journals
+
+            Lines are {"type": "tag", ...} for each tag first, then
+            {"type": "journal", ..., "tags": [tag ids]} for each journal,
+            so tags are written once and referenced by id
+
+        Args:
+            userId (str): id of exported User instance
+            chunk_size (int): rows loaded per database round trip
+
+        Yields:
+            bytes: NDJSON lines of one chunk of rows
+    '''
+    tag_serializer = TagSerializer(fields=EXPORT_TAG_FIELDS)
+    tags: QuerySet[Tag] = Tag.objects.filter(user=userId).only(
+        *EXPORT_TAG_FIELDS).order_by('date_created', 'id')
+    lines: list = []
+    for tag in tags.iterator(chunk_size=chunk_size):
+        lines.append(ndjson_line({'type': 'tag',
+                                  **tag_serializer.to_representation(tag)}))
+        if len(lines) == chunk_size:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+
+    journal_serializer = JournalSerializer(fields=EXPORT_JOURNAL_FIELDS)
+    journals: QuerySet[Journal] = Journal.objects.filter(
+        user=userId).only(*EXPORT_JOURNAL_FIELDS).order_by(
+        'date_created', 'id').prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.only('id')))
+    for journal in journals.iterator(chunk_size=chunk_size):
+        lines.append(ndjson_line({
+            'type': 'journal',
+            **journal_serializer.to_representation(journal),
+            'tags': [str(tag.id) for tag in journal.tags.all()]}))
+        if len(lines) == chunk_size:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+
+def read_ndjson(stream) -> Iterator[tuple]:
+    ''' read_ndjson: function to read NDJSON records one line at a
+            time from a binary stream (e.g. the request body)
+
+        Args:
+            stream (file): binary file-like object, or None if empty
+
+        Yields:
+            tuple: (line number, decoded record, or None if the line is
+                not valid json)
+    '''
+    if stream is None:
+        return
+    for number, line in enumerate(iter(stream.readline, b''), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield (number, json.loads(line))
+        except ValueError:
+            yield (number, None)
+
+
+class JournalImport:
+    ''' JournalImport: bulk import of journal (and tag) records for a
+            User instance, validated and written in chunks with one
+            transaction and a fixed number of bulk inserts per chunk
+
+        Args:
+            user (User): owner of imported journals and tags
+            chunk_size (int): records per transaction
+    '''
+
+    def __init__(self, user: User,
+                 chunk_size: int = IMPORT_CHUNK_SIZE) -> None:
+        self.user: User = user
+        self.chunk_size: int = chunk_size
+        self.now: datetime = datetime.now(tz=timezone.utc).replace(
+            microsecond=0)
+        self.validator = JournalImportSerializer()
+        # User's tags by name and by id, extended as tags are created
+        self.tag_ids: dict = dict(Tag.objects.filter(user=user).values_list(
+            'name', 'id'))
+        self.tag_names: dict = {str(tag_id): name for name, tag_id
+                                in self.tag_ids.items()}
+        # Exported tag ids (from 'tag' records) mapped to tag names
+        self.aliases: dict = {}
+        self.totals: dict = {'journals': 0, 'tags': 0, 'failed': 0,
+                             'errors': []}
+
+    def run(self, records: Iterable[tuple]) -> dict:
+        ''' run: function to import all (line number, record) pairs
+
+            Args:
+                records (iterable): (line number, record) tuples, record
+                    being a dict with 'title', 'content', optional
+                    'date_created' and 'tags', or {'type': 'tag', 'id',
+                    'name'} as written by stream_account
+
+            Returns:
+                dict: number of created 'journals' and 'tags', number of
+                    'failed' records and their 'errors'
+        '''
+        chunk: list = []
+        for number, record in records:
+            chunk.append((number, record))
+            if len(chunk) == self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        self.import_chunk(chunk)
+        if self.totals['journals'] > 0:
+            # Bulk inserts skip the signals keeping stats up to date
+            recompute_user_stats([self.user.id])
+        if self.totals['journals'] > 0 or self.totals['tags'] > 0:
+            User.objects.filter(id=self.user.id).touch_collection()
+        return self.totals
+
+    def error(self, number: int, detail) -> None:
+        # Record a failed record, keeping at most IMPORT_MAX_ERRORS
+        self.totals['failed'] += 1
+        if len(self.totals['errors']) < IMPORT_MAX_ERRORS:
+            self.totals['errors'].append({'line': number, 'detail': detail})
+
+    def tag_name(self, value: str) -> str:
+        # Resolve a tag reference (own tag id, exported id or name)
+        value = str(value)
+        if value in self.tag_names:
+            return self.tag_names[value]
+        return self.aliases.get(value, value).strip().title()
+
+    def validate(self, chunk: list) -> tuple:
+        # Split a chunk into valid journal rows and tag names to create
+        rows: list = []
+        new_tags: dict = {}
+        for number, record in chunk:
+            if not isinstance(record, dict):
+                self.error(number, 'Invalid JSON object.')
+            elif record.get('type') == 'tag':
+                name: str = str(record.get('name', '')).strip().title()
+                if not 2 <= len(name) <= 50:
+                    self.error(number, 'Invalid tag name.')
+                    continue
+                if 'id' in record:
+                    self.aliases[str(record['id'])] = name
+                if name not in self.tag_ids:
+                    new_tags.setdefault(name, number)
+            else:
+                try:
+                    data: dict = self.validator.run_validation(record)
+                except ValidationError as error:
+                    self.error(number, error.detail)
+                    continue
+                names: list = list(dict.fromkeys(
+                    self.tag_name(tag) for tag in data.pop('tags')))
+                if any(not 2 <= len(name) <= 50 for name in names):
+                    self.error(number, 'Invalid tag name.')
+                    continue
+                for name in names:
+                    if name not in self.tag_ids:
+                        new_tags.setdefault(name, number)
+                rows.append((number, data, names))
+        return (rows, new_tags)
+
+    def import_chunk(self, chunk: list) -> None:
+        ''' import_chunk: function to validate one chunk of records and
+                write its new tags, journals, tag links and search index
+                entries in one transaction
+
+            Args:
+                chunk (list): (line number, record) tuples
+        '''
+        rows, new_tags = self.validate(chunk)
+
+        # Tag names are unique across users: skip records needing a
+        # name that another user already has
+        taken: set = set(Tag.objects.filter(name__in=list(new_tags))
+                         .values_list('name', flat=True))
+        for name in taken:
+            new_tags.pop(name)
+        if taken:
+            for number, _, names in rows:
+                if taken.intersection(names):
+                    self.error(number, 'Tag name already in use.')
+            rows = [row for row in rows if not taken.intersection(row[2])]
+
+        tags: list = [Tag(user=self.user, name=name, date_created=self.now)
+                      for name in new_tags]
+        journals: list = []
+        for _, data, _ in rows:
+            data.setdefault('date_created', self.now)
+            journals.append(Journal(user=self.user, **data,
+                                    **content_fields(data['content'])))
+        tag_ids: dict = {**self.tag_ids,
+                         **{tag.name: tag.id for tag in tags}}
+        through = Journal.tags.through
+        links: list = [through(journal_id=journal.id, tag_id=tag_ids[name])
+                       for journal, (_, _, names) in zip(journals, rows)
+                       for name in names]
+
+        try:
+            with transaction.atomic():
+                Tag.objects.bulk_create(tags)
+                Journal.objects.bulk_create(journals)
+                through.objects.bulk_create(links)
+                Tag.objects.filter(id__in={link.tag_id for link in links}
+                                   ).refresh_journal_counts()
+                index_new_journals(journals)
+        except DatabaseError:
+            for number, _, _ in rows:
+                self.error(number, 'Unable to save record.')
+            return
+
+        for tag in tags:
+            self.tag_ids[tag.name] = tag.id
+            self.tag_names[str(tag.id)] = tag.name
+        self.totals['tags'] += len(tags)
+        self.totals['journals'] += len(journals)
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils.text import get_valid_filename
+from .models import Journal
+from .utils.slate import content_html
+from .utils.text import content_hash
+
+
+# Number of rendered journal revisions kept in memory per API process
+RENDER_CACHE_SIZE = 256
+
+_rendered: OrderedDict = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def journal_revision(journal: Journal) -> tuple:
+    # Identity of a journal's content: id plus hash of stored content
+    return (journal.id, journal.content_hash or content_hash(journal.content))
+
+
+def render_journal_html(journal: Journal) -> str:
+    ''' render_journal_html: function to turn stored Journal content
+            into the html sent to the pdf renderer, memoized per journal
+            revision so repeat exports skip serializing the Slate tree
+
+        Args:
+            journal (Journal): Journal instance with content loaded
+
+        Returns:
+            str: html string
+    '''
+    key: tuple = journal_revision(journal)
+    with _rendered_lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key]
+
+    html: str = content_html(journal.content)
+    with _rendered_lock:
+        _rendered[key] = html
+        if len(_rendered) > RENDER_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    return html
+
+
+def export_filename(journal: Journal) -> str:
+    # Attachment name of an exported journal, based on its title
+    try:
+        return f'{get_valid_filename(journal.title)}.pdf'
+    except SuspiciousFileOperation:
+        return 'journal.pdf'
@@ -1,22 +1,41 @@
 from datetime import datetime
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Journal
+from .models import (Journal, ExportJob)
+from .indexing import (index_journal, index_new_journals)
+from .utils.text import content_fields
+from dashboard.models.tag import Tag
 from dashboard.serializers.tag import TagSerializer
+from login.serializers.custom import DynamicFieldsModelSerializer
 
 
-class JournalSerializer(serializers.ModelSerializer):
+class JournalSerializer(DynamicFieldsModelSerializer):
     ''' JournalSerializer: custom Journal serializer for validating
             data and creating / updating instances of class Journal
 
         Args:
-            ModelSerializer (class): Django generic serializer
-                model class
+            DynamicFieldsModelSerializer (class):  custom serializer
+                class that takes an additional `fields` argument to
+                controls which fields should be returned by serializer
     '''
     tags = TagSerializer(many=True, required=False)
 
     class Meta:
         model = Journal
-        fields = '__all__'
+        exclude = ['content_text']
+        read_only_fields = ['word_count', 'char_count', 'content_hash',
+                            'version']
+
+    @classmethod
+    def optimize_queryset(cls, queryset: QuerySet, fields: list,
+                          required: tuple = ()) -> QuerySet:
+        # Prefetch tags when returned so serializing costs fixed queries
+        queryset = super().optimize_queryset(queryset, fields, required)
+        if fields is None or 'tags' in fields:
+            queryset = queryset.with_tags()
+        return queryset
 
     def validate_title(self, value: str) -> str:
         # Validate title to return first letter capitalized each word
@@ -28,32 +47,110 @@ class JournalSerializer(serializers.ModelSerializer):
         date_created: datetime = value.replace(microsecond=0)
         return date_created
 
+    def set_tags(self, journal: Journal, tag_ids: list,
+                 created: bool = False) -> None:
+        ''' set_tags: function to make tag_ids the tags of a Journal
+                instance, removing and adding only the difference from
+                its current tags (one delete and one insert at most)
+
+            Args:
+                journal (Journal): Journal instance to tag
+                tag_ids (list): Tag id strings, an empty list leaves
+                    current tags unchanged
+                created (bool): True if journal was just created and
+                    has no tags yet
+        '''
+        if len(tag_ids) == 0:
+            return
+        to_python = Tag._meta.pk.to_python
+        new_ids: set = {to_python(id) for id in tag_ids}
+        current_ids: set = set() if created else set(
+            Journal.tags.through.objects.filter(journal=journal)
+            .values_list('tag_id', flat=True))
+        removed: set = current_ids - new_ids
+        added: set = new_ids - current_ids
+        if len(removed) > 0:
+            journal.tags.remove(*removed)
+        if len(added) > 0:
+            journal.tags.add(*added)
+
     def create(self, validated_data) -> Journal:
         # Create new instance of Journal model once data validated
         tag_ids: list = self.initial_data['tag_list']
+        validated_data.update(content_fields(validated_data['content']))
         journal = Journal.objects.create(**validated_data)
-        if len(tag_ids) > 0:
-            for id in tag_ids:
-                journal.tags.add(id)
-        journal.save()
+        self.set_tags(journal, tag_ids, created=True)
+        index_new_journals([journal])
         return journal
 
     def update(self, instance, validated_data) -> Journal:
-        # Update existing instance of Journal model once data validated
-        try:
-            tag_ids: list = self.initial_data['tag_list']
-            current_tags: list = instance.tags.all()
-            if len(tag_ids) > 0 and len(current_tags) > 0:
-                for tag in current_tags:
-                    instance.tags.remove(tag)
-
-            if len(tag_ids) > 0:
-                for id in tag_ids:
-                    instance.tags.add(id)
-        except KeyError:
-            pass
-
-        instance.title = validated_data.get('title', instance.title)
-        instance.content = validated_data.get('content', instance.content)
-        instance.save()
+        ''' update: function to update an existing Journal instance once
+                data validated, with a single UPDATE guarded by
+                context['base_version'] if given (see save_versioned)
+
+            Args:
+                instance (Journal): Journal instance to update
+                validated_data (dict): validated 'title' and 'content'
+
+            Returns:
+                Journal: updated Journal instance
+
+            Raises:
+                VersionConflict: stored version differs from base_version
+        '''
+        fields: dict = {'updated_at': timezone.now()}
+        if 'title' in validated_data:
+            fields['title'] = validated_data['title']
+        if 'content' in validated_data:
+            fields['content'] = validated_data['content']
+            fields.update(content_fields(fields['content']))
+        with transaction.atomic():
+            self.save_versioned(instance, fields)
+            if 'tag_list' in self.initial_data:
+                self.set_tags(instance, self.initial_data['tag_list'])
+        if 'title' in validated_data or 'content' in validated_data:
+            index_journal(instance)
         return instance
+
+
+class ExportJobSerializer(DynamicFieldsModelSerializer):
+    ''' ExportJobSerializer: custom ExportJob serializer for returning
+            the status of asynchronous pdf exports
+
+        Args:
+            DynamicFieldsModelSerializer (class):  custom serializer
+                class that takes an additional `fields` argument to
+                controls which fields should be returned by serializer
+    '''
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'status', 'error', 'size', 'date_created',
+                  'date_completed']
+        read_only_fields = fields
+
+
+class JournalImportSerializer(serializers.ModelSerializer):
+    ''' JournalImportSerializer: serializer validating one imported
+            journal record (without saving it), with 'tags' given as tag
+            names or ids of the importing user's tags
+
+        Args:
+            ModelSerializer (class): Django generic serializer
+                model class
+    '''
+    tags = serializers.ListField(child=serializers.CharField(max_length=50),
+                                 required=False, default=list)
+
+    class Meta:
+        model = Journal
+        fields = ['title', 'content', 'date_created', 'tags']
+        extra_kwargs = {'date_created': {'required': False}}
+
+    def validate_title(self, value: str) -> str:
+        # Validate title to return first letter capitalized each word
+        return value.title()
+
+    def validate_date_created(self, value: datetime) -> datetime:
+        # Validate date_created to remove microseconds from datetime
+        return value.replace(microsecond=0)
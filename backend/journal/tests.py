@@ -1,3 +1,1036 @@
-# from django.test import TestCase
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import (datetime, timezone as dt_timezone)
+from unittest.mock import patch
+from django.db import connection
+from django.test import (TestCase, override_settings)
+from django.utils import timezone
+from pypdf import PdfReader
+from . import exports
+from .autosave import autosave_buffer
+from .dataset import generate_dataset
+from .fts import (FTS_TABLE, install_fts, rebuild_fts)
+from .functions import parse_date_range
+from .indexing import (index_new_journals, rebuild_search_index)
+from .models import (Journal, JournalToken)
+from .pdf_cache import (cache_key, cache_path)
+from .utils.text import content_fields
+from .utils.operations import apply_operations
+from .utils.pdf import render_pdf_file
+from .utils.responses import export_failed
+from .utils.slate import content_html
+from login.tests import (ApiClientMixin, RouteBudgetMixin, create_user,
+                         seed_user_data, SAMPLE_CONTENT)
 
-# Create your tests here.
+
+URL = '/journal/journals'
+
+# Rendered exports are written here instead of the real MEDIA_ROOT
+TEST_MEDIA_ROOT = tempfile.mkdtemp(prefix='journal-tests-')
+
+
+@override_settings(EXPORT_MAX_WORKERS=0, MEDIA_ROOT=TEST_MEDIA_ROOT)
+class JournalRouteBudgetTests(RouteBudgetMixin, TestCase):
+    ''' JournalRouteBudgetTests: query and time budgets for
+            'journal/journals' routes, each run against a user with few
+            journals and a user with many (pdf renders run inline)
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.small_user = create_user('smalluser')
+        cls.large_user = create_user('largeuser')
+        cls.small = seed_user_data(cls.small_user, 2, 2)
+        cls.large = seed_user_data(cls.large_user, 25, 6)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def each_user(self, method: str, action: str, data: dict) -> list:
+        # Build the same request for the small and large user
+        return [(method, f'{URL}/{action}', {'user': str(user.id), **data})
+                for user in (self.small_user, self.large_user)]
+
+    def journal_ids(self) -> list:
+        # Ids of the small and large user's seeded journals
+        return [[journal.id for journal in data['journals']]
+                for data in (self.small, self.large)]
+
+    def test_add_journal(self) -> None:
+        self.assertRouteBudget('journals.add_journal', 12, *[
+            ('post', f'{URL}/add_journal', {
+                'user': str(user.id), 'title': 'New entry',
+                'content': SAMPLE_CONTENT,
+                'tag_list': [str(data['tags'][0].id)]})
+            for user, data in ((self.small_user, self.small),
+                               (self.large_user, self.large))])
+
+    def test_list(self) -> None:
+        self.assertRouteBudget('journals.list', 2, ('get', URL, None))
+
+    def test_user_journals(self) -> None:
+        self.assertRouteBudget('journals.user_journals', 3,
+                               *self.each_user('post', 'user_journals', {}),
+                               contains=self.journal_ids())
+
+    def test_user_journals_page(self) -> None:
+        self.assertRouteBudget(
+            'journals.user_journals.page', 3,
+            *self.each_user('post', 'user_journals',
+                            {'page_size': 10, 'sort': 'date'}))
+        response = self.send('post', f'{URL}/user_journals', {
+            'user': str(self.large_user.id), 'page_size': '10'})
+        self.assertEqual(len(response.data['detail']), 10)
+        for page_size in ([10], {'size': 10}, 'ten', 0, -1, '-1', True,
+                          2.7, '2.7', ' 5x', ''):
+            response = self.send('post', f'{URL}/user_journals', {
+                'user': str(self.large_user.id), 'page_size': page_size})
+            self.assertEqual(response.status_code, 400, page_size)
+
+    def test_user_journals_fields(self) -> None:
+        self.assertRouteBudget(
+            'journals.user_journals.fields', 2,
+            *self.each_user('post', 'user_journals',
+                            {'fields': 'id,title,date_created'}),
+            contains=self.journal_ids())
+
+    def test_user_journals_not_modified(self) -> None:
+        data: dict = {'user': str(self.large_user.id)}
+        response = self.send('post', f'{URL}/user_journals', data)
+        etag: str = response['ETag']
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.post(f'{URL}/user_journals', data,
+                                        format='json',
+                                        HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Any change to the user's journals or tags yields a new ETag
+        self.send('patch', f'{URL}/update_journal', {
+            **data, 'journal_id': str(self.large['journals'][0].id),
+            'title': 'Changed entry'})
+        response = self.client.post(f'{URL}/user_journals', data,
+                                    format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.send('post', '/dashboard/tags/add_tag',
+                  {**data, 'name': 'Fresh Tag'})
+        self.assertNotEqual(
+            self.send('post', f'{URL}/user_journals', data)['ETag'],
+            response['ETag'])
+
+    def test_search_journals(self) -> None:
+        searches: list = [('title', 'entry'), ('content', 'harbour'),
+                          ('tags', 'tag'), ('date', '2000/')]
+        for search_type, search_text in searches:
+            self.assertRouteBudget(
+                f'journals.search_journals.{search_type}', 3,
+                *self.each_user('post', 'search_journals', {
+                    'search_type': search_type,
+                    'search_text': search_text}),
+                contains=self.journal_ids())
+
+    def test_get_journal(self) -> None:
+        self.assertRouteBudget('journals.get_journal', 3, *[
+            ('post', f'{URL}/get_journal', {
+                'user': str(data['journals'][0].user_id),
+                'journal_id': str(data['journals'][0].id)})
+            for data in (self.small, self.large)],
+            contains=[[data['journals'][0].id, data['journals'][0].title]
+                      for data in (self.small, self.large)])
+
+    def test_export_journal(self) -> None:
+        self.assertRouteBudget(
+            'journals.export_journal', 0,
+            *self.each_user('post', 'export_journal',
+                            {'html_content': SAMPLE_CONTENT}))
+
+    def test_export_jobs(self) -> None:
+        self.assertRouteBudget('journals.submit_export', 4, *[
+            ('post', f'{URL}/submit_export', {
+                'user': str(user.id),
+                'html_content': SAMPLE_CONTENT + user.username})
+            for user in (self.small_user, self.large_user)],
+            status_code=202)
+        # Same html again: served from the pdf cache without rendering
+        job_ids: list = []
+        for user in (self.small_user, self.large_user):
+            response = self.send('post', f'{URL}/submit_export', {
+                'user': str(user.id),
+                'html_content': SAMPLE_CONTENT + user.username})
+            self.assertEqual(response.status_code, 202)
+            job_ids.append(response.data['detail'])
+        for action in ('export_status', 'download_export'):
+            self.assertRouteBudget(f'journals.{action}', 1, *[
+                ('post', f'{URL}/{action}', {'user': str(user.id),
+                                             'job_id': job_id})
+                for user, job_id in zip((self.small_user, self.large_user),
+                                        job_ids)])
+        response = self.send('post', f'{URL}/export_status', {
+            'user': str(self.small_user.id), 'job_id': job_ids[1]})
+        self.assertEqual(response.status_code, 207)
+
+    def test_export_cache(self) -> None:
+        html: str = SAMPLE_CONTENT + '<p>cache test</p>'
+        before: dict = self.send('get', f'{URL}/export_cache').data['detail']
+        first = self.send('post', f'{URL}/export_journal', {
+            'user': str(self.small_user.id), 'html_content': html})
+        second = self.send('post', f'{URL}/export_journal', {
+            'user': str(self.large_user.id), 'html_content': html})
+        self.assertEqual(first.data['detail'], second.data['detail'])
+        after: dict = self.send('get', f'{URL}/export_cache').data['detail']
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+        with override_settings(PDF_CACHE_MAX_BYTES=1):
+            self.send('post', f'{URL}/export_journal', {
+                'user': str(self.small_user.id),
+                'html_content': html + '<p>evicts others</p>'})
+        stats: dict = self.send('get', f'{URL}/export_cache').data['detail']
+        self.assertEqual(stats['entries'], 1)
+        self.assertGreater(stats['evictions'], after['evictions'])
+
+    def test_export_cache_budget(self) -> None:
+        # Stats are read from the cache directory, never the database,
+        # however many entries it holds
+        for entries in (1, 50):
+            media_root: str = tempfile.mkdtemp(dir=TEST_MEDIA_ROOT)
+            with override_settings(MEDIA_ROOT=media_root):
+                for number in range(entries):
+                    key: str = cache_key(f'<p>entry {number}</p>')
+                    cache_path(key).write_bytes(b'%PDF-1.4')
+                self.assertRouteBudget(
+                    'journals.export_cache', 0,
+                    ('get', f'{URL}/export_cache', None),
+                    contains=[[f'"entries":{entries}']])
+
+    @override_settings(EXPORT_MAX_WORKERS=1)
+    def test_export_worker_pool(self) -> None:
+        url: str = f'{URL}/export_journal'
+
+        def export(text: str):
+            # Export html not yet in the pdf cache, so a worker renders it
+            return self.send('post', url, {
+                'user': str(self.small_user.id),
+                'html_content': SAMPLE_CONTENT + f'<p>{text}</p>'})
+
+        def run_and_kill(function, *args):
+            # Kill the worker process while it holds the render
+            future = run_in_pool(function, *args)
+            for process in list(exports.get_executor()._processes.values()):
+                process.kill()
+            return future
+
+        run_in_pool = exports.run_in_pool
+        try:
+            response = export('pool render')
+            self.assertEqual(response.status_code, 200)
+            pdf: bytes = base64.b64decode(response.data['detail'])
+            self.assertIn('pool render', PdfReader(io.BytesIO(pdf))
+                          .pages[0].extract_text())
+            pool = exports.get_executor()
+
+            with patch.object(exports, 'run_in_pool', run_and_kill):
+                response = export('pool crash')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['detail'], export_failed)
+
+            # The broken pool was replaced and renders the next export
+            self.assertEqual(export('pool crash').status_code, 200)
+            self.assertIsNot(exports.get_executor(), pool)
+        finally:
+            exports.shutdown_executor()
+
+    def test_render_pdf_file_threads(self) -> None:
+        # Inline renders of the same entry from several threads each
+        # write their own temporary file before moving it into place
+        directory: str = tempfile.mkdtemp(dir=TEST_MEDIA_ROOT)
+        path: str = os.path.join(directory, 'entry.pdf')
+        with ThreadPoolExecutor(4) as pool:
+            sizes: list = list(pool.map(
+                lambda _: render_pdf_file(SAMPLE_CONTENT, path), range(8)))
+        self.assertEqual(os.listdir(directory), ['entry.pdf'])
+        self.assertEqual(os.path.getsize(path), sizes[-1])
+        self.assertIn('harbour', PdfReader(path).pages[0].extract_text())
+
+    def test_export_worker_failure(self) -> None:
+        data: dict = {'user': str(self.small_user.id),
+                      'html_content': SAMPLE_CONTENT + '<p>crash</p>'}
+        for error in (BrokenProcessPool('worker died'), OSError('disk')):
+            with patch.object(exports, 'render_pdf_file',
+                              side_effect=error):
+                response = self.send('post', f'{URL}/export_journal', data)
+            self.assertEqual(response.status_code, 400)
+
+        # A worker process exiting mid-render breaks its pool, which is
+        # replaced for the next render
+        with override_settings(EXPORT_MAX_WORKERS=1):
+            try:
+                broken = exports.get_executor()
+                with self.assertRaises(BrokenProcessPool):
+                    exports.run_in_pool(os._exit, 1).result(60)
+                self.assertEqual(exports.run_in_pool(abs, -3).result(60), 3)
+                self.assertIsNot(exports.get_executor(), broken)
+            finally:
+                exports.shutdown_executor()
+
+    def test_export_download(self) -> None:
+        self.assertRouteBudget(
+            'journals.export_journal.download', 0,
+            *self.each_user('post', 'export_journal', {
+                'html_content': SAMPLE_CONTENT, 'download': True}))
+        response = self.send('post', f'{URL}/export_journal', {
+            'user': str(self.small_user.id), 'html_content': SAMPLE_CONTENT,
+            'download': True})
+        pdf: bytes = b''.join(response.streaming_content)
+        response.close()
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(int(response['Content-Length']), len(pdf))
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+        job_id: str = self.send('post', f'{URL}/submit_export', {
+            'user': str(self.small_user.id),
+            'html_content': SAMPLE_CONTENT}).data['detail']
+        response = self.send('post', f'{URL}/download_export', {
+            'user': str(self.small_user.id), 'job_id': job_id,
+            'download': 'true'})
+        self.assertEqual(b''.join(response.streaming_content), pdf)
+        response.close()
+
+    def test_export_by_id(self) -> None:
+        self.assertRouteBudget('journals.export_journal.journal_id', 1, *[
+            ('post', f'{URL}/export_journal', {
+                'user': str(data['journals'][0].user_id),
+                'journal_id': str(data['journals'][0].id)})
+            for data in (self.small, self.large)])
+        journal = self.small['journals'][0]
+        by_id = self.send('post', f'{URL}/export_journal', {
+            'user': str(journal.user_id), 'journal_id': str(journal.id),
+            'download': True})
+        self.assertIn('Journal_Entry_0.pdf', by_id['Content-Disposition'])
+        by_html = self.send('post', f'{URL}/export_journal', {
+            'user': str(journal.user_id), 'html_content': journal.content,
+            'download': True})
+        self.assertEqual(b''.join(by_id.streaming_content),
+                         b''.join(by_html.streaming_content))
+        by_id.close()
+        by_html.close()
+        response = self.send('post', f'{URL}/export_journal', {
+            'user': str(self.large_user.id), 'journal_id': str(journal.id)})
+        self.assertEqual(response.status_code, 207)
+
+        slate: list = [{'type': 'paragraph', 'align': 'left',
+                        'children': [{'text': 'Hi & bye', 'bold': True}]}]
+        self.assertEqual(content_html(json.dumps(slate)),
+                         '<p style="text-align:left"><strong>Hi &amp; bye'
+                         '</strong></p>')
+        self.assertEqual(content_html(SAMPLE_CONTENT), SAMPLE_CONTENT)
+
+    def test_deeply_nested_content(self) -> None:
+        # Too deep to parse as Slate json: indexed as plain text
+        content: str = '[' * 3000 + 'deep'
+        self.assertEqual(content_fields(content)['content_text'],
+                         '[' * 3000 + 'deep')
+        user: str = str(self.small_user.id)
+        response = self.send('post', f'{URL}/add_journal', {
+            'user': user, 'title': 'Nested', 'content': content,
+            'tag_list': []})
+        self.assertEqual(response.status_code, 200)
+        response = self.send('patch', f'{URL}/update_journal', {
+            'user': user, 'journal_id': response.data['detail'],
+            'content': content + '!'})
+        self.assertEqual(response.status_code, 200)
+        response = self.send('post', f'{URL}/import_journals', {
+            'user': user, 'journals': [{'title': 'Nested import',
+                                        'content': content}]})
+        self.assertEqual(response.status_code, 200)
+
+    def test_content_html_malformed(self) -> None:
+        slate: list = [
+            {'type': 'heading', 'level': '1><script>x</script',
+             'align': '"><script>x</script>',
+             'children': [{'text': 'Title'}, 'stray', None]},
+            {'type': 'heading', 'level': 3, 'align': 'center',
+             'children': [{'text': 7}, {'text': 'Sub'}]},
+            {'type': 'paragraph', 'align': ['left'], 'children': 'x'},
+            {'type': 'link', 'url': {'href': 'x'},
+             'children': [{'text': 'here'}]}]
+        self.assertEqual(content_html(json.dumps(slate)),
+                         '<h1 style="text-align:">Title</h1>'
+                         '<h3 style="text-align:center">Sub</h3>'
+                         '<p style="text-align:"></p>'
+                         '<a target="_blank" href="">here</a>')
+
+        # Nesting past MAX_SLATE_DEPTH is cut off instead of recursing
+        node: dict = {'text': 'deep'}
+        for _ in range(300):
+            node = {'type': 'list-item', 'children': [node]}
+        html: str = content_html(json.dumps([node]))
+        self.assertTrue(html.startswith('<li><li>'))
+        self.assertNotIn('deep', html)
+        # Too deep to even parse: kept as stored, like other non-Slate text
+        deep: str = ('[' + '{"children":[' * 5000 + '{"text":"deep"}' +
+                     ']}' * 5000 + ']')
+        self.assertEqual(content_html(deep), deep)
+
+    def test_batch_export(self) -> None:
+        for export_format in ('pdf', 'zip'):
+            self.assertRouteBudget(
+                f'journals.batch_export.{export_format}', 2,
+                *self.each_user('post', 'batch_export', {
+                    'date_range': '2000/2100', 'format': export_format}))
+        journals: list = self.large['journals'][:3]
+        response = self.send('post', f'{URL}/batch_export', {
+            'user': str(self.large_user.id), 'format': 'zip',
+            'journal_ids': [str(journal.id) for journal in journals]})
+        archive = zipfile.ZipFile(io.BytesIO(
+            b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 3)
+        self.assertIsNone(archive.testzip())
+        response = self.send('post', f'{URL}/batch_export', {
+            'user': str(self.small_user.id),
+            'tag_id': str(self.small['tags'][0].id)})
+        merged = PdfReader(io.BytesIO(b''.join(response.streaming_content)),
+                           strict=True)
+        response.close()
+        self.assertEqual(len(merged.pages), 2)
+        self.assertEqual(response['X-Export-Failed'], '0')
+        self.assertCountEqual(
+            [item.title for item in merged.outline],
+            [journal.title for journal in self.small['journals']])
+        for page in merged.pages:
+            self.assertIn('harbour', page.extract_text())
+        response = self.send('post', f'{URL}/batch_export', {
+            'user': str(self.small_user.id), 'date_range': 'not a date'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_account(self) -> None:
+        self.assertRouteBudget('journals.export_account', 4,
+                               *self.each_user('post', 'export_account', {}),
+                               contains=self.journal_ids())
+        response = self.send('post', f'{URL}/export_account',
+                             {'user': str(self.large_user.id)})
+        records: list = [json.loads(line) for line in b''.join(
+            response.streaming_content).decode('utf-8').splitlines()]
+        tags: list = [record for record in records if record['type'] == 'tag']
+        journals: list = [record for record in records
+                          if record['type'] == 'journal']
+        self.assertEqual(len(tags), 6)
+        self.assertEqual(len(journals), 25)
+        self.assertEqual(records[:6], tags)
+        tag_ids: set = {tag['id'] for tag in tags}
+        for journal in journals:
+            self.assertEqual(len(journal['tags']), 2)
+            self.assertTrue(set(journal['tags']) <= tag_ids)
+            self.assertIn('content', journal)
+
+    def test_import_journals(self) -> None:
+        self.assertRouteBudget('journals.import_journals', 19, *[
+            ('post', f'{URL}/import_journals', {
+                'user': str(user.id),
+                'journals': [{'title': f'imported {number}',
+                              'content': SAMPLE_CONTENT,
+                              'tags': [f'import {user.username}',
+                                       str(data['tags'][0].id)]}
+                             for number in range(20)]})
+            for user, data in ((self.small_user, self.small),
+                               (self.large_user, self.large))])
+        self.assertEqual(Journal.objects.filter(
+            user=self.large_user, title='Imported 1',
+            tags__name=f'Import {self.large_user.username}'.title())
+            .count(), 1)
+        self.assertTrue(JournalToken.objects.filter(
+            user=self.large_user, token='imported').exists())
+
+    def test_import_account_export(self) -> None:
+        user = self.large_user
+        export = self.send('post', f'{URL}/export_account',
+                           {'user': str(user.id)})
+        body: bytes = b''.join(export.streaming_content)
+        other_tag: str = self.small['tags'][0].name
+        body += (b'not json\n' +
+                 json.dumps({'title': 'x', 'content': SAMPLE_CONTENT})
+                 .encode('utf-8') + b'\n' +
+                 json.dumps({'title': 'Taken', 'content': SAMPLE_CONTENT,
+                             'tags': [other_tag]}).encode('utf-8') + b'\n')
+        response = self.client.post(
+            f'{URL}/import_journals?user={user.id}', body,
+            content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 207)
+        detail: dict = response.data['detail']
+        self.assertEqual(detail['created'], 25)
+        self.assertEqual(detail['tags_created'], 0)
+        self.assertEqual(detail['failed'], 3)
+        self.assertEqual([error['line'] for error in detail['errors']],
+                         [32, 33, 34])
+        self.assertEqual(Journal.objects.filter(user=user).count(), 50)
+        journal: Journal = Journal.objects.filter(user=user).latest(
+            'date_created')
+        self.assertEqual(
+            Journal.objects.filter(user=user, title=journal.title,
+                                   content_hash=journal.content_hash)
+            .count(), 2)
+
+    def test_update_journal(self) -> None:
+        self.assertRouteBudget('journals.update_journal', 20, *[
+            ('patch', f'{URL}/update_journal', {
+                'user': str(data['journals'][0].user_id),
+                'journal_id': str(data['journals'][0].id),
+                'title': 'Updated entry', 'content': SAMPLE_CONTENT + 'x',
+                'tag_list': [str(data['tags'][1].id)]})
+            for data in (self.small, self.large)],
+            contains=[[data['journals'][0].id]
+                      for data in (self.small, self.large)])
+
+    def test_update_journal_same_tags(self) -> None:
+        journals: list = [data['journals'][0] for data in (self.small,
+                                                           self.large)]
+        tag_ids: list = [sorted(str(tag.id) for tag in journal.tags.all())
+                         for journal in journals]
+        self.assertRouteBudget('journals.update_journal.same_tags', 15, *[
+            ('patch', f'{URL}/update_journal', {
+                'user': str(journal.user_id), 'journal_id': str(journal.id),
+                'content': SAMPLE_CONTENT + 'y', 'tag_list': ids})
+            for journal, ids in zip(journals, tag_ids)],
+            contains=[[journal.id] for journal in journals])
+        for journal, ids in zip(journals, tag_ids):
+            self.assertEqual(sorted(str(tag.id) for tag in
+                                    journal.tags.all()), ids)
+
+    def test_remove_journal(self) -> None:
+        self.assertRouteBudget('journals.remove_journal', 9, *[
+            ('delete', f'{URL}/remove_journal', {
+                'user': str(data['journals'][1].user_id),
+                'journal_id': str(data['journals'][1].id)})
+            for data in (self.small, self.large)])
+        for data in (self.small, self.large):
+            self.assertFalse(Journal.objects.filter(
+                id=data['journals'][1].id).exists())
+
+
+class DatasetTests(TestCase):
+    ''' DatasetTests: synthetic dataset generator used by the
+            'benchmark_routes' command
+    '''
+
+    def test_generate_dataset(self) -> None:
+        first: dict = generate_dataset(2, 5, 3, 'fixed', seed=7)
+        second: dict = generate_dataset(2, 5, 3, 'fixed', seed=7)
+        self.assertEqual(first['journals'], 10)
+        self.assertEqual(first['tags'], 6)
+        journals: list = [
+            list(Journal.objects.filter(user_id=user_id).order_by(
+                'date_created', 'title').values_list('content', flat=True))
+            for user_id in (first['user_ids'][0], second['user_ids'][0])]
+        self.assertEqual(journals[0], journals[1])
+        journal: Journal = Journal.objects.filter(
+            user_id=first['user_ids'][0]).first()
+        self.assertTrue(journal.content.startswith('<'))
+        self.assertGreater(journal.word_count, 0)
+        self.assertTrue(JournalToken.objects.filter(journal=journal).exists())
+
+
+SLATE_CONTENT = json.dumps([
+    {'type': 'heading', 'level': 2, 'children': [{'text': 'Morning walk'}]},
+    {'type': 'paragraph', 'align': 'left',
+     'children': [{'text': 'Walked along the harbour.'}]}])
+
+
+class ContentOperationTests(RouteBudgetMixin, TestCase):
+    ''' ContentOperationTests: autosave updates sending Slate
+            operations against a base version instead of full content
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = create_user('slateuser')
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.journal: Journal = Journal.objects.create(
+            user=self.user, title='Slate Entry', content=SLATE_CONTENT,
+            date_created=timezone.now(), **content_fields(SLATE_CONTENT))
+
+    def patch(self, **data):
+        # Send an update_journal request for the test journal
+        return self.send('patch', f'{URL}/update_journal', {
+            'user': str(self.user.id), 'journal_id': str(self.journal.id),
+            **data})
+
+    def test_apply_operations(self) -> None:
+        content: str = apply_operations(SLATE_CONTENT, [
+            {'type': 'insert_text', 'path': [1, 0], 'offset': 25,
+             'text': ' Then coffee.'},
+            {'type': 'split_node', 'path': [1, 0], 'position': 25,
+             'properties': {}},
+            {'type': 'split_node', 'path': [1], 'position': 1,
+             'properties': {'type': 'paragraph', 'align': 'left'}},
+            {'type': 'remove_text', 'path': [2, 0], 'offset': 0,
+             'text': ' '},
+            {'type': 'set_node', 'path': [0], 'properties': {'level': 2},
+             'newProperties': {'level': 3}},
+            {'type': 'insert_node', 'path': [3],
+             'node': {'type': 'paragraph', 'children': [{'text': 'End'}]}},
+            {'type': 'move_node', 'path': [3], 'newPath': [1]},
+            {'type': 'set_selection', 'properties': None,
+             'newProperties': {'anchor': {'path': [0, 0], 'offset': 0}}}])
+        self.assertEqual(json.loads(content), [
+            {'type': 'heading', 'level': 3,
+             'children': [{'text': 'Morning walk'}]},
+            {'type': 'paragraph', 'children': [{'text': 'End'}]},
+            {'type': 'paragraph', 'align': 'left',
+             'children': [{'text': 'Walked along the harbour.'}]},
+            {'type': 'paragraph', 'align': 'left',
+             'children': [{'text': 'Then coffee.'}]}])
+        merged: str = apply_operations(content, [
+            {'type': 'merge_node', 'path': [3], 'position': 1,
+             'properties': {}},
+            {'type': 'remove_node', 'path': [1],
+             'node': {'type': 'paragraph', 'children': [{'text': 'End'}]}}])
+        self.assertEqual(len(json.loads(merged)[1]['children']), 2)
+        for operations in ([{'type': 'remove_node', 'path': [5]}],
+                           [{'type': 'insert_text', 'path': [0],
+                             'offset': 0, 'text': 'x'}],
+                           [{'type': 'remove_text', 'path': [0, 0],
+                             'offset': 0, 'text': 'Evening'}],
+                           [{'type': 'move_node', 'path': [1],
+                             'newPath': [1, 0]}],
+                           [{'type': 'unknown', 'path': [0]}]):
+            with self.assertRaises(ValueError):
+                apply_operations(SLATE_CONTENT, operations)
+        with self.assertRaises(ValueError):
+            apply_operations(SAMPLE_CONTENT, [])
+
+    def test_update_with_operations(self) -> None:
+        operations: list = [{'type': 'insert_text', 'path': [1, 0],
+                             'offset': 6, 'text': ' slowly'}]
+        response = self.patch(operations=operations, base_version=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+        self.journal.refresh_from_db()
+        self.assertEqual(self.journal.version, 1)
+        self.assertIn('Walked slowly along', self.journal.content)
+        self.assertEqual(self.journal.word_count, 7)
+        self.assertTrue(JournalToken.objects.filter(
+            journal=self.journal, token='slowly').exists())
+
+        # Operations made against an older version are rejected
+        response = self.patch(operations=operations, base_version=0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], 1)
+        response = self.patch(title='Guarded', base_version=0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.patch(title='Unguarded').data['version'], 2)
+
+        self.assertEqual(self.patch(operations=operations).status_code, 400)
+        self.assertEqual(self.patch(operations=[{'type': 'remove_node',
+                                                 'path': [9]}],
+                                    base_version=2).status_code, 400)
+        self.journal.refresh_from_db()
+        self.assertEqual(self.journal.version, 2)
+
+    def test_operations_on_deeply_nested_content(self) -> None:
+        content: str = '[' * 3000 + ']' * 3000
+        Journal.objects.filter(id=self.journal.id).update(content=content)
+        response = self.patch(base_version=0, operations=[
+            {'type': 'insert_text', 'path': [0, 0], 'offset': 0,
+             'text': 'x'}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_with_operations_budget(self) -> None:
+        self.assertRouteBudget('journals.update_journal.operations', 13, *[
+            ('patch', f'{URL}/update_journal', {
+                'user': str(self.user.id),
+                'journal_id': str(self.journal.id), 'base_version': version,
+                'operations': [{'type': 'insert_text', 'path': [1, 0],
+                                'offset': 0,
+                                'text': f'Draft{version} '}]})
+            for version in (0, 1)],
+            contains=[['"version":1'], ['"version":2']])
+
+
+@override_settings(AUTOSAVE_FLUSH_INTERVAL=60)
+class AutosaveTests(ApiClientMixin, TestCase):
+    ''' AutosaveTests: autosave updates are coalesced into at most one
+            write per journal and interval, and no-op writes are skipped
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = create_user('autosaveuser')
+        cls.journal = seed_user_data(cls.user, 1, 1)['journals'][0]
+
+    def setUp(self) -> None:
+        super().setUp()
+        autosave_buffer.written.clear()
+
+    def tearDown(self) -> None:
+        # Drop pending autosaves (and their timers) of this test
+        for timer in autosave_buffer.timers.values():
+            timer.cancel()
+        autosave_buffer.timers.clear()
+        autosave_buffer.pending.clear()
+        super().tearDown()
+
+    def autosave(self, **data):
+        # Send an autosave update_journal request for the test journal
+        return self.send('patch', f'{URL}/update_journal', {
+            'user': str(self.user.id), 'journal_id': str(self.journal.id),
+            'autosave': True, **data})
+
+    def stored(self) -> Journal:
+        return Journal.objects.get(id=self.journal.id)
+
+    def test_autosave_coalesced(self) -> None:
+        response = self.autosave(content=SAMPLE_CONTENT + '<p>one</p>')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['pending'])
+        self.assertEqual(self.stored().version, 1)
+
+        # Within the interval only the latest state is kept, in memory
+        for word in ('two', 'three'):
+            with self.assertNumQueries(1):
+                response = self.autosave(
+                    content=SAMPLE_CONTENT + f'<p>{word}</p>')
+            self.assertEqual(response.status_code, 202)
+            self.assertTrue(response.data['pending'])
+        self.assertEqual(self.stored().version, 1)
+        self.assertTrue(autosave_buffer.flush(self.journal.id))
+        journal: Journal = self.stored()
+        self.assertEqual(journal.version, 2)
+        self.assertTrue(journal.content.endswith('<p>three</p>'))
+        self.assertFalse(autosave_buffer.flush(self.journal.id))
+
+    def test_autosave_unchanged(self) -> None:
+        response = self.autosave(content=self.journal.content,
+                                 title=self.journal.title)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored().version, 0)
+        self.autosave(content=self.journal.content + '<p>x</p>')
+        self.autosave(content=self.journal.content)
+        self.assertFalse(autosave_buffer.flush(self.journal.id))
+        # Typing then undoing within the interval writes nothing
+        self.assertEqual(self.stored().content, self.journal.content)
+        self.assertEqual(self.stored().version, 0)
+
+    def test_explicit_update_writes_pending(self) -> None:
+        self.autosave(title='First draft')
+        self.autosave(content=SAMPLE_CONTENT + '<p>pending</p>')
+        response = self.send('patch', f'{URL}/update_journal', {
+            'user': str(self.user.id), 'journal_id': str(self.journal.id),
+            'title': 'Final title'})
+        self.assertEqual(response.status_code, 200)
+        journal: Journal = self.stored()
+        self.assertEqual(journal.title, 'Final Title')
+        self.assertTrue(journal.content.endswith('<p>pending</p>'))
+        self.assertEqual(journal.version, 2)
+        self.assertEqual(autosave_buffer.pending, {})
+
+    def test_autosave_rebased_after_other_update(self) -> None:
+        self.autosave(title='First draft')
+        self.autosave(title='Second draft')
+        # Saved by another process (e.g. tags only) after the autosave
+        # was buffered, title and content untouched
+        Journal.objects.filter(id=self.journal.id).update(version=5)
+        self.assertTrue(autosave_buffer.flush(self.journal.id))
+        journal: Journal = self.stored()
+        self.assertEqual(journal.title, 'Second Draft')
+        self.assertEqual(journal.version, 6)
+
+    def test_autosave_conflict_kept(self) -> None:
+        self.autosave(title='First draft')
+        self.autosave(title='Second draft')
+        # Title changed by another process after the autosave was buffered
+        Journal.objects.filter(id=self.journal.id).update(
+            title='Other Title', version=5)
+        with self.assertLogs('journal.autosave', 'WARNING'):
+            self.assertFalse(autosave_buffer.flush(self.journal.id))
+        self.assertEqual(self.stored().title, 'Other Title')
+        self.assertIn(self.journal.id, autosave_buffer.pending)
+
+        # Reported with the unsaved fields instead of being dropped
+        response = self.autosave(content=SAMPLE_CONTENT + '<p>late</p>')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], 5)
+        self.assertEqual(response.data['unsaved'], {
+            'title': 'Second Draft',
+            'content': SAMPLE_CONTENT + '<p>late</p>'})
+        self.assertEqual(autosave_buffer.pending, {})
+        self.assertEqual(self.stored().title, 'Other Title')
+        self.assertEqual(self.autosave(operations=[]).status_code, 400)
+
+    def test_autosave_base_version(self) -> None:
+        response = self.autosave(title='First draft', base_version=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+        # Still accepted by a client yet to see its own write's version
+        response = self.autosave(title='Second draft', base_version=0)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.autosave(
+            content=SAMPLE_CONTENT + '<p>pending</p>',
+            base_version=1).status_code, 202)
+        self.assertEqual(self.autosave(
+            title='Third draft', base_version='one').status_code, 400)
+
+        # Saved elsewhere: a stale base is answered right away
+        Journal.objects.filter(id=self.journal.id).update(version=5)
+        response = self.autosave(title='Third draft', base_version=1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], 5)
+        self.assertEqual(response.data['unsaved'], {
+            'title': 'Third Draft',
+            'content': SAMPLE_CONTENT + '<p>pending</p>'})
+        self.assertEqual(autosave_buffer.pending, {})
+        self.assertEqual(self.stored().title, 'First Draft')
+
+    def test_update_reports_conflicting_autosave(self) -> None:
+        self.autosave(title='First draft')
+        self.autosave(content=SAMPLE_CONTENT + '<p>pending</p>')
+        Journal.objects.filter(id=self.journal.id).update(
+            content=SAMPLE_CONTENT + '<p>other</p>', content_hash='',
+            version=5)
+        response = self.send('patch', f'{URL}/update_journal', {
+            'user': str(self.user.id), 'journal_id': str(self.journal.id),
+            'title': 'Final title'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], 5)
+        self.assertEqual(response.data['unsaved'], {
+            'content': SAMPLE_CONTENT + '<p>pending</p>'})
+        journal: Journal = self.stored()
+        self.assertEqual(journal.title, 'First Draft')
+        self.assertTrue(journal.content.endswith('<p>other</p>'))
+
+
+@override_settings(JOURNAL_SEARCH_BACKEND='fts5')
+class FtsSearchTests(ApiClientMixin, TestCase):
+    ''' FtsSearchTests: with the 'fts5' search backend, keyword
+            searches read the FTS5 table kept in sync by triggers and
+            rank matches by BM25
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = create_user('ftsuser')
+        cls.other_user = create_user('ftsother')
+
+    def setUp(self) -> None:
+        super().setUp()
+        # The test database was migrated with the default backend
+        self.assertTrue(install_fts())
+        self.journals: list = [self.add(self.user, title, content)
+                               for title, content in (
+            ('Harbour walk', '<p>harbour harbour harbour boats</p>'),
+            ('Long day', '<p>a long walk past the harbour and then on '
+                         'through town, the park and the hills</p>'),
+            ('Quiet evening', '<p>reading by the fire</p>'))]
+        self.add(self.other_user, 'Harbour', '<p>harbour</p>')
+
+    def add(self, user, title: str, content: str) -> str:
+        # Create a journal through the API and return its id
+        return self.send('post', f'{URL}/add_journal', {
+            'user': str(user.id), 'title': title, 'content': content,
+            'tag_list': []}).data['detail']
+
+    def search(self, search_type: str, search_text: str) -> list:
+        # Ids of the user's journals found by a keyword search, in order
+        response = self.send('post', f'{URL}/search_journals', {
+            'user': str(self.user.id), 'search_type': search_type,
+            'search_text': search_text})
+        if response.status_code == 207:
+            return []
+        self.assertEqual(response.status_code, 200)
+        return [journal['id'] for journal in response.data['detail']]
+
+    def test_search_ranked(self) -> None:
+        first, second, third = self.journals
+        self.assertEqual(self.search('content', 'harbour'), [first, second])
+        self.assertEqual(self.search('content', 'fire hills'),
+                         [third, second])
+        self.assertEqual(self.search('title', 'harbour'), [first])
+        self.assertEqual(self.search('title', 'boats'), [])
+
+    def test_update_and_delete_synced(self) -> None:
+        first, second, third = self.journals
+        response = self.send('patch', f'{URL}/update_journal', {
+            'user': str(self.user.id), 'journal_id': third,
+            'title': 'Harbour at night',
+            'content': '<p>harbour harbour harbour harbour</p>'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('content', 'harbour'),
+                         [third, first, second])
+        self.assertEqual(self.search('content', 'fire'), [])
+        self.assertEqual(self.search('title', 'night'), [third])
+
+        self.send('delete', f'{URL}/remove_journal', {
+            'user': str(self.user.id), 'journal_id': first})
+        self.assertEqual(self.search('content', 'harbour'), [third, second])
+        self.assertEqual(self.search('title', 'walk'), [])
+
+    def test_rebuild(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(self.search('content', 'harbour'), [])
+        rebuild_fts()
+        self.assertEqual(self.search('content', 'harbour'),
+                         self.journals[:2])
+
+
+class IndexSearchTests(ApiClientMixin, TestCase):
+    ''' IndexSearchTests: keyword searches read the JournalToken index,
+            which must match whole words and follow journal changes
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = create_user('indexuser')
+
+    def add(self, title: str, content: str) -> str:
+        # Create a journal through the API and return its id
+        return self.send('post', f'{URL}/add_journal', {
+            'user': str(self.user.id), 'title': title, 'content': content,
+            'tag_list': []}).data['detail']
+
+    def search(self, search_type: str, search_text: str) -> set:
+        # Ids of the user's journals found by a keyword search
+        response = self.send('post', f'{URL}/search_journals', {
+            'user': str(self.user.id), 'search_type': search_type,
+            'search_text': search_text})
+        if response.status_code == 207:
+            return set()
+        self.assertEqual(response.status_code, 200)
+        return {journal['id'] for journal in response.data['detail']}
+
+    def tokens(self, journal_id: str, field: str = 'content') -> set:
+        return set(JournalToken.objects.filter(
+            journal=journal_id, field=field).values_list('token', flat=True))
+
+    def test_whole_words(self) -> None:
+        journal_id: str = self.add('Harbour walk', '<p>Boats, boats!</p>')
+        self.assertEqual(self.search('content', 'BOATS'), {journal_id})
+        self.assertEqual(self.search('title', 'harbour'), {journal_id})
+        # Substrings and stop words are not indexed
+        self.assertEqual(self.search('title', 'harb'), set())
+        self.assertEqual(self.search('content', 'boat'), set())
+        self.assertEqual(self.tokens(journal_id, 'title'),
+                         {'harbour', 'walk'})
+
+    def test_reindex_after_update(self) -> None:
+        journal_id: str = self.add('Evening', '<p>reading by the fire</p>')
+        other_id: str = self.add('Morning', '<p>fire drill</p>')
+        response = self.send('patch', f'{URL}/update_journal', {
+            'user': str(self.user.id), 'journal_id': journal_id,
+            'content': '<p>reading by the lake</p>'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('content', 'fire'), {other_id})
+        self.assertEqual(self.search('content', 'lake'), {journal_id})
+        self.assertEqual(self.tokens(journal_id), {'reading', 'lake'})
+
+    def test_delete(self) -> None:
+        journal_id: str = self.add('Evening', '<p>fire</p>')
+        self.send('delete', f'{URL}/remove_journal', {
+            'user': str(self.user.id), 'journal_id': journal_id})
+        self.assertEqual(self.search('content', 'fire'), set())
+        self.assertFalse(JournalToken.objects.filter(
+            journal=journal_id).exists())
+
+    def test_bulk_index_and_rebuild(self) -> None:
+        journals: list = Journal.objects.bulk_create([
+            Journal(user=self.user, title=f'Bulk {word}',
+                    content=f'<p>{word} river</p>',
+                    date_created=timezone.now(),
+                    **content_fields(f'<p>{word} river</p>'))
+            for word in ('north', 'south')])
+        self.assertEqual(self.search('content', 'river'), set())
+        index_new_journals(journals)
+        north, south = [str(journal.id) for journal in journals]
+        self.assertEqual(self.search('content', 'river'), {north, south})
+        self.assertEqual(self.search('title', 'south'), {south})
+
+        # Rebuilding drops stale tokens and restores missing ones
+        JournalToken.objects.filter(journal=north).delete()
+        JournalToken.objects.create(journal_id=south, user=self.user,
+                                    field='content', token='stale')
+        queryset = Journal.objects.filter(user=self.user)
+        self.assertEqual(rebuild_search_index(queryset, chunk_size=1), 2)
+        self.assertEqual(self.search('content', 'river'), {north, south})
+        self.assertEqual(self.search('content', 'stale'), set())
+        self.assertEqual(self.tokens(north), {'north', 'river'})
+
+
+class DateSearchTests(ApiClientMixin, TestCase):
+    ''' DateSearchTests: date searches accept a year, month or day,
+            or a 'from/to' range of those with either end omitted
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = create_user('dateuser')
+        cls.journals: dict = {}
+        for day in ('2023-12-31', '2024-01-15', '2024-06-30', '2025-01-01'):
+            cls.journals[day] = Journal.objects.create(
+                user=cls.user, title=f'Entry {day}', content=SAMPLE_CONTENT,
+                date_created=datetime.fromisoformat(day + 'T12:00:00+00:00'),
+                **content_fields(SAMPLE_CONTENT))
+
+    def search(self, search_text) -> list:
+        # Days of the user's journals found by a date search
+        response = self.send('post', f'{URL}/search_journals', {
+            'user': str(self.user.id), 'search_type': 'date',
+            'search_text': search_text})
+        if response.status_code == 207:
+            return []
+        self.assertEqual(response.status_code, 200)
+        return sorted(journal['title'][6:]
+                      for journal in response.data['detail'])
+
+    def test_bounds(self) -> None:
+        def utc(*args) -> datetime:
+            return datetime(*args, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(parse_date_range('2024'),
+                         (utc(2024, 1, 1), utc(2025, 1, 1)))
+        self.assertEqual(parse_date_range('2024-02'),
+                         (utc(2024, 2, 1), utc(2024, 3, 1)))
+        self.assertEqual(parse_date_range('2024-12'),
+                         (utc(2024, 12, 1), utc(2025, 1, 1)))
+        self.assertEqual(parse_date_range(' 2024-02-29 '),
+                         (utc(2024, 2, 29), utc(2024, 3, 1)))
+        self.assertEqual(parse_date_range('2024-01/'),
+                         (utc(2024, 1, 1), None))
+        self.assertEqual(parse_date_range('/2024-06'),
+                         (None, utc(2024, 7, 1)))
+        self.assertEqual(parse_date_range('2023-12/2024-12'),
+                         (utc(2023, 12, 1), utc(2025, 1, 1)))
+        for text in ('2024-06/2024-01', '/', '', '2024-13', '2023-02-29',
+                     '24', 'June 2024', '2024-01-01/soon', '9999'):
+            with self.assertRaises(ValueError, msg=text):
+                parse_date_range(text)
+
+    def test_search(self) -> None:
+        self.assertEqual(self.search('2024'), ['2024-01-15', '2024-06-30'])
+        self.assertEqual(self.search('2023-12'), ['2023-12-31'])
+        self.assertEqual(self.search('2024-06-30'), ['2024-06-30'])
+        self.assertEqual(self.search('2024-01/'),
+                         ['2024-01-15', '2024-06-30', '2025-01-01'])
+        self.assertEqual(self.search('/2024-06'),
+                         ['2023-12-31', '2024-01-15', '2024-06-30'])
+        self.assertEqual(self.search('2023-12/2024-01'),
+                         ['2023-12-31', '2024-01-15'])
+        self.assertEqual(self.search('2024-02'), [])
+        self.assertEqual(self.search(2025), ['2025-01-01'])
+        for search_text in ('2024-06/2024-01', 'not a date', '2024-00',
+                            ['2024'], None):
+            response = self.send('post', f'{URL}/search_journals', {
+                'user': str(self.user.id), 'search_type': 'date',
+                'search_text': search_text})
+            self.assertEqual(response.status_code, 400, search_text)
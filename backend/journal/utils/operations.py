@@ -0,0 +1,231 @@
+import json
+
+
+# Maximum number of operations applied per update
+MAX_OPERATIONS = 1000
+
+# Slate operation types changing the document (set_selection is ignored)
+NODE_OPERATIONS = frozenset(['insert_node', 'remove_node', 'set_node',
+                             'insert_text', 'remove_text', 'merge_node',
+                             'split_node', 'move_node'])
+
+
+def parse_document(content: str) -> list:
+    ''' parse_document: function to load stored journal content as a
+            Slate node array
+
+        Args:
+            content (str): Journal content string
+
+        Returns:
+            list: top level Slate nodes
+
+        Raises:
+            ValueError: content is not a Slate document (e.g. html or
+                json nested too deeply to parse)
+    '''
+    try:
+        nodes = json.loads(content)
+    except RecursionError as error:
+        raise ValueError('Content is nested too deeply.') from error
+    if isinstance(nodes, dict):
+        nodes = [nodes]
+    if not isinstance(nodes, list) or not all(isinstance(node, dict)
+                                              for node in nodes):
+        raise ValueError('Content is not a Slate document.')
+    return nodes
+
+
+def check_path(path) -> list:
+    # Validate a Slate path: a non-empty list of non-negative integers
+    if (not isinstance(path, list) or len(path) == 0 or
+            not all(isinstance(index, int) and not isinstance(index, bool)
+                    and index >= 0 for index in path)):
+        raise ValueError('Invalid path.')
+    return path
+
+
+def children_of(node: dict) -> list:
+    # Child list of an element node
+    children = node.get('children')
+    if not isinstance(children, list):
+        raise ValueError('Node has no children.')
+    return children
+
+
+def parent_of(root: dict, path: list) -> tuple:
+    # (child list holding the node at path, index of the node in it)
+    node: dict = root
+    for index in path[:-1]:
+        children: list = children_of(node)
+        if index >= len(children):
+            raise ValueError('Path does not exist.')
+        node = children[index]
+    return (children_of(node), path[-1])
+
+
+def node_at(root: dict, path: list) -> dict:
+    # Node at an existing path
+    children, index = parent_of(root, path)
+    if index >= len(children):
+        raise ValueError('Path does not exist.')
+    return children[index]
+
+
+def text_of(node: dict) -> str:
+    # Text of a text node
+    if not isinstance(node.get('text'), str):
+        raise ValueError('Node is not a text node.')
+    return node['text']
+
+
+def offset_of(operation: dict, key: str, limit: int) -> int:
+    # Integer offset / position of an operation within 0..limit
+    value = operation.get(key)
+    if (not isinstance(value, int) or isinstance(value, bool) or
+            not 0 <= value <= limit):
+        raise ValueError(f'Invalid {key}.')
+    return value
+
+
+def properties_of(operation: dict, key: str) -> dict:
+    # Node properties of an operation, which may not replace content
+    properties = operation.get(key) or {}
+    if not isinstance(properties, dict) or ('children' in properties or
+                                            'text' in properties):
+        raise ValueError(f'Invalid {key}.')
+    return properties
+
+
+def moved_path(path: list, new_path: list) -> list:
+    # Path the moved node ends up at once it is removed from path
+    # (Path.transform for move_node in Slate)
+    target: list = list(new_path)
+    depth: int = len(path)
+    if (depth < len(new_path) and path[:-1] == new_path[:depth - 1] and
+            path[-1] < new_path[depth - 1]):
+        target[depth - 1] -= 1
+    return target
+
+
+def apply_operation(root: dict, operation: dict) -> None:
+    ''' apply_operation: function to apply one Slate operation to a
+            document in place, with the semantics of Slate's
+            GeneralTransforms.transform
+
+        Args:
+            root (dict): {'children': top level Slate nodes}
+            operation (dict): Slate operation ('type', 'path', ...)
+
+        Raises:
+            ValueError: operation is malformed or does not apply
+    '''
+    kind = operation.get('type')
+    if kind == 'set_selection':
+        return
+    if kind not in NODE_OPERATIONS:
+        raise ValueError('Unknown operation type.')
+    path: list = check_path(operation.get('path'))
+
+    if kind == 'insert_node':
+        node = operation.get('node')
+        children, index = parent_of(root, path)
+        if not isinstance(node, dict) or index > len(children):
+            raise ValueError('Invalid insert_node.')
+        children.insert(index, node)
+    elif kind == 'remove_node':
+        node_at(root, path)
+        children, index = parent_of(root, path)
+        del children[index]
+    elif kind == 'set_node':
+        node: dict = node_at(root, path)
+        properties: dict = properties_of(operation, 'properties')
+        new_properties: dict = properties_of(operation, 'newProperties')
+        for key, value in new_properties.items():
+            if value is None:
+                node.pop(key, None)
+            else:
+                node[key] = value
+        for key in properties:
+            if key not in new_properties:
+                node.pop(key, None)
+    elif kind in ('insert_text', 'remove_text'):
+        node: dict = node_at(root, path)
+        text: str = text_of(node)
+        offset: int = offset_of(operation, 'offset', len(text))
+        value = operation.get('text')
+        if not isinstance(value, str):
+            raise ValueError(f'Invalid {kind}.')
+        if kind == 'insert_text':
+            node['text'] = text[:offset] + value + text[offset:]
+        elif text[offset:offset + len(value)] != value:
+            raise ValueError('Removed text does not match.')
+        else:
+            node['text'] = text[:offset] + text[offset + len(value):]
+    elif kind == 'merge_node':
+        node: dict = node_at(root, path)
+        children, index = parent_of(root, path)
+        if index == 0:
+            raise ValueError('Invalid merge_node.')
+        previous: dict = children[index - 1]
+        if 'text' in node:
+            previous['text'] = text_of(previous) + text_of(node)
+        else:
+            children_of(previous).extend(children_of(node))
+        del children[index]
+    elif kind == 'split_node':
+        node: dict = node_at(root, path)
+        children, index = parent_of(root, path)
+        properties: dict = properties_of(operation, 'properties')
+        if 'text' in node:
+            text: str = text_of(node)
+            position: int = offset_of(operation, 'position', len(text))
+            node['text'] = text[:position]
+            new_node: dict = {**properties, 'text': text[position:]}
+        else:
+            nodes: list = children_of(node)
+            position: int = offset_of(operation, 'position', len(nodes))
+            node['children'] = nodes[:position]
+            new_node: dict = {**properties, 'children': nodes[position:]}
+        children.insert(index + 1, new_node)
+    elif kind == 'move_node':
+        new_path: list = check_path(operation.get('newPath'))
+        if new_path == path:
+            return
+        if new_path[:len(path)] == path:
+            raise ValueError('Cannot move a node into itself.')
+        node: dict = node_at(root, path)
+        children, index = parent_of(root, path)
+        del children[index]
+        target_children, target_index = parent_of(
+            root, moved_path(path, new_path))
+        if target_index > len(target_children):
+            raise ValueError('Invalid move_node.')
+        target_children.insert(target_index, node)
+
+
+def apply_operations(content: str, operations: list) -> str:
+    ''' apply_operations: function to apply a list of Slate operations
+            (as produced by the editor's onChange) to stored journal
+            content, so autosave only sends what changed
+
+        Args:
+            content (str): Journal content string (a Slate document)
+            operations (list): Slate operations, applied in order
+
+        Returns:
+            str: new content string
+
+        Raises:
+            ValueError: content is not a Slate document, or an operation
+                is malformed or does not apply
+    '''
+    if not isinstance(operations, list) or len(operations) > MAX_OPERATIONS:
+        raise ValueError('Invalid operations.')
+    root: dict = {'children': parse_document(content)}
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise ValueError('Invalid operation.')
+        apply_operation(root, operation)
+    return json.dumps(root['children'], ensure_ascii=False,
+                      separators=(',', ':'))
@@ -0,0 +1,76 @@
+import os
+import signal
+import tempfile
+import threading
+from io import (StringIO, BytesIO)
+from xhtml2pdf import pisa
+
+
+# Kept free of Django imports so worker processes can load it directly
+
+
+def raise_timeout(signum, frame) -> None:
+    # SIGALRM handler aborting a render that exceeded its time limit
+    raise TimeoutError('PDF render timed out.')
+
+
+def render_pdf(html_content: str, timeout: float = None) -> bytes:
+    ''' render_pdf: function to convert an html string to pdf bytes,
+            aborted after timeout seconds where the platform allows it
+            (SIGALRM in the main thread, as in pool worker processes)
+
+        Args:
+            html_content (str): html string of journal content
+            timeout (float): maximum render time in seconds (optional)
+
+        Returns:
+            bytes: pdf document
+
+        Raises:
+            ValueError: xhtml2pdf reported errors in the document
+            TimeoutError: render took longer than timeout
+    '''
+    alarm: bool = (bool(timeout) and hasattr(signal, 'SIGALRM') and
+                   threading.current_thread() is threading.main_thread())
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        pdf_file = BytesIO()
+        pisa_status = pisa.CreatePDF(StringIO(html_content), dest=pdf_file)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    if pisa_status.err:
+        raise ValueError('Unable to create pdf.')
+    return pdf_file.getvalue()
+
+
+def render_pdf_file(html_content: str, path: str,
+                    timeout: float = None) -> int:
+    ''' render_pdf_file: function to render an html string to a pdf
+            file, written under a temporary name and moved into place so
+            readers never see a partial file
+
+        Args:
+            html_content (str): html string of journal content
+            path (str): destination file path
+            timeout (float): maximum render time in seconds (optional)
+
+        Returns:
+            int: size of written file in bytes
+    '''
+    pdf: bytes = render_pdf(html_content, timeout)
+    # Unique name per call: inline renders may run in several threads
+    file = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(path), prefix=os.path.basename(path),
+        suffix='.tmp', delete=False)
+    try:
+        with file:
+            file.write(pdf)
+        os.replace(file.name, path)
+    except OSError:
+        os.unlink(file.name)
+        raise
+    return len(pdf)
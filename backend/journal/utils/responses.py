@@ -8,3 +8,13 @@ create_journal_failed = 'Error creating journal in db.'
 journal_deleted = 'Journal successfully deleted.'
 
 export_failed = 'Unable to create pdf for journal.'
+
+no_export_found = 'No export job found.'
+
+export_not_ready = 'Export job has not finished.'
+
+batch_too_large = 'Too many journals selected for one export.'
+
+journal_conflict = 'Journal was changed by another update.'
+
+invalid_operations = 'Unable to apply content operations.'
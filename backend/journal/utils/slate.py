@@ -0,0 +1,139 @@
+import json
+from html import escape
+
+
+# Deepest element nesting rendered (the editor itself nests a few levels)
+MAX_SLATE_DEPTH = 64
+
+# Block alignments set by the editor toolbar
+SLATE_ALIGNMENTS = frozenset(('left', 'center', 'right', 'justify'))
+
+
+def escape_html(text: str) -> str:
+    # Escape text the same way as the frontend 'escape-html' package
+    return escape(text, quote=True).replace('&#x27;', '&#39;')
+
+
+def node_children(node: dict) -> list:
+    # Child nodes of an element, ignoring anything that is not a node
+    children = node.get('children')
+    if not isinstance(children, list):
+        return []
+    return [child for child in children if isinstance(child, dict)]
+
+
+def is_void(node: dict) -> bool:
+    # Element with a single empty text child renders as a line break
+    children: list = node_children(node)
+    return len(children) == 1 and children[0].get('text') == ''
+
+
+def heading_level(node: dict) -> int:
+    # Heading level 1 to 6 (1 if missing or invalid)
+    level = node.get('level')
+    if isinstance(level, int) and not isinstance(level, bool) and (
+            1 <= level <= 6):
+        return level
+    return 1
+
+
+def serialize_html(node: dict, depth: int = 0) -> str:
+    ''' serialize_html: function to convert a Slate node to the html
+            string saved by the frontend editor (mirrors serializeToHTML
+            in editor-html-hook.ts)
+
+            Malformed nodes (not a dict, non-string text) and elements
+            nested deeper than MAX_SLATE_DEPTH render as nothing, and
+            only known 'align' and 'level' values reach the html
+
+        Args:
+            node (dict): Slate element or text node
+            depth (int): nesting depth of node
+
+        Returns:
+            str: html string
+    '''
+    if not isinstance(node, dict) or depth > MAX_SLATE_DEPTH:
+        return ''
+    if 'text' in node:
+        if not isinstance(node['text'], str):
+            return ''
+        string: str = escape_html(node['text'])
+        if node.get('underline'):
+            string = f'<u>{string}</u>'
+        if node.get('italic'):
+            string = f'<em>{string}</em>'
+        if node.get('bold'):
+            string = f'<strong>{string}</strong>'
+        return string
+
+    children: str = ''.join(serialize_html(child, depth + 1)
+                            for child in node_children(node))
+    node_type: str = node.get('type')
+    align = node.get('align')
+    if not isinstance(align, str) or align not in SLATE_ALIGNMENTS:
+        align = ''
+    if node_type == 'code':
+        if is_void(node):
+            return '<br />'
+        return f'<div id="code-block-div"><code>{children}</code></div>'
+    if node_type == 'link':
+        url = node.get('url')
+        url = escape_html(url) if isinstance(url, str) else ''
+        return f'<a target="_blank" href="{url}">{children}</a>'
+    if node_type == 'paragraph':
+        if is_void(node):
+            return '<br />'
+        return f'<p style="text-align:{align}">{children}</p>'
+    if node_type == 'separator':
+        return (f'<div>{children}<hr style="border-bottom:2px solid '
+                '#999999" /></div>')
+    if node_type == 'list':
+        return f'<ul>{children}</ul>'
+    if node_type == 'list-item':
+        return f'<li>{children}</li>'
+    if node_type == 'heading':
+        if is_void(node):
+            return '<br />'
+        level: int = heading_level(node)
+        return (f'<h{level} style="text-align:{align}">{children}'
+                f'</h{level}>')
+    return children
+
+
+def serialize_document(nodes: list) -> str:
+    ''' serialize_document: function to convert a Slate node array
+            (editor value) to the html string saved by the frontend
+
+        Args:
+            nodes (list): top level Slate nodes
+
+        Returns:
+            str: html string
+    '''
+    return ''.join(serialize_html(node) for node in nodes)
+
+
+def content_html(content: str) -> str:
+    ''' content_html: function to get the html of stored journal
+            content, which is either html saved by the frontend editor
+            or a Slate node tree in json
+
+        Args:
+            content (str): Journal content string
+
+        Returns:
+            str: html string
+    '''
+    stripped: str = content.lstrip()
+    if stripped[:1] in ('[', '{'):
+        try:
+            nodes = json.loads(stripped)
+        except (ValueError, RecursionError):
+            return content
+        if isinstance(nodes, dict):
+            nodes = [nodes]
+        if isinstance(nodes, list) and all(isinstance(node, dict)
+                                           for node in nodes):
+            return serialize_document(nodes)
+    return content
@@ -0,0 +1,132 @@
+import hashlib
+import json
+from html.parser import HTMLParser
+
+
+# Elements that start a new line of text when extracted
+BLOCK_TAGS = frozenset(['p', 'div', 'br', 'hr', 'li', 'ul', 'ol', 'code',
+                        'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+
+# Size of chunks fed to the html parser
+CHUNK_SIZE = 65536
+
+# Journal fields computed by content_fields
+CONTENT_FIELDS = ('content_text', 'word_count', 'char_count', 'content_hash')
+
+
+class _TextExtractor(HTMLParser):
+    ''' _TextExtractor: html parser collecting only text nodes,
+            separating block level elements by newlines
+
+        Args:
+            HTMLParser (class): Python standard library html parser
+    '''
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list = []
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data: str) -> None:
+        self.parts.append(data)
+
+
+def extract_html_text(content: str) -> list:
+    ''' extract_html_text: function to stream html content through
+            the parser in chunks and collect text fragments
+
+        Args:
+            content (str): html string
+
+        Returns:
+            list: text fragments in document order
+    '''
+    parser = _TextExtractor()
+    for start in range(0, len(content), CHUNK_SIZE):
+        parser.feed(content[start:start + CHUNK_SIZE])
+    parser.close()
+    return parser.parts
+
+
+def extract_slate_text(nodes) -> list:
+    ''' extract_slate_text: function to walk a Slate node tree
+            iteratively and collect text leaf values
+
+        Args:
+            nodes (list | dict): Slate node array or single node
+
+        Returns:
+            list: text fragments in document order
+    '''
+    parts: list = []
+    stack: list = [nodes]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if 'text' in node and isinstance(node['text'], str):
+                parts.append(node['text'])
+            elif isinstance(node.get('children'), list):
+                parts.append('\n')
+                stack.append('\n')
+                stack.extend(reversed(node['children']))
+        elif node == '\n':
+            parts.append(node)
+    return parts
+
+
+def extract_text(content: str) -> str:
+    ''' extract_text: function to get the plain user text of journal
+            content, stored either as serialized html or as a Slate
+            node tree in json
+
+        Args:
+            content (str): Journal content string
+
+        Returns:
+            str: plain text with one line per block element
+    '''
+    stripped: str = content.lstrip()
+    parts: list = []
+    if stripped[:1] in ('[', '{'):
+        try:
+            parts = extract_slate_text(json.loads(stripped))
+        except (ValueError, RecursionError):
+            parts = extract_html_text(content)
+    else:
+        parts = extract_html_text(content)
+
+    lines: list = [' '.join(line.split()) for line in ''.join(parts).split(
+        '\n')]
+    return '\n'.join(line for line in lines if line)
+
+
+def content_hash(content: str) -> str:
+    # Revision identifier of journal content: sha256 of the stored string
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def content_fields(content: str) -> dict:
+    ''' content_fields: function to compute denormalized Journal
+            fields derived from content
+
+        Args:
+            content (str): Journal content string
+
+        Returns:
+            dict: 'content_text', 'word_count', 'char_count' and
+                'content_hash' (revision of content) values
+    '''
+    text: str = extract_text(content)
+    words: list = text.split()
+    return {'content_text': text, 'word_count': len(words),
+            'char_count': sum(len(word) for word in words),
+            'content_hash': content_hash(content)}
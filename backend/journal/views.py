@@ -1,22 +1,33 @@
-import base64
-from io import (StringIO, BytesIO)
-from xhtml2pdf import pisa
 from datetime import (datetime, timezone)
 from django.db.models import QuerySet
+from django.http import (FileResponse, StreamingHttpResponse)
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import ensure_csrf_cookie
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Journal
-from .serializers import JournalSerializer
+from .models import (Journal, ExportJob)
+from .serializers import (JournalSerializer, ExportJobSerializer)
+from .exports import (render_cached_pdf, submit_export, expire_export,
+                      export_path, pdf_response, wants_download,
+                      stream_zip, merge_pdfs)
+from .pdf_cache import cache_stats
+from .portability import (stream_account, read_ndjson, JournalImport)
+from .autosave import (AUTOSAVE_FIELDS, autosave_buffer)
 from .functions import (find_journal_by_id, find_journals_by_user,
-                        find_journals_by_search)
+                        find_journals_by_search, find_journal_page,
+                        find_export_job, find_journal_html,
+                        find_batch_journals, patch_journal_content)
+from login.functions.conditional import (collection_headers, not_modified)
+from login.functions.user import find_user_by_id
+from login.serializers.custom import (parse_fields, parse_base_version,
+                                     VersionConflict)
 from login.utils.responses import invalid_request_body
 from .utils.responses import (no_journal_found, journal_deleted,
                               journal_update_failed, create_journal_failed,
-                              export_failed)
+                              export_failed, no_export_found,
+                              export_not_ready, journal_conflict)
 
 
 class JournalViewSet(viewsets.ViewSet):
@@ -76,7 +87,7 @@ class JournalViewSet(viewsets.ViewSet):
                 database or error if no data found and 'status' integer
                 with standard Http status code
         '''
-        queryset: QuerySet[Journal] = Journal.objects.all()
+        queryset: QuerySet[Journal] = Journal.objects.with_tags()
         if len(queryset) == 0:
             return Response({'detail': no_journal_found},
                             status=status.HTTP_404_NOT_FOUND)
@@ -94,30 +105,69 @@ class JournalViewSet(viewsets.ViewSet):
         Args:
             request (obj): object from client request, specifically
                 must contain a dictionary with 'user' id string
-                in request.data
+                in request.data, and optionally 'page_size', 'cursor',
+                'sort' ('title' or 'date') and 'order' ('asc' or 'desc')
+                for keyset pagination and 'fields' for a sparse fieldset,
+                and an 'If-None-Match' header with a previous ETag
 
 
         Returns:
             Response (HttpResponse): object containing API response
                 information, specifically a 'detail' object of
                 JournalSerializer data containing queryset of Journal
-                database or error if no data found and 'status' integer with
-                standard Http status code
+                database or error if no data found, a 'next_cursor'
+                token if paginated, 'ETag' and 'Last-Modified' headers
+                and 'status' integer with standard Http status code
+                (304 without body if the ETag still matches)
         '''
+        headers: dict = collection_headers(request.data.get('user'),
+                                           'user_journals', request.data)
+        if not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        if 'page_size' in request.data or 'cursor' in request.data:
+            return self.user_journals_page(request, headers)
+
         try:
             user_id: str = request.data['user']
-            response = find_journals_by_user(user_id)
+            fields: list = parse_fields(request.data.get('fields'))
+            response = find_journals_by_user(user_id, fields)
             if response[1] == status.HTTP_404_NOT_FOUND:
                 return Response({'detail': response[0]},
                                 status=status.HTTP_207_MULTI_STATUS)
-        except KeyError:
+        except (KeyError, ValueError):
             return Response({'detail': invalid_request_body},
                             status=status.HTTP_400_BAD_REQUEST)
 
         queryset: QuerySet[Journal] = response[0]
-        serializer = JournalSerializer(queryset, many=True)
+        serializer = JournalSerializer(queryset, many=True, fields=fields)
         return Response({'detail': serializer.data},
-                        status=status.HTTP_200_OK)
+                        status=status.HTTP_200_OK, headers=headers)
+
+    def user_journals_page(self, request, headers: dict = None) -> Response:
+        # Return one keyset page of user journals with next cursor token
+        try:
+            user_id: str = request.data['user']
+            fields: list = parse_fields(request.data.get('fields'))
+        except (KeyError, ValueError):
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = find_journal_page(
+            user_id, request.data.get('page_size'),
+            request.data.get('cursor'), request.data.get('sort', 'title'),
+            request.data.get('order', 'asc'), fields)
+        if response[1] == status.HTTP_400_BAD_REQUEST:
+            return Response({'detail': response[0]}, status=response[1])
+        if response[1] == status.HTTP_404_NOT_FOUND:
+            return Response({'detail': response[0]},
+                            status=status.HTTP_207_MULTI_STATUS)
+
+        page, next_cursor = response[0]
+        serializer = JournalSerializer(page, many=True, fields=fields)
+        return Response({'detail': serializer.data,
+                         'next_cursor': next_cursor},
+                        status=status.HTTP_200_OK, headers=headers)
 
     @method_decorator(ensure_csrf_cookie)
     @action(methods=['post'], detail=False)
@@ -131,7 +181,8 @@ class JournalViewSet(viewsets.ViewSet):
         Args:
             request (obj): object from client request, specifically
                 must contain a dictionary with 'user' id, 'search_type',
-                and 'search_text' strings in request.data
+                and 'search_text' strings in request.data, and
+                optionally 'fields' for a sparse fieldset
 
         Returns:
             Response (HttpResponse): object containing API response
@@ -144,7 +195,8 @@ class JournalViewSet(viewsets.ViewSet):
             user_id: str = request.data['user']
             search_type: str = request.data['search_type']
             search_text: str = request.data['search_text']
-        except KeyError:
+            fields: list = parse_fields(request.data.get('fields'))
+        except (KeyError, ValueError):
             return Response({'detail': invalid_request_body},
                             status=status.HTTP_400_BAD_REQUEST)
 
@@ -153,7 +205,10 @@ class JournalViewSet(viewsets.ViewSet):
             return Response({'detail': invalid_request_body},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        response = find_journals_by_search(user_id, search_type, search_text)
+        response = find_journals_by_search(user_id, search_type, search_text,
+                                           fields)
+        if response[1] == status.HTTP_400_BAD_REQUEST:
+            return Response({'detail': response[0]}, status=response[1])
         if response[1] != status.HTTP_200_OK:
             return Response({'detail': response[0]},
                             status=status.HTTP_207_MULTI_STATUS)
@@ -170,18 +225,25 @@ class JournalViewSet(viewsets.ViewSet):
         Args:
             request (obj): object from client request, specifically
                 must contain a dictionary with 'journal_id' and 'user'
-                id strings in request.data
+                id strings in request.data, and optionally an
+                'If-None-Match' header with a previous ETag
 
         Returns:
             Response (HttpResponse): object containing API response
                 information, specifically a 'detail' object of
                 JournalSerializer data containing Journal instance
-                or error if no data found and 'status' integer with
-                standard Http status code
+                or error if no data found, 'ETag' and 'Last-Modified'
+                headers and 'status' integer with standard Http status
+                code (304 without body if the ETag still matches)
         '''
+        headers: dict = collection_headers(request.data.get('user'),
+                                           'get_journal', request.data)
+        if not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
         try:
             journal_id: str = request.data['journal_id']
-            response = find_journal_by_id(journal_id)
+            response = find_journal_by_id(journal_id, with_tags=True)
             if response[1] == status.HTTP_404_NOT_FOUND:
                 return Response({'detail': response[0]},
                                 status=status.HTTP_207_MULTI_STATUS)
@@ -192,41 +254,337 @@ class JournalViewSet(viewsets.ViewSet):
         journal: Journal = response[0]
         serializer = JournalSerializer(journal)
         return Response({'detail': serializer.data},
-                        status=status.HTTP_200_OK)
+                        status=status.HTTP_200_OK, headers=headers)
+
+    def export_source(self, data: dict) -> list:
+        ''' export_source: function to get the html to export from
+                request data, rendered server side from the stored
+                content of 'journal_id' or sent by the client as
+                'html_content'
+
+        Args:
+            data (dict): request.data of an export route
+
+        Returns:
+            list: list containing either a tuple of html string and file
+                name or response message and a 'status' integer with
+                standard Http status code
+
+        Raises:
+            KeyError: neither 'journal_id' nor 'html_content' sent
+        '''
+        if 'journal_id' in data:
+            return find_journal_html(data['user'], data['journal_id'])
+        return [(data['html_content'], 'journal.pdf'), status.HTTP_200_OK]
 
     @method_decorator(ensure_csrf_cookie)
     @action(methods=['post'], detail=False)
     def export_journal(self, request) -> (Response):
         ''' export_journal: 'POST' route for 'journal/journals/export_journal'
                 to create pdf of journal based on provided html content string
+                (read from the pdf cache when already rendered)
 
         Args:
             request (obj): object from client request, specifically
-                must contain a dictionary with 'user' id string
-                and 'html_content' string in request.data
+                must contain a dictionary with 'user' id string and
+                either 'journal_id' string (rendered from stored content)
+                or 'html_content' string in request.data, optionally
+                'download' boolean to receive the pdf file itself
 
         Returns:
             Response (HttpResponse): object containing API response
                 information, specifically a 'detail' string response
                 message or base64 representation of pdf document
                 and 'status' integer with standard Http status
-                code
+                code, or streamed 'application/pdf' file if 'download'
         '''
         try:
-            html_content: str = request.data['html_content']
+            response = self.export_source(request.data)
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
         except KeyError:
             return Response({'detail': invalid_request_body},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        pdf_file = BytesIO()
-        pisa_status = pisa.CreatePDF(StringIO(html_content), dest=pdf_file)
-        pdf_b64: bytes = base64.b64encode(pdf_file.getvalue())
-
-        if pisa_status.err:
+        html_content, filename = response[0]
+        try:
+            return pdf_response(render_cached_pdf(html_content),
+                                wants_download(request.data.get('download')),
+                                filename)
+        except (ValueError, TimeoutError, RuntimeError, FileNotFoundError):
             return Response({'detail': export_failed},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({'detail': pdf_b64}, status=status.HTTP_200_OK)
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def batch_export(self, request) -> Response:
+        ''' batch_export: 'POST' route for 'journal/journals/batch_export'
+                to export many journals at once, rendered in parallel
+                worker processes, as one merged pdf or a zip archive of
+                one pdf per journal streamed while it is built
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'user' id string and one
+                of 'journal_ids' list, 'tag_id' string or 'date_range'
+                string (e.g. '2024' or '2024-01/2024-06') in
+                request.data, optionally 'format' string ('pdf' default
+                or 'zip')
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' string response
+                message and 'status' integer with standard Http status
+                code, or 'application/pdf' / 'application/zip' file
+        '''
+        export_format: str = request.data.get('format', 'pdf')
+        if export_format not in ('pdf', 'zip'):
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            response = find_batch_journals(request.data['user'],
+                                           request.data)
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+            if response[1] == status.HTTP_400_BAD_REQUEST:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_400_BAD_REQUEST)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        journals = response[0].iterator(chunk_size=50)
+        if export_format == 'zip':
+            archive = StreamingHttpResponse(stream_zip(journals),
+                                            content_type='application/zip')
+            archive['Content-Disposition'] = ('attachment; '
+                                              'filename="journals.zip"')
+            return archive
+
+        merged, failed = merge_pdfs(journals)
+        pdf = FileResponse(merged, as_attachment=True,
+                           filename='journals.pdf',
+                           content_type='application/pdf')
+        pdf['X-Export-Failed'] = str(failed)
+        return pdf
+
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def export_account(self, request) -> Response:
+        ''' export_account: 'POST' route for
+                'journal/journals/export_account' to stream every tag
+                and journal of a User instance as NDJSON for backups
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'user' id string in
+                request.data
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' string response
+                message and 'status' integer with standard Http status
+                code, or streamed 'application/x-ndjson' file of
+                'tag' records followed by 'journal' records
+        '''
+        try:
+            response = find_user_by_id(request.data['user'])
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        export = StreamingHttpResponse(stream_account(response[0].id),
+                                       content_type='application/x-ndjson')
+        export['Content-Disposition'] = ('attachment; '
+                                         'filename="journals.ndjson"')
+        return export
+
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def import_journals(self, request) -> Response:
+        ''' import_journals: 'POST' route for
+                'journal/journals/import_journals' to create many
+                journals (and their tags) of a User instance at once,
+                written in chunks of batched inserts
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'user' id string and
+                'journals' list of records in request.data, or an
+                'application/x-ndjson' body (as from export_account)
+                with 'user' id string in the query string
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' dictionary with
+                number of 'created' journals, 'tags_created', 'failed'
+                records and their 'errors', and 'status' integer with
+                standard Http status code (207 when any record failed)
+        '''
+        ndjson: bool = request.content_type.startswith(
+            'application/x-ndjson')
+        try:
+            if ndjson:
+                # Read the body line by line instead of parsing it whole
+                userId: str = request.query_params['user']
+            else:
+                userId: str = request.data['user']
+                records: list = request.data['journals']
+                if not isinstance(records, list):
+                    raise KeyError('journals')
+            response = find_user_by_id(userId)
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        records = (read_ndjson(request.stream) if ndjson
+                   else enumerate(records, start=1))
+        totals: dict = JournalImport(response[0]).run(records)
+        return Response({'detail': {'created': totals['journals'],
+                                    'tags_created': totals['tags'],
+                                    'failed': totals['failed'],
+                                    'errors': totals['errors']}},
+                        status=(status.HTTP_207_MULTI_STATUS
+                                if totals['failed']
+                                else status.HTTP_200_OK))
+
+    @action(methods=['get'], detail=False)
+    def export_cache(self, request) -> Response:
+        ''' export_cache: 'GET' route for 'journal/journals/export_cache'
+                to return rendered pdf cache statistics
+
+        Args:
+            request (obj): object from client request (no data required)
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' object with
+                'hits', 'misses' and 'evictions' counters of the
+                responding API process, 'hit_rate', cache 'entries',
+                'bytes' and 'max_bytes' and 'status' integer with
+                standard Http status code
+        '''
+        return Response({'detail': cache_stats()}, status=status.HTTP_200_OK)
+
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def submit_export(self, request) -> Response:
+        ''' submit_export: 'POST' route for 'journal/journals/submit_export'
+                to queue pdf rendering of a journal or provided html
+                content string in a worker process and return immediately
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'user' id string and
+                either 'journal_id' string (rendered from stored content)
+                or 'html_content' string in request.data
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' string response
+                message or ExportJob id to poll with 'export_status'
+                and 'status' integer with standard Http status code
+        '''
+        try:
+            source = self.export_source(request.data)
+            response = find_user_by_id(request.data['user'])
+            for found in (source, response):
+                if found[1] == status.HTTP_404_NOT_FOUND:
+                    return Response({'detail': found[0]},
+                                    status=status.HTTP_207_MULTI_STATUS)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        job: ExportJob = submit_export(response[0], source[0][0])
+        return Response({'detail': str(job.id)},
+                        status=status.HTTP_202_ACCEPTED)
+
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def export_status(self, request) -> Response:
+        ''' export_status: 'POST' route for 'journal/journals/export_status'
+                to return the status of a specific ExportJob instance
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'job_id' and 'user'
+                id strings in request.data
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' object of
+                ExportJobSerializer data ('status' is 'pending', 'done'
+                or 'failed') or error if no data found and 'status'
+                integer with standard Http status code
+        '''
+        try:
+            response = find_export_job(request.data['user'],
+                                       request.data['job_id'])
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        job: ExportJob = expire_export(response[0])
+        serializer = ExportJobSerializer(job)
+        return Response({'detail': serializer.data},
+                        status=status.HTTP_200_OK)
+
+    @method_decorator(ensure_csrf_cookie)
+    @action(methods=['post'], detail=False)
+    def download_export(self, request) -> Response:
+        ''' download_export: 'POST' route for
+                'journal/journals/download_export' to return the pdf
+                rendered by a finished ExportJob instance
+
+        Args:
+            request (obj): object from client request, specifically
+                must contain a dictionary with 'job_id' and 'user'
+                id strings in request.data, optionally 'download'
+                boolean to receive the pdf file itself
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' string response
+                message or base64 representation of pdf document
+                and 'status' integer with standard Http status code,
+                or streamed 'application/pdf' file if 'download'
+        '''
+        try:
+            response = find_export_job(request.data['user'],
+                                       request.data['job_id'])
+            if response[1] == status.HTTP_404_NOT_FOUND:
+                return Response({'detail': response[0]},
+                                status=status.HTTP_207_MULTI_STATUS)
+        except KeyError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        job: ExportJob = expire_export(response[0])
+        if job.status == ExportJob.PENDING:
+            return Response({'detail': export_not_ready},
+                            status=status.HTTP_202_ACCEPTED)
+        if job.status == ExportJob.FAILED:
+            return Response({'detail': export_failed},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return pdf_response(export_path(job),
+                                wants_download(request.data.get('download')),
+                                f'export-{job.id}.pdf')
+        except FileNotFoundError:
+            return Response({'detail': no_export_found},
+                            status=status.HTTP_207_MULTI_STATUS)
 
     @ method_decorator(ensure_csrf_cookie)
     @ action(methods=['patch'], detail=False)
@@ -238,13 +596,21 @@ class JournalViewSet(viewsets.ViewSet):
             request (obj): object from client request, specifically
                 must contain a dictionary with 'journal_id' string,
                 'user' id string, and field(s) to be updated in
-                request.data
+                request.data; instead of 'content' it may contain Slate
+                'operations' to apply to the stored content, which
+                requires the 'base_version' they were made against
+                ('base_version' also guards any other update); with
+                'autosave' true, 'title' / 'content' are buffered and
+                written at most once per settings.AUTOSAVE_FLUSH_INTERVAL
 
         Returns:
             Response (HttpResponse): object containing API response
                 information, specifically a 'detail' string response
-                message and 'status' integer with standard Http status
-                code
+                message, the journal's new (or, with status 409, current)
+                'version' and 'status' integer with standard Http status
+                code (202 with 'pending' true if an autosave is buffered;
+                a 409 carries buffered autosave fields that were not
+                written as 'unsaved')
         '''
         try:
             if request.data['date_created']:
@@ -264,16 +630,126 @@ class JournalViewSet(viewsets.ViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
 
         journal: Journal = response[0]
-        serializer = JournalSerializer(journal, data=request.data,
-                                       partial=True)
+        if request.data.get('autosave'):
+            return self.autosave_journal(request, journal)
+        # Buffered autosaves are written together with this update
+        try:
+            entry: dict = autosave_buffer.take(journal)
+        except VersionConflict as conflict:
+            return Response({'detail': journal_conflict,
+                             'version': conflict.version,
+                             'unsaved': conflict.unsaved},
+                            status=status.HTTP_409_CONFLICT)
+        pending: dict = entry['fields'] if entry else {}
+        response = self.write_journal(request, journal, pending)
+        if response.status_code == status.HTTP_409_CONFLICT and pending:
+            # The client redoes its update, autosaves included
+            response.data['unsaved'] = pending
+        elif response.status_code != status.HTTP_200_OK and pending:
+            autosave_buffer.restore(journal.id, entry)
+        return response
+
+    def write_journal(self, request, journal: Journal,
+                      pending: dict) -> Response:
+        ''' write_journal: function to apply an explicit update_journal
+                request (with fields of buffered autosaves underneath)
+
+        Args:
+            request (obj): object from client request
+            journal (Journal): Journal instance to update
+            pending (dict): buffered autosave fields (may be empty)
+
+        Returns:
+            Response (HttpResponse): update_journal response
+        '''
+        try:
+            base_version: int = parse_base_version(request.data)
+        except ValueError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if base_version is not None:
+            base_version = autosave_buffer.resolve(journal, base_version)
+        data: dict = {**pending, **request.data} if pending else request.data
+        if 'content' in pending:
+            # Operations are made against the latest autosaved content
+            journal.content = pending['content']
+        if 'operations' in request.data:
+            response = patch_journal_content(
+                journal, request.data['operations'], base_version)
+            if response[1] == status.HTTP_409_CONFLICT:
+                return Response({'detail': response[0],
+                                 'version': journal.version},
+                                status=response[1])
+            if response[1] != status.HTTP_200_OK:
+                return Response({'detail': response[0]},
+                                status=response[1])
+            data = {**data, 'content': response[0]}
+
+        serializer = JournalSerializer(journal, data=data, partial=True,
+                                       context={'base_version':
+                                                base_version})
         if not serializer.is_valid():
             return Response({'detail': journal_update_failed},
                             status=status.HTTP_400_BAD_REQUEST)
-        serializer.save()
+        try:
+            serializer.save()
+        except VersionConflict as conflict:
+            return Response({'detail': journal_conflict,
+                             'version': conflict.version},
+                            status=status.HTTP_409_CONFLICT)
         journal: dict = serializer.data
-        return Response({'detail': journal['id']},
+        return Response({'detail': journal['id'],
+                         'version': journal['version']},
                         status=status.HTTP_200_OK)
 
+    def autosave_journal(self, request, journal: Journal) -> Response:
+        ''' autosave_journal: function to buffer an autosave of 'title'
+                and / or 'content' of a Journal instance, written right
+                away only if the journal was not written during the
+                last settings.AUTOSAVE_FLUSH_INTERVAL seconds
+
+        Args:
+            request (obj): object from client request, which may
+                contain the 'base_version' the autosave was made against
+            journal (Journal): Journal instance being edited
+
+        Returns:
+            Response (HttpResponse): object containing API response
+                information, specifically a 'detail' journal id,
+                'pending' (True if buffered), the stored 'version' and
+                'status' integer with standard Http status code (409
+                with the 'unsaved' fields if base_version is stale)
+        '''
+        fields: list = [field for field in AUTOSAVE_FIELDS
+                        if field in request.data]
+        if (len(fields) == 0 or 'operations' in request.data or
+                'tag_list' in request.data):
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            base_version: int = parse_base_version(request.data)
+        except ValueError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = JournalSerializer(journal, partial=True, data={
+            field: request.data[field] for field in fields})
+        if not serializer.is_valid():
+            return Response({'detail': journal_update_failed},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            pending: bool = autosave_buffer.add(journal, {
+                field: serializer.validated_data[field] for field in fields
+            }, base_version)
+        except VersionConflict as conflict:
+            return Response({'detail': journal_conflict,
+                             'version': conflict.version,
+                             'unsaved': conflict.unsaved},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({'detail': str(journal.id), 'pending': pending,
+                         'version': journal.version},
+                        status=status.HTTP_202_ACCEPTED if pending
+                        else status.HTTP_200_OK)
+
     @ method_decorator(ensure_csrf_cookie)
     @ action(methods=['delete'], detail=False)
     def remove_journal(self, request) -> Response:
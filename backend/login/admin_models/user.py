@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -21,6 +22,11 @@ class UserAdmin(admin.ModelAdmin):
         ('Journal Tags', {'fields': ['journal_tags']}),
         ('User Journals', {'fields': ['journals']})]
 
+    def get_queryset(self, request):
+        # Annotate journal counts instead of loading journals per user
+        return super().get_queryset(request).annotate(
+            num_journals=Count('journals', distinct=True))
+
     def journal_tags(self, obj) -> list:
         ''' journal_tags: function to get list of
             tags for specific user
@@ -33,10 +39,7 @@ class UserAdmin(admin.ModelAdmin):
                 tags of class Tag associated by
                 foreign key to the user
         '''
-        tags = obj.tags.all().values()
-        tag_list: list = []
-        for tag in tags:
-            tag_list.append(tag['name'])
+        tag_list: list = list(obj.tags.values_list('name', flat=True))
         return tag_list
 
     def journals(self, obj) -> int:
@@ -52,5 +55,5 @@ class UserAdmin(admin.ModelAdmin):
                     to the User
 
         '''
-        num_journals: int = len(obj.journals.all())
+        num_journals: int = obj.num_journals
         return num_journals
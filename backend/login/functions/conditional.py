@@ -0,0 +1,57 @@
+import hashlib
+import json
+from django.core.exceptions import ValidationError
+from django.utils.http import http_date
+from ..models.user import User
+
+
+def collection_headers(userId: str, route: str, data: dict) -> dict:
+    ''' collection_headers: function to build ETag and Last-Modified
+            headers of a read route from the collection version of a
+            User instance, with a single query that loads no journals
+            or tags
+
+        Args:
+            userId (str): id of User instance owning the data
+            route (str): route name, so routes never share an ETag
+            data (dict): request data, so each variant (page, fields,
+                journal) has its own ETag
+
+        Returns:
+            dict: 'ETag' and 'Last-Modified' headers, or None if the
+                user does not exist
+    '''
+    if not userId:
+        return None
+    try:
+        state: tuple = User.objects.filter(id=userId).values_list(
+            'collection_version', 'collection_updated_at').first()
+    except (ValidationError, ValueError):
+        return None
+    if state is None:
+        return None
+    variant: str = json.dumps(data, sort_keys=True, default=str)
+    digest: str = hashlib.sha256(
+        f'{route}:{userId}:{state[0]}:{variant}'.encode('utf-8')
+    ).hexdigest()[:32]
+    return {'ETag': f'"{digest}"',
+            'Last-Modified': http_date(state[1].timestamp())}
+
+
+def not_modified(request, headers: dict) -> bool:
+    ''' not_modified: function to determine whether the client's
+            If-None-Match header already holds the current ETag
+
+        Args:
+            request (obj): object from client request
+            headers (dict): headers from collection_headers (or None)
+
+        Returns:
+            bool: True if a 304 response can be sent
+    '''
+    if headers is None:
+        return False
+    # Weak comparison: a W/ prefix added by proxies is ignored
+    tags: list = [tag.strip().removeprefix('W/') for tag in
+                  request.headers.get('If-None-Match', '').split(',')]
+    return headers['ETag'] in tags or '*' in tags
@@ -0,0 +1,137 @@
+import base64
+import json
+from django.db.models import (Q, QuerySet)
+
+
+# Page size used when a cursor is sent without 'page_size'
+DEFAULT_PAGE_SIZE = 50
+
+# Upper limit on number of instances returned per page
+MAX_PAGE_SIZE = 200
+
+
+def parse_page_size(value) -> int:
+    ''' parse_page_size: function to validate requested page size
+            and cap it to MAX_PAGE_SIZE
+
+        Args:
+            value (int | str | None): page size from request data
+
+        Returns:
+            int: page size between 1 and MAX_PAGE_SIZE
+
+        Raises:
+            ValueError: if value is not a positive integer
+    '''
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    # bool is an int subclass and int() would truncate floats, so only
+    # ints and strings of ascii digits are accepted
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('Page size must be an integer.')
+    page_size: int = value
+    if page_size < 1:
+        raise ValueError('Page size must be positive.')
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def encode_cursor(values: list) -> str:
+    ''' encode_cursor: function to build opaque cursor token from
+            the sort key values of the last instance on a page
+
+        Args:
+            values (list): sort key values (last one is the id)
+
+        Returns:
+            str: url-safe base64 token
+    '''
+    data: bytes = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(token: str, queryset: QuerySet, ordering: tuple) -> list:
+    ''' decode_cursor: function to convert cursor token back into
+            sort key values typed for the queryset's model fields
+
+        Args:
+            token (str): cursor token from request data
+            queryset (QuerySet): queryset being paginated
+            ordering (tuple): sort key field names
+
+        Returns:
+            list: sort key values
+
+        Raises:
+            ValueError: if token is malformed
+    '''
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (TypeError, AttributeError, json.JSONDecodeError) as error:
+        raise ValueError('Invalid cursor.') from error
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError('Invalid cursor.')
+    try:
+        return [queryset.model._meta.get_field(name).to_python(value)
+                for name, value in zip(ordering, values)]
+    except Exception as error:
+        raise ValueError('Invalid cursor.') from error
+
+
+def keyset_filter(ordering: tuple, values: list, descending: bool) -> Q:
+    ''' keyset_filter: function to build the row comparison
+            (a, b) > (x, y) as 'a > x OR (a = x AND b > y)'
+
+        Args:
+            ordering (tuple): sort key field names
+            values (list): sort key values of the last returned row
+            descending (bool): True if sorted in descending order
+
+        Returns:
+            Q: filter selecting rows after the cursor position
+    '''
+    lookup: str = 'lt' if descending else 'gt'
+    condition = Q()
+    for index, name in enumerate(ordering):
+        branch = Q(**{f'{name}__{lookup}': values[index]})
+        for previous in range(index):
+            branch &= Q(**{ordering[previous]: values[previous]})
+        condition |= branch
+    return condition
+
+
+def paginate_queryset(queryset: QuerySet, ordering: tuple, page_size: int,
+                      cursor: str = None, descending: bool = False) -> list:
+    ''' paginate_queryset: function to return one keyset page of
+            queryset, reading at most page_size + 1 rows
+
+        Args:
+            queryset (QuerySet): filtered queryset to paginate
+            ordering (tuple): sort key field names ending with a unique
+                field (e.g. ('title', 'id'))
+            page_size (int): number of instances per page
+            cursor (str): token returned with previous page (optional)
+            descending (bool): True to sort in descending order
+
+        Returns:
+            list: list containing page of instances and next cursor
+                token (None if last page)
+
+        Raises:
+            ValueError: if cursor is malformed
+    '''
+    if cursor:
+        values: list = decode_cursor(cursor, queryset, ordering)
+        queryset = queryset.filter(keyset_filter(ordering, values,
+                                                 descending))
+    prefix: str = '-' if descending else ''
+    page: list = list(queryset.order_by(
+        *[prefix + name for name in ordering])[:page_size + 1])
+
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(
+            [getattr(page[-1], name) for name in ordering])
+    return [page, next_cursor]
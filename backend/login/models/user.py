@@ -1,10 +1,26 @@
 import uuid
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.core.validators import (EmailValidator, MinLengthValidator,
                                     MaxLengthValidator)
 from .custom import CustomDateTimeField
 
 
+class UserQuerySet(models.QuerySet):
+    ''' UserQuerySet: custom User queryset with helpers for
+            maintaining the version of each user's journals and tags
+
+        Args:
+            QuerySet (class): Django generic queryset class
+    '''
+
+    def touch_collection(self) -> int:
+        # Mark journals / tags of users as changed in one UPDATE
+        return self.update(collection_version=F('collection_version') + 1,
+                           collection_updated_at=timezone.now())
+
+
 class User(models.Model):
     ''' User: custom User model
 
@@ -62,6 +78,14 @@ class User(models.Model):
     last_login = CustomDateTimeField(blank=False, null=False)
     is_admin = models.BooleanField(blank=False, null=False, default=False)
     deleted = models.BooleanField(blank=False, null=False, default=False)
+    updated_at = CustomDateTimeField(auto_now=True)
+    # Incremented whenever any journal or tag of the user changes
+    collection_version = models.PositiveBigIntegerField(
+        blank=False, null=False, default=0, editable=False)
+    collection_updated_at = CustomDateTimeField(
+        blank=False, null=False, default=timezone.now, editable=False)
+
+    objects = UserQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.email
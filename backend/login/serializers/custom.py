@@ -1,6 +1,72 @@
+from django.db import transaction
+from django.db.models import (F, QuerySet)
+from django.db.models.signals import post_save
 from rest_framework import serializers
 
 
+class VersionConflict(Exception):
+    ''' VersionConflict: raised by a serializer update when the
+            instance changed since the version the client based its
+            update on
+
+        Args:
+            version (int): current version of the instance
+            unsaved (dict): fields of the rejected update the client
+                should re-apply (optional)
+    '''
+
+    def __init__(self, version: int, unsaved: dict = None) -> None:
+        super().__init__(f'Current version is {version}.')
+        self.version: int = version
+        self.unsaved: dict = unsaved or {}
+
+
+def parse_fields(value) -> list:
+    ''' parse_fields: function to read sparse fieldset from request
+            data, either a list or a comma-separated string
+
+        Args:
+            value (list | str | None): requested field names
+
+        Returns:
+            list: field names, or None if all fields requested
+
+        Raises:
+            ValueError: if value is neither a list nor a string
+    '''
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)):
+        raise ValueError('Fields must be a list or string.')
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+def parse_base_version(data: dict) -> int:
+    ''' parse_base_version: function to read the version of an
+            instance an update was based on from request data
+
+        Args:
+            data (dict): request data with optional 'base_version'
+
+        Returns:
+            int: base version, or None if not given
+
+        Raises:
+            ValueError: base_version is not a non-negative integer
+    '''
+    value = data.get('base_version')
+    if value is None or value == '':
+        return None
+    if not isinstance(value, (int, str)) or isinstance(value, bool):
+        raise ValueError('Invalid base version.')
+    version: int = int(value)
+    if version < 0:
+        raise ValueError('Invalid base version.')
+    return version
+
+
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
     ''' DynamicFieldsModelSerializer: custom serializer class that
             takes an additional `fields` argument to controls which
@@ -20,3 +86,66 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
             existing = set(self.fields)
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
+
+    @classmethod
+    def optimize_queryset(cls, queryset: QuerySet, fields: list,
+                          required: tuple = ()) -> QuerySet:
+        ''' optimize_queryset: function to push a sparse fieldset down
+                to SQL so only the columns needed by requested fields
+                (plus primary key and required columns) are loaded,
+                subclasses extend it to load related data in bulk
+
+            Args:
+                queryset (QuerySet): queryset of serializer's model
+                fields (list): requested field names (None for all)
+                required (tuple): extra column names always loaded,
+                    e.g. sort keys
+
+            Returns:
+                QuerySet: queryset restricted with only()
+        '''
+        if fields is None:
+            return queryset
+        model_meta = cls.Meta.model._meta
+        columns: set = {field.name for field in model_meta.concrete_fields}
+        names: list = [name for name in [*fields, *required]
+                       if name in columns]
+        return queryset.only(model_meta.pk.name, *names)
+
+    def save_versioned(self, instance, fields: dict) -> None:
+        ''' save_versioned: function to write fields of an instance
+                with a 'version' field in a single UPDATE that also
+                increments its version, only applied while the stored
+                version still equals context['base_version'] if given
+                (sends post_save like Model.save); without base_version
+                the new version is read back in the same transaction, as
+                concurrent writes may have moved it past instance.version
+
+            Args:
+                instance (Model): instance to update
+                fields (dict): column values to write
+
+            Raises:
+                VersionConflict: stored version differs from base_version
+        '''
+        model = type(instance)
+        base_version: int = self.context.get('base_version')
+        rows: QuerySet = model.objects.filter(pk=instance.pk)
+        if base_version is not None:
+            rows = rows.filter(version=base_version)
+        versions: QuerySet = model.objects.filter(
+            pk=instance.pk).values_list('version', flat=True)
+        with transaction.atomic(using=rows.db, savepoint=False):
+            updated: int = rows.update(version=F('version') + 1, **fields)
+            if updated and base_version is None:
+                version: int = versions.first()
+        if updated == 0:
+            raise VersionConflict(versions.first())
+        if base_version is not None:
+            version = base_version + 1
+        for field, value in fields.items():
+            setattr(instance, field, value)
+        instance.version = version
+        post_save.send(sender=model, instance=instance, created=False,
+                       update_fields=frozenset(fields), raw=False,
+                       using=rows.db)
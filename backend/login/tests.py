@@ -1,3 +1,211 @@
-# from django.test import TestCase
+import json
+import os
+import time
+from datetime import (datetime, timezone)
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .models.user import User
 
-# Create your tests here.
+
+# Maximum wall time in seconds for any single API request in tests
+ROUTE_TIME_BUDGET = float(os.environ.get('ROUTE_TIME_BUDGET', '2.0'))
+
+# Optional path of json file collecting per-route wall times
+ROUTE_TIMINGS_FILE = os.environ.get('ROUTE_TIMINGS_FILE')
+
+# Sample Slate editor output (serialized html) used for seeded journals
+SAMPLE_CONTENT = ('<h2 style="text-align:left">Morning walk</h2>'
+                  '<p style="text-align:left">Walked along the harbour '
+                  'before <strong>breakfast</strong> and watched the '
+                  'boats come in.</p><ul><li>coffee</li><li>notes</li>'
+                  '</ul>')
+
+
+def create_user(username: str) -> User:
+    ''' create_user: function to create a User instance for tests
+
+        Args:
+            username (str): unique username (also used for email)
+
+        Returns:
+            User: new User instance
+    '''
+    now: datetime = datetime.now(tz=timezone.utc).replace(microsecond=0)
+    return User.objects.create(
+        email=f'{username}@example.com', username=username,
+        first_name='Test', last_name='User', email_verified=True,
+        password='Password-123456', date_created=now, last_login=now)
+
+
+def seed_user_data(user: User, journal_count: int, tag_count: int) -> dict:
+    ''' seed_user_data: function to create tags and tagged journals
+            for a User instance through the API serializers
+
+        Args:
+            user (User): owner of seeded data
+            journal_count (int): number of journals to create
+            tag_count (int): number of tags to create
+
+        Returns:
+            dict: 'tags' and 'journals' lists of created instances
+    '''
+    from dashboard.serializers.tag import TagSerializer
+    from journal.serializers import JournalSerializer
+
+    now: datetime = datetime.now(tz=timezone.utc).replace(microsecond=0)
+    tags: list = []
+    for index in range(tag_count):
+        serializer = TagSerializer(data={
+            'user': user.id, 'date_created': now,
+            'name': f'{user.username} tag {index}'})
+        serializer.is_valid(raise_exception=True)
+        tags.append(serializer.save())
+
+    journals: list = []
+    for index in range(journal_count):
+        tag_ids: list = [str(tags[(index + offset) % tag_count].id)
+                         for offset in range(min(tag_count, 2))]
+        serializer = JournalSerializer(data={
+            'user': user.id, 'date_created': now, 'tag_list': tag_ids,
+            'title': f'Journal entry {index}', 'content': SAMPLE_CONTENT})
+        serializer.is_valid(raise_exception=True)
+        journals.append(serializer.save())
+    return {'tags': tags, 'journals': journals}
+
+
+class ApiClientMixin:
+    ''' ApiClientMixin: test case mixin sending json requests through
+            a fresh APIClient per test
+    '''
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client = APIClient()
+
+    def send(self, method: str, url: str, data: dict = None):
+        # Send json request through test client
+        return getattr(self.client, method)(url, data, format='json')
+
+
+class RouteBudgetMixin(ApiClientMixin):
+    ''' RouteBudgetMixin: test case mixin asserting an upper bound on
+            SQL queries and wall time per API route, and that the query
+            count does not grow with the number of rows involved
+    '''
+    timings: dict = {}
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        if ROUTE_TIMINGS_FILE:
+            results: dict = {}
+            if os.path.exists(ROUTE_TIMINGS_FILE):
+                with open(ROUTE_TIMINGS_FILE) as file:
+                    results = json.load(file)
+            results.update({route: max(times) for route, times
+                            in RouteBudgetMixin.timings.items()})
+            with open(ROUTE_TIMINGS_FILE, 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+
+    def assertRouteBudget(self, route: str, max_queries: int, *requests,
+                          status_code: int = 200,
+                          contains: list = None) -> list:
+        ''' assertRouteBudget: function to run the same route for each
+                (method, url, data) request, typically against a small
+                and a large dataset, and assert the request succeeded
+                with the rows it was run for and its query count is
+                within budget and identical for every request
+
+            Args:
+                route (str): route name used in failure messages
+                max_queries (int): maximum queries allowed per request
+                requests (tuple): (method, url, data) tuples to send
+                status_code (int): expected response status code
+                contains (list): for each request, strings (e.g. ids of
+                    seeded rows) its response body must contain
+
+            Returns:
+                list: query count of each request
+        '''
+        counts: list = []
+        for index, (method, url, data) in enumerate(requests):
+            with CaptureQueriesContext(connection) as context:
+                start: float = time.perf_counter()
+                response = self.send(method, url, data)
+                # Streamed bodies are produced while being read
+                body: bytes = (b''.join(response.streaming_content)
+                               if response.streaming else response.content)
+                elapsed: float = time.perf_counter() - start
+            response.close()
+            RouteBudgetMixin.timings.setdefault(route, []).append(elapsed)
+
+            self.assertEqual(response.status_code, status_code,
+                             f'{route} failed: {body[:200]}')
+            for text in (contains[index] if contains else ()):
+                self.assertIn(str(text).encode('utf-8'), body,
+                              f'{route} response lacks {text}')
+            self.assertLessEqual(
+                len(context.captured_queries), max_queries,
+                f'{route} used {len(context.captured_queries)} queries:\n' +
+                '\n'.join(query['sql'] for query
+                          in context.captured_queries))
+            self.assertLess(elapsed, ROUTE_TIME_BUDGET,
+                            f'{route} took {elapsed:.3f}s')
+            counts.append(len(context.captured_queries))
+        self.assertEqual(len(set(counts)), 1,
+                         f'{route} query count grows with rows: {counts}')
+        return counts
+
+
+class UserRouteBudgetTests(RouteBudgetMixin, TestCase):
+    ''' UserRouteBudgetTests: query and time budgets for
+            'login/users' routes
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.small_user = create_user('smalluser')
+        cls.large_user = create_user('largeuser')
+        for index in range(10):
+            create_user(f'extrauser{index}')
+
+    def test_create(self) -> None:
+        self.assertRouteBudget('users.create', 3, *[
+            ('post', '/login/users', {
+                'email': f'new{index}@example.com',
+                'username': f'newuser{index}', 'first_name': 'New',
+                'last_name': 'User', 'email_verified': False,
+                'password': 'Password-123456'})
+            for index in range(2)])
+
+    def test_list(self) -> None:
+        requests: tuple = (('get', '/login/users', None),
+                           ('get', '/login/users?fields=id,email', None))
+        small: list = self.assertRouteBudget(
+            'users.list', 1, *requests,
+            contains=[[self.large_user.username], [self.large_user.email]])
+        # Same requests again once the table holds five times the rows
+        for index in range(48):
+            create_user(f'lateuser{index}')
+        large: list = self.assertRouteBudget(
+            'users.list', 1, *requests,
+            contains=[['lateuser47'], ['lateuser47@example.com']])
+        self.assertEqual(small, large,
+                         'users.list query count grows with rows')
+
+    def test_retrieve(self) -> None:
+        self.assertRouteBudget('users.retrieve', 1, *[
+            ('get', f'/login/users/{user.id}', None)
+            for user in (self.small_user, self.large_user)],
+            contains=[[user.id, user.username]
+                      for user in (self.small_user, self.large_user)])
+
+    def test_partial_update(self) -> None:
+        self.assertRouteBudget('users.partial_update', 3, *[
+            ('patch', f'/login/users/{user.id}', {'first_name': 'Changed'})
+            for user in (self.small_user, self.large_user)],
+            contains=[[user.id]
+                      for user in (self.small_user, self.large_user)])
+        self.assertEqual(User.objects.filter(first_name='Changed').count(), 2)
@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from ..models.user import User
 from ..serializers.user import UserSerializer
+from ..serializers.custom import parse_fields
 from ..functions.user import find_user_by_id
 from ..utils.responses import (no_user_found, create_user_failed,
                                invalid_request_body, user_deleted,
@@ -68,7 +69,9 @@ class UserViewSet(viewsets.ViewSet):
                 instances of User model
 
         Args:
-            request (obj): object from client request, no data required
+            request (obj): object from client request, optionally with
+                a comma-separated 'fields' query parameter limited to
+                RETURN_FIELDS
 
         Returns:
             Response (HttpResponse): object containing API response
@@ -76,11 +79,22 @@ class UserViewSet(viewsets.ViewSet):
                 data containing queryset of User database or error if no
                 data found and 'status' integer with standard Http status code
         '''
-        queryset: QuerySet[User] = User.objects.filter(deleted=False)
+        try:
+            fields = parse_fields(request.query_params.get('fields'))
+        except ValueError:
+            return Response({'detail': invalid_request_body},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if fields is None:
+            fields = RETURN_FIELDS
+        else:
+            fields = [name for name in RETURN_FIELDS if name in fields]
+
+        queryset: QuerySet[User] = UserSerializer.optimize_queryset(
+            User.objects.filter(deleted=False), fields)
         if len(queryset) == 0:
             return Response({'detail': no_user_found},
                             status=status.HTTP_404_NOT_FOUND)
-        serializer = UserSerializer(queryset, fields=RETURN_FIELDS, many=True,
+        serializer = UserSerializer(queryset, fields=fields, many=True,
                                     context={'request': self.request})
         return Response({'detail': serializer.data},
                         status=status.HTTP_200_OK)
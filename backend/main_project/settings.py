@@ -8,6 +8,7 @@
     https://docs.djangoproject.com/en/5.0/ref/settings/
 '''
 
+import os
 from pathlib import Path
 from dotenv import dotenv_values
 
@@ -195,6 +196,26 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 
+# Journal keyword search backend: 'index' (JournalToken inverted index)
+# or 'fts5' (SQLite FTS5 virtual table ranked by BM25)
+JOURNAL_SEARCH_BACKEND = 'index'
+
+# PDF exports: number of render worker processes (0 renders in the
+# request thread) and maximum seconds per render
+EXPORT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+EXPORT_JOB_TIMEOUT = 60
+
+# Maximum number of journals in one batch export
+EXPORT_BATCH_MAX_JOURNALS = 1000
+
+# Size bound of the rendered pdf cache in MEDIA_ROOT/pdf_cache (LRU)
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Seconds between writes of one journal's buffered autosaves (0 writes
+# every autosave right away)
+AUTOSAVE_FLUSH_INTERVAL = 2
+
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 